@@ -8,6 +8,8 @@ WORD_DOCX_FILE_EXTENSION = '.docx'
 
 UTF_8_ENCODING = "utf-8"
 
+DOCUMENT_DELIMITER = "\n---\n"
+
 GRAPHML_FILE_EXTENSION = ".graphml"
 
 TEXT_GENERATION_METHOD_COLUMN_NAME = 'generation_method'
@@ -1,3 +1,6 @@
+import os
+
+
 class NfGeneralConfigurations:
     default_string_empty = str()
 
@@ -20,6 +23,99 @@ class NfGeneralConfigurations:
 
     TEXT_GENERATION_TEMPERATURE = 0.7
 
+    # Embedding index (faiss) settings
+    EMBEDDING_INDEX_FLAT_MAXIMUM_VECTORS = 50_000
+
+    EMBEDDING_INDEX_IVF_FLAT_MAXIMUM_VECTORS = 10_000_000
+
+    EMBEDDING_INDEX_MAXIMUM_FLOAT32_BYTES = 16 * 1024 ** 3
+
+    EMBEDDING_INDEX_HNSW_NEIGHBOURS = 32
+
+    EMBEDDING_INDEX_HNSW_EF_CONSTRUCTION = 80
+
+    EMBEDDING_INDEX_HNSW_EF_SEARCH = 64
+
+    EMBEDDING_INDEX_PQ_SUB_VECTOR_DIMENSION = 8
+
+    EMBEDDING_INDEX_PQ_BITS = 8
+
+    EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE = 100_000
+
+    EMBEDDING_INDEX_RECALL_TOP_K = 10
+
+    EMBEDDING_INDEX_RECALL_NUMBER_OF_QUERIES = 100
+
+    EMBEDDING_STREAMING_BATCH_SIZE = 1024
+
+    EMBEDDING_FILTERED_SEARCH_BRUTE_FORCE_MAXIMUM_DOCUMENTS = 10_000
+
+    # Cross-encoder re-ranking settings
+    RERANKER_NUMBER_OF_CANDIDATES = 50
+
+    RERANKER_BATCH_SIZE = 32
+
+    RERANKER_SCORE_CACHE_SIZE = 100_000
+
+    # Semantic answer cache settings
+    SEMANTIC_ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+
+    SEMANTIC_ANSWER_CACHE_TIME_TO_LIVE_SECONDS = 24 * 60 * 60
+
+    SEMANTIC_ANSWER_CACHE_MAXIMUM_NUMBER_OF_ANSWERS = 10_000
+
+    SEMANTIC_ANSWER_CACHE_SAVE_INTERVAL_NUMBER_OF_ANSWERS = 100
+
+    # ONNX embedding encoder settings; exported models are cached on disk
+    EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH = os.path.join(
+            os.path.expanduser("~"),
+            ".cache",
+            "ol_ai_services",
+            "onnx_encoders")
+
+    EMBEDDING_ONNX_OPSET_VERSION = 17
+
+    EMBEDDING_ONNX_BATCH_SIZE = 32
+
+    # Micro-batching of concurrent requests into one model / index call
+    MICRO_BATCH_MAXIMUM_BATCH_SIZE = 64
+
+    MICRO_BATCH_MAXIMUM_WAIT_SECONDS = 0.005
+
+    # Local retrieval server settings
+    RETRIEVAL_SERVER_HOST = "127.0.0.1"
+
+    RETRIEVAL_SERVER_PORT = 8765
+
+    RETRIEVAL_SERVER_LATENCY_WINDOW_SIZE = 10_000
+
+    # Documents chunked together when chunks are streamed
+    CHUNKING_DOCUMENT_BATCH_SIZE = 64
+
+    # Parallel chunking: document batches of similar numbers of characters,
+    # several per worker so uneven batches even out
+    CHUNKING_PARALLEL_BATCHES_PER_WORKER = 4
+
+    CHUNKING_PARALLEL_MAXIMUM_BATCH_NUMBER_OF_CHARACTERS = 8_000_000
+
+    # Tokens shared by consecutive token-aware chunks
+    DEFAULT_CHUNK_OVERLAP_TOKENS = 64
+
+    # Chunk statistics: reported percentiles and chunks tokenised to
+    # estimate token lengths
+    CHUNK_STATISTICS_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+    CHUNK_STATISTICS_TOKEN_SAMPLE_SIZE = 10_000
+
+    # Chunk deduplication (MinHash/LSH) settings
+    CHUNK_DEDUPLICATION_SIMILARITY_THRESHOLD = 0.8
+
+    CHUNK_DEDUPLICATION_NUMBER_OF_PERMUTATIONS = 128
+
+    CHUNK_DEDUPLICATION_SHINGLE_SIZE = 5
+
+    CHUNK_DEDUPLICATION_BATCH_SIZE = 256
+
     # def generate_text_using_model
     # output_ids = model.generate(
     #     input_ids,
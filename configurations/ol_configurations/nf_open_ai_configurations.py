@@ -17,3 +17,12 @@ class NfOpenAiConfigurations:
     OPEN_AI_MAX_TOKENS = 1000
 
     DEFAULT_MAX_TRUNCATE_CONTEXT_TOKENS = 12000
+
+    # Requests in flight at once when answering queries concurrently; the
+    # rate limiter still bounds requests per second
+    DEFAULT_MAXIMUM_NUMBER_OF_CONCURRENT_REQUESTS = 16
+
+    DEFAULT_NUMBER_OF_REQUEST_RETRIES = 3
+
+    # For models tiktoken cannot map to an encoding
+    DEFAULT_TIKTOKEN_ENCODING_NAME = "o200k_base"
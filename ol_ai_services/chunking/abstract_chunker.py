@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class AbstractChunker(ABC):
+    """
+    Abstract base class for chunkers. A chunker returns chunks as
+    [start, end) character spans over the text, so chunk strings are only
+    sliced when they are consumed.
+    """
+
+    @abstractmethod
+    def get_chunk_spans(
+            self,
+            text: str) \
+            -> np.ndarray:
+        """
+        An (number of chunks, 2) int64 array of [start, end) offsets.
+        """
+        pass
+
+    def get_chunk_spans_batch(
+            self,
+            texts: list) \
+            -> list:
+        """
+        The chunk spans of each text. Chunkers that can process several
+        texts at once (e.g. batch tokenisation) override this.
+        """
+        return [
+            self.get_chunk_spans(
+                text)
+            for text in texts
+            ]
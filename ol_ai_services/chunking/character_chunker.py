@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+
+from chunking.abstract_chunker import AbstractChunker
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+class CharacterChunker(AbstractChunker):
+    """
+    Fixed windows of chunk_size characters, consecutive windows sharing
+    chunk_overlap characters.
+    """
+
+    def __init__(
+            self,
+            chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING,
+            chunk_overlap: int = 0):
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                "Chunk overlap must be at least 0 and less than the chunk size")
+
+        self.chunk_size = \
+            chunk_size
+
+        self.chunk_overlap = \
+            chunk_overlap
+
+    def get_chunk_spans(
+            self,
+            text: str) \
+            -> np.ndarray:
+        if len(text) == 0:
+            return np.empty(
+                    (0, 2),
+                    dtype=np.int64)
+
+        step = \
+            self.chunk_size - self.chunk_overlap
+
+        # Windows until one reaches the end of the text
+        number_of_chunks = \
+            1 + math.ceil(max(len(text) - self.chunk_size, 0) / step)
+
+        starts = \
+            np.arange(number_of_chunks, dtype=np.int64) * step
+
+        return np.stack(
+                [starts, np.minimum(starts + self.chunk_size, len(text))],
+                axis=1)
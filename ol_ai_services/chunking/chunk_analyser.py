@@ -1,6 +1,203 @@
+import numpy as np
+
+from bclearer_orchestration_services.reporting_service.wrappers.run_and_log_function_wrapper_latest import run_and_log_function
+from chunking.objects.chunk_statistics_report import ChunkStatisticsReport
 from chunking.objects.chunked_texts import ChunkedTexts
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from tokenisation.objects.token_counter import TokenCounter
+
+
+# Whitespace code points beyond these (Unicode general punctuation and
+# ideographic space) are all below U+3001
+WHITESPACE_CODE_POINTS = np.array(
+        [code_point for code_point in range(0x3001) if chr(code_point).isspace()],
+        dtype=np.uint32)
+
+REPLACEMENT_CHARACTER_CODE_POINT = 0xFFFD
+
+PRIVATE_USE_AREA_CODE_POINTS = (0xE000, 0xF8FF)
+
+
+@run_and_log_function()
+def analyse_chunk_statistics(
+        chunked_texts: ChunkedTexts,
+        token_counter: TokenCounter = None,
+        cost_per_million_tokens: float = None,
+        number_of_token_sampled_chunks: int = NfGeneralConfigurations.CHUNK_STATISTICS_TOKEN_SAMPLE_SIZE,
+        random_seed: int = 0) \
+        -> ChunkStatisticsReport:
+    """
+    Profile the chunks from their spans, without slicing them: character
+    lengths, per-document chunk counts and whitespace and garbage ratios
+    are computed with numpy over the whole corpus.
+
+    Token lengths are counted with the token_counter for a random sample
+    of number_of_token_sampled_chunks chunks (every chunk if None), and
+    the corpus's tokens projected from the sample's tokens per character.
+    Garbage characters are control characters other than whitespace,
+    replacement characters (from failed decoding) and private use
+    characters (e.g. unmapped PDF glyphs).
+    """
+    chunk_spans = \
+        chunked_texts.chunk_spans
+
+    source_texts = \
+        chunked_texts.texts.source_texts
+
+    character_lengths = \
+        chunk_spans.get_lengths()
+
+    document_numbers_of_chunks = \
+        np.bincount(
+            chunk_spans.document_positions,
+            minlength=len(source_texts))
+
+    whitespace_counts, garbage_counts = \
+        __get_whitespace_and_garbage_counts(
+            chunk_spans=chunk_spans,
+            source_texts=source_texts)
+
+    # Empty chunks have no whitespace or garbage
+    divisors = \
+        np.maximum(character_lengths, 1)
+
+    if token_counter is None:
+        token_lengths = \
+            np.empty(0, dtype=np.int64)
+
+        projected_number_of_tokens = \
+            0
+
+    else:
+        token_lengths, projected_number_of_tokens = \
+            __get_token_lengths_and_projected_number_of_tokens(
+                chunk_spans=chunk_spans,
+                source_texts=source_texts,
+                token_counter=token_counter,
+                number_of_token_sampled_chunks=number_of_token_sampled_chunks,
+                random_seed=random_seed)
+
+    return \
+        ChunkStatisticsReport(
+            character_lengths=character_lengths,
+            token_lengths=token_lengths,
+            whitespace_ratios=whitespace_counts / divisors,
+            garbage_ratios=garbage_counts / divisors,
+            document_numbers_of_chunks=document_numbers_of_chunks,
+            projected_number_of_tokens=projected_number_of_tokens,
+            model_name=token_counter.model_name if token_counter is not None else None,
+            cost_per_million_tokens=cost_per_million_tokens)
+
+
+def __get_whitespace_and_garbage_counts(
+        chunk_spans,
+        source_texts: list) \
+        -> tuple:
+    whitespace_counts = \
+        np.zeros(len(chunk_spans), dtype=np.int64)
+
+    garbage_counts = \
+        np.zeros(len(chunk_spans), dtype=np.int64)
+
+    # Chunk positions grouped by document, in chunk order within each
+    chunk_positions = \
+        np.argsort(chunk_spans.document_positions, kind='stable')
+
+    document_positions, document_chunk_starts = \
+        np.unique(
+            chunk_spans.document_positions[chunk_positions],
+            return_index=True)
+
+    for document_position, document_chunk_positions in zip(
+            document_positions.tolist(),
+            np.split(chunk_positions, document_chunk_starts[1:])):
+        # UTF-32 gives one array element per character
+        code_points = \
+            np.frombuffer(
+                source_texts[document_position].encode('utf-32-le'),
+                dtype=np.uint32)
+
+        is_whitespace = \
+            np.isin(code_points, WHITESPACE_CODE_POINTS)
+
+        is_garbage = \
+            ((code_points < 0x20) | ((code_points >= 0x7F) & (code_points < 0xA0))) & ~is_whitespace
+
+        is_garbage |= \
+            code_points == REPLACEMENT_CHARACTER_CODE_POINT
+
+        is_garbage |= \
+            (code_points >= PRIVATE_USE_AREA_CODE_POINTS[0]) & (code_points <= PRIVATE_USE_AREA_CODE_POINTS[1])
+
+        starts = \
+            chunk_spans.starts[document_chunk_positions]
+
+        ends = \
+            chunk_spans.ends[document_chunk_positions]
+
+        # Counts over any span from two lookups in the running totals
+        for counts, is_counted in (
+                (whitespace_counts, is_whitespace),
+                (garbage_counts, is_garbage)):
+            running_totals = \
+                np.concatenate(
+                    ([0], np.cumsum(is_counted, dtype=np.int64)))
+
+            counts[document_chunk_positions] = \
+                running_totals[ends] - running_totals[starts]
+
+    return \
+        whitespace_counts, \
+        garbage_counts
+
+
+def __get_token_lengths_and_projected_number_of_tokens(
+        chunk_spans,
+        source_texts: list,
+        token_counter: TokenCounter,
+        number_of_token_sampled_chunks: int,
+        random_seed: int) \
+        -> tuple:
+    number_of_chunks = \
+        len(chunk_spans)
+
+    if number_of_token_sampled_chunks is None \
+            or number_of_token_sampled_chunks >= number_of_chunks:
+        sampled_positions = \
+            np.arange(number_of_chunks)
+
+    else:
+        sampled_positions = \
+            np.sort(
+                np.random.default_rng(random_seed).choice(
+                    number_of_chunks,
+                    size=number_of_token_sampled_chunks,
+                    replace=False))
+
+    sampled_chunk_spans = \
+        chunk_spans.select(
+            sampled_positions)
+
+    token_lengths = \
+        token_counter.count_tokens_batch(
+            [
+                source_texts[document_position][start:end]
+                for document_position, start, end in zip(
+                    sampled_chunk_spans.document_positions.tolist(),
+                    sampled_chunk_spans.starts.tolist(),
+                    sampled_chunk_spans.ends.tolist())
+                ])
+
+    if len(sampled_positions) == number_of_chunks:
+        return \
+            token_lengths, \
+            int(token_lengths.sum())
 
+    tokens_per_character = \
+        token_lengths.sum() / max(int(sampled_chunk_spans.get_lengths().sum()), 1)
 
-def analyse_chunk_statistics(chunked_texts:ChunkedTexts):
-    pass
-    
\ No newline at end of file
+    return \
+        token_lengths, \
+        int(round(tokens_per_character * int(chunk_spans.get_lengths().sum())))
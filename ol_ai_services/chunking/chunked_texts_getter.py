@@ -1,9 +1,10 @@
 import os
 
-from configurations.boro_configurations.nf_general_configurations import (
+from configurations.ol_configurations.nf_general_configurations import (
     NfGeneralConfigurations,
 )
 from configurations.constants import PDF_FILE_EXTENSION
+from chunking.abstract_chunker import AbstractChunker
 from chunking.objects.chunked_texts import ChunkedTexts
 from chunking.objects.texts import Texts
 from text_extraction.pdf_folder_extractor import extract_text_from_pdfs_in_folder
@@ -13,7 +14,11 @@ def get_chunked_texts(
         source_texts_folder_path: str,
         chunked_texts_output_file_path: str = None,
         extension: str = PDF_FILE_EXTENSION,
-        chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING) \
+        chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING,
+        removes_duplicate_chunks: bool = False,
+        similarity_threshold: float = NfGeneralConfigurations.CHUNK_DEDUPLICATION_SIMILARITY_THRESHOLD,
+        chunker: AbstractChunker = None,
+        number_of_workers: int = None) \
     -> ChunkedTexts:
     # TODO: Only PDF implemented at the moment
     if extension == PDF_FILE_EXTENSION:
@@ -35,12 +40,29 @@ def get_chunked_texts(
         ChunkedTexts(
             texts=texts,
             chunk_size=chunk_size,
-            output_file_path=chunked_texts_output_file_path)
+            output_file_path=chunked_texts_output_file_path,
+            chunker=chunker)
+
+    # Deduplication needs every chunk before any is written
+    writes_chunks_in_parallel = \
+        number_of_workers is not None \
+        and chunked_texts_output_file_path is not None \
+        and not removes_duplicate_chunks
+
+    if number_of_workers is not None:
+        chunked_texts.chunk_texts_in_parallel(
+                number_of_workers=number_of_workers,
+                exports_to_jsonl=writes_chunks_in_parallel)
+
+    if removes_duplicate_chunks:
+        chunked_texts.remove_duplicate_chunks(
+                similarity_threshold=similarity_threshold)
 
     if chunked_texts_output_file_path:
         texts.export_to_csv()
-        
-        chunked_texts.export_to_jsonl()
+
+        if not writes_chunks_in_parallel:
+            chunked_texts.export_to_jsonl()
 
     return \
         chunked_texts
@@ -0,0 +1,365 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from chunking.objects.chunk_deduplication_report import ChunkDeduplicationReport
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+SHINGLE_TOKEN_PATTERN = re.compile(
+        r"\w+")
+
+# Odd 64-bit multiplier used to roll token hashes into shingle and band hashes
+ROLLING_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+SIGNATURE_COMPARISON_BATCH_SIZE = 65_536
+
+# LSH candidates are verified against their signatures, so a false positive
+# costs one comparison while a false negative is a missed duplicate
+LSH_FALSE_POSITIVE_WEIGHT = 0.1
+
+
+class _TokenHashes(dict):
+    # Stable (unsalted) token hashes, computed once per distinct token
+    def __missing__(
+            self,
+            token: str) \
+            -> int:
+        token_hash = self[token] = zlib.crc32(
+                token.encode(UTF_8_ENCODING))
+
+        return token_hash
+
+
+def remove_duplicate_chunks(
+        texts: list,
+        similarity_threshold: float = NfGeneralConfigurations.CHUNK_DEDUPLICATION_SIMILARITY_THRESHOLD,
+        number_of_permutations: int = NfGeneralConfigurations.CHUNK_DEDUPLICATION_NUMBER_OF_PERMUTATIONS,
+        shingle_size: int = NfGeneralConfigurations.CHUNK_DEDUPLICATION_SHINGLE_SIZE,
+        batch_size: int = NfGeneralConfigurations.CHUNK_DEDUPLICATION_BATCH_SIZE,
+        random_seed: int = 0) \
+        -> ChunkDeduplicationReport:
+    """
+    Find exact and near-duplicate chunks, keeping the first occurrence.
+
+    Exact duplicates (same text up to whitespace) are found by hashing.
+    The remaining chunks get a MinHash signature over their word shingles
+    and are bucketed by locality-sensitive hashing, with the number of
+    bands chosen for similarity_threshold. A chunk colliding with an
+    earlier chunk is dropped when their estimated Jaccard similarity is at
+    least similarity_threshold. Every step is a hash, a sort or a
+    vectorised pass over the signatures, so the run is near-linear in the
+    number of chunks; signatures take number_of_permutations * 4 bytes
+    per distinct chunk.
+    """
+    if not 0 < similarity_threshold <= 1:
+        raise ValueError(
+            f"Similarity threshold must be in (0, 1], got {similarity_threshold}")
+
+    exact_duplicate_of, distinct_positions = __get_exact_duplicates(
+            texts)
+
+    signatures = __get_minhash_signatures(
+            texts=[texts[position] for position in distinct_positions],
+            number_of_permutations=number_of_permutations,
+            shingle_size=shingle_size,
+            batch_size=batch_size,
+            random_seed=random_seed)
+
+    number_of_bands, number_of_rows = get_optimal_lsh_bands(
+            similarity_threshold=similarity_threshold,
+            number_of_permutations=number_of_permutations)
+
+    # Index, into distinct_positions, of the chunk each one duplicates
+    near_duplicate_indices = np.full(
+            len(distinct_positions),
+            -1,
+            dtype=np.int64)
+
+    for band in range(number_of_bands):
+        candidate_indices, earlier_indices = __get_band_collisions(
+                band_signatures=signatures[:, band * number_of_rows:(band + 1) * number_of_rows])
+
+        not_yet_dropped = \
+            near_duplicate_indices[candidate_indices] == -1
+
+        candidate_indices = candidate_indices[not_yet_dropped]
+
+        earlier_indices = earlier_indices[not_yet_dropped]
+
+        similar = __get_estimated_similarities(
+                signatures=signatures,
+                first_indices=candidate_indices,
+                second_indices=earlier_indices) >= similarity_threshold
+
+        near_duplicate_indices[candidate_indices[similar]] = \
+            earlier_indices[similar]
+
+    distinct_positions = np.array(
+            distinct_positions,
+            dtype=np.int64)
+
+    dropped_indices = np.flatnonzero(
+            near_duplicate_indices >= 0)
+
+    near_duplicate_of = dict(
+            zip(
+                distinct_positions[dropped_indices].tolist(),
+                distinct_positions[near_duplicate_indices[dropped_indices]].tolist()))
+
+    return ChunkDeduplicationReport(
+            number_of_chunks=len(texts),
+            kept_positions=distinct_positions[near_duplicate_indices < 0],
+            exact_duplicate_of=exact_duplicate_of,
+            near_duplicate_of=near_duplicate_of,
+            similarity_threshold=similarity_threshold)
+
+
+def get_optimal_lsh_bands(
+        similarity_threshold: float,
+        number_of_permutations: int) \
+        -> tuple:
+    """
+    Number of bands and rows per band whose LSH collision curve
+    1 - (1 - s^rows)^bands minimises the weighted sum of the false
+    positive area below similarity_threshold and the false negative area
+    above it.
+    """
+    similarities = np.linspace(
+            0,
+            1,
+            1001)
+
+    best_number_of_bands_and_rows = (1, number_of_permutations)
+
+    best_error = np.inf
+
+    for number_of_bands in range(1, number_of_permutations + 1):
+        number_of_rows = number_of_permutations // number_of_bands
+
+        collision_probabilities = \
+            1 - (1 - similarities ** number_of_rows) ** number_of_bands
+
+        error = \
+            LSH_FALSE_POSITIVE_WEIGHT * collision_probabilities[similarities < similarity_threshold].sum() + \
+            (1 - LSH_FALSE_POSITIVE_WEIGHT) * (1 - collision_probabilities[similarities >= similarity_threshold]).sum()
+
+        if error < best_error:
+            best_error = error
+
+            best_number_of_bands_and_rows = (number_of_bands, number_of_rows)
+
+    return best_number_of_bands_and_rows
+
+
+def __get_exact_duplicates(
+        texts: list) \
+        -> tuple:
+    first_positions_by_digest = dict()
+
+    exact_duplicate_of = dict()
+
+    distinct_positions = list()
+
+    for position, text in enumerate(texts):
+        normalised_text = \
+            ' '.join(
+                unicodedata.normalize('NFC', text).split())
+
+        digest = hashlib.blake2b(
+                normalised_text.encode(UTF_8_ENCODING),
+                digest_size=16).digest()
+
+        first_position = first_positions_by_digest.setdefault(
+                digest,
+                position)
+
+        if first_position == position:
+            distinct_positions.append(
+                    position)
+
+        else:
+            exact_duplicate_of[position] = first_position
+
+    return exact_duplicate_of, distinct_positions
+
+
+def __get_minhash_signatures(
+        texts: list,
+        number_of_permutations: int,
+        shingle_size: int,
+        batch_size: int,
+        random_seed: int) \
+        -> np.ndarray:
+    # Multiply-shift hash functions standing in for random permutations
+    random_number_generator = np.random.default_rng(
+            random_seed)
+
+    multipliers = random_number_generator.integers(
+            0,
+            np.iinfo(np.uint64).max,
+            size=number_of_permutations,
+            dtype=np.uint64,
+            endpoint=True) | np.uint64(1)
+
+    increments = random_number_generator.integers(
+            0,
+            np.iinfo(np.uint64).max,
+            size=number_of_permutations,
+            dtype=np.uint64,
+            endpoint=True)
+
+    signatures = np.empty(
+            (len(texts), number_of_permutations),
+            dtype=np.uint32)
+
+    token_hashes_by_token = _TokenHashes()
+
+    for batch_start in range(0, len(texts), batch_size):
+        shingle_hashes, shingle_offsets = __get_shingle_hashes(
+                texts=texts[batch_start:batch_start + batch_size],
+                shingle_size=shingle_size,
+                token_hashes_by_token=token_hashes_by_token)
+
+        # One row per permutation, so each text's shingles are contiguous
+        permuted_shingle_hashes = np.multiply(
+                multipliers[:, np.newaxis],
+                shingle_hashes[np.newaxis, :])
+
+        permuted_shingle_hashes += increments[:, np.newaxis]
+
+        permuted_shingle_hashes >>= np.uint64(32)
+
+        signatures[batch_start:batch_start + batch_size] = np.minimum.reduceat(
+                permuted_shingle_hashes,
+                shingle_offsets,
+                axis=1).T
+
+    return signatures
+
+
+def __get_shingle_hashes(
+        texts: list,
+        shingle_size: int,
+        token_hashes_by_token: dict) \
+        -> tuple:
+    # Token hashes of all texts, each followed by shingle_size zeros so that
+    # no shingle runs into the next text
+    token_hashes = list()
+
+    text_starts = list()
+
+    numbers_of_shingles = list()
+
+    padding = [0] * shingle_size
+
+    for text in texts:
+        tokens = SHINGLE_TOKEN_PATTERN.findall(
+                text.lower())
+
+        text_starts.append(
+                len(token_hashes))
+
+        token_hashes.extend(
+                map(token_hashes_by_token.__getitem__, tokens))
+
+        token_hashes.extend(
+                padding)
+
+        # Texts shorter than a shingle are a single (padded) shingle
+        numbers_of_shingles.append(
+                max(len(tokens) - shingle_size + 1, 1))
+
+    token_hashes = np.array(
+            token_hashes,
+            dtype=np.uint64)
+
+    number_of_windows = len(token_hashes) - shingle_size + 1
+
+    window_hashes = np.zeros(
+            number_of_windows,
+            dtype=np.uint64)
+
+    for offset in range(shingle_size):
+        window_hashes = \
+            window_hashes * ROLLING_HASH_MULTIPLIER + token_hashes[offset:offset + number_of_windows]
+
+    numbers_of_shingles = np.array(
+            numbers_of_shingles,
+            dtype=np.int64)
+
+    shingle_offsets = np.zeros(
+            len(texts),
+            dtype=np.int64)
+
+    np.cumsum(
+            numbers_of_shingles[:-1],
+            out=shingle_offsets[1:])
+
+    shingle_positions = \
+        np.arange(numbers_of_shingles.sum()) + \
+        np.repeat(
+            np.array(text_starts, dtype=np.int64) - shingle_offsets,
+            numbers_of_shingles)
+
+    return window_hashes[shingle_positions], shingle_offsets
+
+
+def __get_band_collisions(
+        band_signatures: np.ndarray) \
+        -> tuple:
+    band_hashes = np.zeros(
+            len(band_signatures),
+            dtype=np.uint64)
+
+    for row in range(band_signatures.shape[1]):
+        band_hashes = \
+            band_hashes * ROLLING_HASH_MULTIPLIER + band_signatures[:, row].astype(np.uint64)
+
+    # A stable sort keeps each bucket in chunk order, so its first member
+    # is the earliest chunk
+    bucket_order = np.argsort(
+            band_hashes,
+            kind='stable')
+
+    sorted_band_hashes = band_hashes[bucket_order]
+
+    is_bucket_start = np.ones(
+            len(sorted_band_hashes),
+            dtype=bool)
+
+    is_bucket_start[1:] = \
+        sorted_band_hashes[1:] != sorted_band_hashes[:-1]
+
+    bucket_first_indices = bucket_order[is_bucket_start][np.cumsum(is_bucket_start) - 1]
+
+    is_collision = ~is_bucket_start
+
+    return bucket_order[is_collision], bucket_first_indices[is_collision]
+
+
+def __get_estimated_similarities(
+        signatures: np.ndarray,
+        first_indices: np.ndarray,
+        second_indices: np.ndarray) \
+        -> np.ndarray:
+    estimated_similarities = np.empty(
+            len(first_indices),
+            dtype=np.float32)
+
+    for batch_start in range(0, len(first_indices), SIGNATURE_COMPARISON_BATCH_SIZE):
+        batch = slice(
+                batch_start,
+                batch_start + SIGNATURE_COMPARISON_BATCH_SIZE)
+
+        estimated_similarities[batch] = np.mean(
+                signatures[first_indices[batch]] == signatures[second_indices[batch]],
+                axis=1)
+
+    return estimated_similarities
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class ChunkDeduplicationReport:
+    """
+    Outcome of a chunk deduplication run: the positions of the chunks that
+    were kept and, for every dropped chunk, the position of the earlier
+    chunk it duplicates.
+    """
+
+    def __init__(
+            self,
+            number_of_chunks: int,
+            kept_positions: np.ndarray,
+            exact_duplicate_of: dict,
+            near_duplicate_of: dict,
+            similarity_threshold: float):
+        self.number_of_chunks = \
+            number_of_chunks
+
+        self.kept_positions = \
+            kept_positions
+
+        self.exact_duplicate_of = \
+            exact_duplicate_of
+
+        self.near_duplicate_of = \
+            near_duplicate_of
+
+        self.similarity_threshold = \
+            similarity_threshold
+
+    @property
+    def number_of_exact_duplicates(
+            self) \
+            -> int:
+        return len(self.exact_duplicate_of)
+
+    @property
+    def number_of_near_duplicates(
+            self) \
+            -> int:
+        return len(self.near_duplicate_of)
+
+    @property
+    def number_of_dropped_chunks(
+            self) \
+            -> int:
+        return self.number_of_exact_duplicates + self.number_of_near_duplicates
+
+    def to_dictionary(
+            self) \
+            -> dict:
+        return {
+            'number_of_chunks'          : self.number_of_chunks,
+            'number_of_kept_chunks'     : len(self.kept_positions),
+            'number_of_dropped_chunks'  : self.number_of_dropped_chunks,
+            'number_of_exact_duplicates': self.number_of_exact_duplicates,
+            'number_of_near_duplicates' : self.number_of_near_duplicates,
+            'similarity_threshold'      : self.similarity_threshold
+            }
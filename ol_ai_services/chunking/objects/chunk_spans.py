@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class ChunkSpans:
+    """
+    Chunks as spans over the source texts: for each chunk, the position of
+    its text in the source texts (its doc_id) and its [start, end)
+    character offsets, in three aligned int64 arrays. Chunks from a
+    structure-aware chunker also have their heading paths, in an aligned
+    list.
+    """
+
+    def __init__(
+            self,
+            document_positions: np.ndarray,
+            starts: np.ndarray,
+            ends: np.ndarray,
+            heading_paths: list = None):
+        self.document_positions = \
+            document_positions
+
+        self.starts = \
+            starts
+
+        self.ends = \
+            ends
+
+        self.heading_paths = \
+            heading_paths
+
+    def __len__(self) \
+            -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_document_chunk_spans(
+            cls,
+            document_chunk_spans: list,
+            document_chunk_heading_paths: list = None):
+        """
+        From per-document (number of chunks, 2) span arrays, in document
+        order, and optionally per-document lists of chunk heading paths.
+        """
+        spans = \
+            np.concatenate(
+                [np.empty((0, 2), dtype=np.int64)] + list(document_chunk_spans))
+
+        document_positions = \
+            np.repeat(
+                np.arange(len(document_chunk_spans), dtype=np.int64),
+                [len(chunk_spans) for chunk_spans in document_chunk_spans])
+
+        if document_chunk_heading_paths is None:
+            heading_paths = \
+                None
+
+        else:
+            heading_paths = [
+                heading_path
+                for chunk_heading_paths in document_chunk_heading_paths
+                for heading_path in chunk_heading_paths
+                ]
+
+        return cls(
+                document_positions=document_positions,
+                starts=spans[:, 0].copy(),
+                ends=spans[:, 1].copy(),
+                heading_paths=heading_paths)
+
+    def select(
+            self,
+            positions: np.ndarray):
+        if self.heading_paths is None:
+            heading_paths = \
+                None
+
+        else:
+            heading_paths = [
+                self.heading_paths[position]
+                for position in np.arange(len(self))[positions].tolist()
+                ]
+
+        return ChunkSpans(
+                document_positions=self.document_positions[positions],
+                starts=self.starts[positions],
+                ends=self.ends[positions],
+                heading_paths=heading_paths)
+
+    def get_lengths(
+            self) \
+            -> np.ndarray:
+        return self.ends - self.starts
@@ -0,0 +1,164 @@
+import json
+import os
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING, WRITE_ACRONYM
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from data_export.dictionary_of_strings_to_csv_exporter import export_dictionary_of_strings_to_csv
+
+
+class ChunkStatisticsReport:
+    """
+    Profile of a chunked corpus: per-chunk character lengths, token
+    lengths (of a sample of chunks, unless every chunk was tokenised),
+    whitespace and garbage character ratios, per-document chunk counts,
+    and the corpus's projected number of tokens and cost for a model.
+    """
+
+    def __init__(
+            self,
+            character_lengths: np.ndarray,
+            token_lengths: np.ndarray,
+            whitespace_ratios: np.ndarray,
+            garbage_ratios: np.ndarray,
+            document_numbers_of_chunks: np.ndarray,
+            projected_number_of_tokens: int,
+            model_name: str = None,
+            cost_per_million_tokens: float = None,
+            percentiles: tuple = NfGeneralConfigurations.CHUNK_STATISTICS_PERCENTILES):
+        self.character_lengths = \
+            character_lengths
+
+        self.token_lengths = \
+            token_lengths
+
+        self.whitespace_ratios = \
+            whitespace_ratios
+
+        self.garbage_ratios = \
+            garbage_ratios
+
+        self.document_numbers_of_chunks = \
+            document_numbers_of_chunks
+
+        self.projected_number_of_tokens = \
+            projected_number_of_tokens
+
+        self.model_name = \
+            model_name
+
+        self.cost_per_million_tokens = \
+            cost_per_million_tokens
+
+        self.percentiles = \
+            percentiles
+
+    @property
+    def number_of_chunks(
+            self) \
+            -> int:
+        return len(self.character_lengths)
+
+    @property
+    def has_sampled_token_lengths(
+            self) \
+            -> bool:
+        return len(self.token_lengths) < self.number_of_chunks
+
+    @property
+    def projected_cost(
+            self):
+        if self.cost_per_million_tokens is None:
+            return None
+
+        return self.projected_number_of_tokens / 1_000_000 * self.cost_per_million_tokens
+
+    def to_dictionary(
+            self) \
+            -> dict:
+        return {
+            'number_of_documents'                : len(self.document_numbers_of_chunks),
+            'number_of_chunks'                   : self.number_of_chunks,
+            'number_of_empty_chunks'             : int(np.count_nonzero(self.character_lengths == 0)),
+            'number_of_characters'               : int(self.character_lengths.sum()),
+            'character_length'                   : self.__get_distribution(self.character_lengths),
+            'token_length'                       : self.__get_distribution(self.token_lengths),
+            'number_of_token_length_chunks'      : len(self.token_lengths),
+            'has_sampled_token_lengths'          : self.has_sampled_token_lengths,
+            'whitespace_ratio'                   : self.__get_distribution(self.whitespace_ratios),
+            'garbage_ratio'                      : self.__get_distribution(self.garbage_ratios),
+            'document_number_of_chunks'          : self.__get_distribution(self.document_numbers_of_chunks),
+            'number_of_documents_without_chunks' : int(np.count_nonzero(self.document_numbers_of_chunks == 0)),
+            'model_name'                         : self.model_name,
+            'projected_number_of_tokens'         : int(self.projected_number_of_tokens),
+            'cost_per_million_tokens'            : self.cost_per_million_tokens,
+            'projected_cost'                     : self.projected_cost
+            }
+
+    def export_to_json(
+            self,
+            output_file_path: str) \
+            -> None:
+        os.makedirs(
+                os.path.dirname(output_file_path) or '.',
+                exist_ok=True)
+
+        with open(output_file_path, WRITE_ACRONYM, encoding=UTF_8_ENCODING) as output_file:
+            json.dump(
+                    self.to_dictionary(),
+                    output_file,
+                    indent=2)
+
+    def export_to_csv(
+            self,
+            output_file_path: str) \
+            -> None:
+        """
+        One row per statistic, with distributions flattened to e.g.
+        character_length.p95.
+        """
+        os.makedirs(
+                os.path.dirname(output_file_path) or '.',
+                exist_ok=True)
+
+        statistics = \
+            dict()
+
+        for name, value in self.to_dictionary().items():
+            if isinstance(value, dict):
+                for distribution_name, distribution_value in value.items():
+                    statistics[f"{name}.{distribution_name}"] = distribution_value
+
+            else:
+                statistics[name] = value
+
+        export_dictionary_of_strings_to_csv(
+                output_file_path=output_file_path,
+                dictionary_of_strings=statistics,
+                keys_column_name='statistic',
+                values_column_name='value')
+
+    def __get_distribution(
+            self,
+            values: np.ndarray) \
+            -> dict:
+        if len(values) == 0:
+            return dict()
+
+        distribution = {
+            'minimum': float(values.min()),
+            'mean'   : float(values.mean()),
+            'std'    : float(values.std()),
+            'maximum': float(values.max())
+            }
+
+        # One sort for every percentile
+        for percentile, value in zip(
+                self.percentiles,
+                np.percentile(values, self.percentiles)):
+            distribution[f"p{percentile:g}"] = float(value)
+
+        return distribution
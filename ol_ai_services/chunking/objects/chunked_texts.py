@@ -1,14 +1,39 @@
+from collections.abc import Iterator
+
 from bclearer_orchestration_services.reporting_service.wrappers.run_and_log_function_wrapper_latest import run_and_log_function
+from chunking.abstract_chunker import AbstractChunker
+from chunking.character_chunker import CharacterChunker
+from chunking.duplicate_chunks_remover import remove_duplicate_chunks
+from chunking.objects.chunk_deduplication_report import ChunkDeduplicationReport
+from chunking.objects.chunk_spans import ChunkSpans
 from chunking.objects.texts import Texts
+from chunking.parallel_texts_chunker import chunk_texts_in_parallel
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
 from data_export.list_of_dictionaries_to_json_file_writer import write_list_of_dictionaries_to_json_file
 
 
 class ChunkedTexts:
+    """
+    The chunks of the source texts, held as (doc_id, start, end) spans
+    over the texts rather than as string copies; chunk strings are sliced
+    only as they are consumed.
+
+    Iterating yields the chunk strings. Until the spans are needed (by
+    len(), remove_duplicate_chunks or chunk_spans) iterating chunks the
+    texts a batch of documents at a time, so the first chunks are
+    available before the whole corpus is chunked. Chunk spans computed
+    elsewhere, e.g. by the StructureChunker, can be given instead.
+    """
+
     def __init__(
             self,
             texts: Texts,
-            chunk_size: int,
-            output_file_path: str):  # TODO: this should be the output folder, not file path
+            chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING,
+            output_file_path: str = None,  # TODO: this should be the output folder, not file path
+            chunker: AbstractChunker = None,
+            chunk_spans: ChunkSpans = None):
         self.texts = \
             texts
         
@@ -18,32 +43,155 @@ class ChunkedTexts:
         self.output_file_path = \
             output_file_path
         
-        self.chunked_texts = \
-            self.chunk_texts()
+        # Fixed character windows of chunk_size unless another chunker is given
+        self.chunker = \
+            CharacterChunker(chunk_size=chunk_size) if chunker is None else chunker
+        
+        # Set by remove_duplicate_chunks
+        self.chunk_deduplication_report = \
+            None
+        
+        # Computed on first use unless given
+        self.__chunk_spans = \
+            chunk_spans
     
+    def __len__(self) \
+            -> int:
+        return \
+            len(self.chunk_spans)
+    
+    def __iter__(self) \
+            -> Iterator[str]:
+        return \
+            self.iterate_chunks()
+    
+    @property
+    def chunk_spans(
+            self) \
+            -> ChunkSpans:
+        if self.__chunk_spans is None:
+            self.__chunk_spans = \
+                self.chunk_texts()
+        
+        return \
+            self.__chunk_spans
+    
+    @property
+    def chunked_texts(
+            self) \
+            -> list:
+        """
+        All chunks as {'text': chunk} dictionaries, with the chunk's
+        'heading_path' when chunked by document structure. This
+        materialises every chunk string; iterate the chunks instead where
+        possible.
+        """
+        return \
+            list(self.iterate_chunk_dictionaries())
     
     @run_and_log_function()
     def chunk_texts(
-            self):
-        chunked_texts = \
-            list()
-        
-        for text in \
-                self.texts.source_texts:
-            for i \
-                    in range(0,len(text),self.chunk_size):
-                chunk = \
-                    text[i: i + self.chunk_size]
-                
-                chunked_texts.append(
-                        {'text': chunk})
+            self) \
+            -> ChunkSpans:
+        return \
+            ChunkSpans.from_document_chunk_spans(
+                self.chunker.get_chunk_spans_batch(
+                    self.texts.source_texts))
+    
+    @run_and_log_function()
+    def chunk_texts_in_parallel(
+            self,
+            number_of_workers: int = None,
+            exports_to_jsonl: bool = False) \
+            -> ChunkSpans:
+        """
+        Chunk the texts across worker processes, in size-balanced document
+        batches, and with exports_to_jsonl write the chunks to the output
+        file as the batches complete, in document order.
+        """
+        self.__chunk_spans = \
+            chunk_texts_in_parallel(
+                source_texts=self.texts.source_texts,
+                chunker=self.chunker,
+                chunked_texts_output_file_path=self.output_file_path if exports_to_jsonl else None,
+                number_of_workers=number_of_workers)
+
+        return \
+            self.__chunk_spans
+
+    def iterate_chunks(
+            self) \
+            -> Iterator[str]:
+        source_texts = \
+            self.texts.source_texts
+        
+        if self.__chunk_spans is not None:
+            for document_position, start, end in zip(
+                    self.__chunk_spans.document_positions.tolist(),
+                    self.__chunk_spans.starts.tolist(),
+                    self.__chunk_spans.ends.tolist()):
+                yield \
+                    source_texts[document_position][start:end]
+            
+            return
+        
+        for batch_start in range(0, len(source_texts), NfGeneralConfigurations.CHUNKING_DOCUMENT_BATCH_SIZE):
+            batch_texts = \
+                source_texts[batch_start:batch_start + NfGeneralConfigurations.CHUNKING_DOCUMENT_BATCH_SIZE]
+            
+            for text, chunk_spans in zip(
+                    batch_texts,
+                    self.chunker.get_chunk_spans_batch(batch_texts)):
+                for start, end in chunk_spans.tolist():
+                    yield \
+                        text[start:end]
+    
+    def iterate_chunk_dictionaries(
+            self) \
+            -> Iterator[dict]:
+        if self.__chunk_spans is None or self.__chunk_spans.heading_paths is None:
+            for chunk in self.iterate_chunks():
+                yield \
+                    {'text': chunk}
+
+            return
+
+        for chunk, heading_path in zip(
+                self.iterate_chunks(),
+                self.__chunk_spans.heading_paths):
+            yield \
+                {
+                    'text'        : chunk,
+                    'heading_path': heading_path
+                    }
+    
+    def remove_duplicate_chunks(
+            self,
+            similarity_threshold: float = NfGeneralConfigurations.CHUNK_DEDUPLICATION_SIMILARITY_THRESHOLD) \
+            -> ChunkDeduplicationReport:
+        """
+        Drop exact and near-duplicate chunks (MinHash/LSH), keeping the first
+        occurrence, and return the report of what was dropped.
+        """
+        chunk_spans = \
+            self.chunk_spans
+        
+        self.chunk_deduplication_report = \
+            remove_duplicate_chunks(
+                texts=list(self.iterate_chunks()),
+                similarity_threshold=similarity_threshold)
+        
+        self.__chunk_spans = \
+            chunk_spans.select(
+                self.chunk_deduplication_report.kept_positions)
         
         return \
-            chunked_texts
+            self.chunk_deduplication_report
     
     def export_to_jsonl(
             self) \
             -> None:
+        # Streams the chunks, so they are never all held in memory
         write_list_of_dictionaries_to_json_file(
                 output_file_path=self.output_file_path,
-                list_of_dictionaries=self.chunked_texts)
+                list_of_dictionaries=self.iterate_chunk_dictionaries())
@@ -0,0 +1,184 @@
+import json
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from chunking.abstract_chunker import AbstractChunker
+from chunking.objects.chunk_spans import ChunkSpans
+from configurations.constants import WRITE_ACRONYM
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+# Set once per worker process by __initialise_chunking_worker
+__chunking_worker_chunker = None
+
+
+def chunk_texts_in_parallel(
+        source_texts: list,
+        chunker: AbstractChunker,
+        chunked_texts_output_file_path: str = None,
+        number_of_workers: int = None,
+        batches_per_worker: int = NfGeneralConfigurations.CHUNKING_PARALLEL_BATCHES_PER_WORKER,
+        maximum_batch_number_of_characters: int = NfGeneralConfigurations.CHUNKING_PARALLEL_MAXIMUM_BATCH_NUMBER_OF_CHARACTERS) \
+        -> ChunkSpans:
+    """
+    Chunk the texts across worker processes and return their chunk spans,
+    in document order.
+
+    The documents are split into contiguous batches of similar numbers of
+    characters, several per worker. Batch results are collected in
+    submission order, with a bounded number of batches in flight, so the
+    output is deterministic and the parent never holds more than a few
+    batches. With a chunked_texts_output_file_path the workers also
+    serialise their chunks as JSON lines, which are written to the file
+    as each batch is collected.
+    """
+    number_of_workers = \
+        number_of_workers or os.cpu_count()
+
+    batches = \
+        __get_size_balanced_batches(
+            source_texts=source_texts,
+            number_of_batches=number_of_workers * batches_per_worker,
+            maximum_batch_number_of_characters=maximum_batch_number_of_characters)
+
+    number_of_workers = \
+        max(min(number_of_workers, len(batches)), 1)
+
+    writes_chunks = \
+        chunked_texts_output_file_path is not None
+
+    document_chunk_spans = \
+        list()
+
+    if writes_chunks:
+        os.makedirs(
+                os.path.dirname(chunked_texts_output_file_path) or '.',
+                exist_ok=True)
+
+    output_file = \
+        open(chunked_texts_output_file_path, WRITE_ACRONYM) if writes_chunks else None
+
+    try:
+        # spawn, so workers do not inherit tokenizer thread pools
+        with ProcessPoolExecutor(
+                max_workers=number_of_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=__initialise_chunking_worker,
+                initargs=(chunker,)) as executor:
+            pending_futures = \
+                deque()
+
+            for batch_positions in batches:
+                pending_futures.append(
+                        executor.submit(
+                            __chunk_batch,
+                            [source_texts[position] for position in batch_positions.tolist()],
+                            writes_chunks))
+
+                if len(pending_futures) >= 2 * number_of_workers:
+                    __collect_batch(
+                            pending_futures.popleft().result(),
+                            document_chunk_spans,
+                            output_file)
+
+            while pending_futures:
+                __collect_batch(
+                        pending_futures.popleft().result(),
+                        document_chunk_spans,
+                        output_file)
+
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    return \
+        ChunkSpans.from_document_chunk_spans(
+            document_chunk_spans)
+
+
+def __get_size_balanced_batches(
+        source_texts: list,
+        number_of_batches: int,
+        maximum_batch_number_of_characters: int) \
+        -> list:
+    """
+    Contiguous batches of document positions, each of the documents
+    starting within one batch-sized stretch of the concatenated corpus.
+    """
+    text_lengths = \
+        np.fromiter(
+            (len(source_text) for source_text in source_texts),
+            dtype=np.int64,
+            count=len(source_texts))
+
+    batch_number_of_characters = \
+        max(
+            min(
+                math.ceil(int(text_lengths.sum()) / number_of_batches),
+                maximum_batch_number_of_characters),
+            1)
+
+    batch_numbers = \
+        (np.cumsum(text_lengths) - text_lengths) // batch_number_of_characters
+
+    return \
+        np.split(
+            np.arange(len(source_texts)),
+            np.flatnonzero(np.diff(batch_numbers)) + 1) if len(source_texts) > 0 else list()
+
+
+def __collect_batch(
+        batch_result: tuple,
+        document_chunk_spans: list,
+        output_file) \
+        -> None:
+    batch_document_chunk_spans, batch_chunk_lines = \
+        batch_result
+
+    document_chunk_spans.extend(
+            batch_document_chunk_spans)
+
+    if output_file is not None:
+        output_file.write(
+                batch_chunk_lines)
+
+
+def __initialise_chunking_worker(
+        chunker: AbstractChunker) \
+        -> None:
+    global __chunking_worker_chunker
+
+    __chunking_worker_chunker = \
+        chunker
+
+
+def __chunk_batch(
+        batch_texts: list,
+        writes_chunks: bool) \
+        -> tuple:
+    batch_document_chunk_spans = \
+        __chunking_worker_chunker.get_chunk_spans_batch(
+            batch_texts)
+
+    if not writes_chunks:
+        return \
+            batch_document_chunk_spans, \
+            None
+
+    # The same lines as ChunkedTexts.export_to_jsonl
+    batch_chunk_lines = \
+        "".join(
+            json.dumps({'text': text[start:end]}) + "\n"
+            for text, chunk_spans in zip(batch_texts, batch_document_chunk_spans)
+            for start, end in chunk_spans.tolist())
+
+    return \
+        batch_document_chunk_spans, \
+        batch_chunk_lines
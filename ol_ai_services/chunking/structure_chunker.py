@@ -0,0 +1,305 @@
+import numpy as np
+
+from chunking.token_chunker import TokenChunker
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from text_extraction.document_lexical_structure_extractor import Document
+from tokenisation.objects.token_counter import TokenCounter
+from tokenisation.tokeniser_types import TokeniserTypes
+
+
+PARAGRAPH_SEPARATOR = "\n\n"
+
+SENTENCE_SEPARATOR = " "
+
+
+class StructureChunker:
+    """
+    Chunks a parsed Document (Section -> Paragraph -> Sentence, from the
+    DocumentParser) into whole paragraphs and sentences of up to
+    chunk_size tokens of the target model's tokeniser, never across a
+    section boundary.
+
+    Paragraphs are packed whole while they fit; a paragraph over the
+    budget is packed sentence by sentence, and a single sentence over the
+    budget is split into windows of chunk_size tokens by a TokenChunker.
+    Tokens are counted per sentence, so the separators between sentences
+    are not counted.
+
+    The document is rendered as text (headings and paragraphs separated by
+    blank lines, sentences by spaces), and its chunks are [start, end)
+    spans over that text, each with its heading path: the titles of its
+    section and the sections above it.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            tokeniser_type: TokeniserTypes = TokeniserTypes.HUGGING_FACE,
+            chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING):
+        self.chunk_size = \
+            chunk_size
+
+        self.token_counter = \
+            TokenCounter(
+                model_name=model_name,
+                tokeniser_type=tokeniser_type)
+
+        # For sentences over the budget, without overlap
+        self.token_chunker = \
+            TokenChunker(
+                model_name=model_name,
+                tokeniser_type=tokeniser_type,
+                chunk_size=chunk_size,
+                chunk_overlap=0)
+
+    def get_document_chunks(
+            self,
+            document: Document) \
+            -> tuple:
+        """
+        The document's text, its (number of chunks, 2) int64 chunk spans
+        and the heading path (list of titles) of each chunk.
+        """
+        text_parts = \
+            list()
+
+        text_length = \
+            0
+
+        sentence_texts = \
+            list()
+
+        sentence_starts = \
+            list()
+
+        # Per section, per paragraph, the positions of its sentences
+        section_paragraph_sentence_positions = \
+            list()
+
+        heading_paths = \
+            list()
+
+        for section, heading_path in self.__get_sections_with_heading_paths(document):
+            paragraph_sentence_positions = \
+                list()
+
+            if section.title:
+                text_parts.append(
+                        section.title + PARAGRAPH_SEPARATOR)
+
+                text_length += \
+                    len(text_parts[-1])
+
+            for paragraph in section.paragraphs:
+                sentence_positions = \
+                    list()
+
+                for sentence in paragraph.sentences:
+                    if not sentence.text:
+                        continue
+
+                    if sentence_positions:
+                        text_parts.append(
+                                SENTENCE_SEPARATOR)
+
+                        text_length += \
+                            len(SENTENCE_SEPARATOR)
+
+                    sentence_positions.append(
+                            len(sentence_texts))
+
+                    sentence_texts.append(
+                            sentence.text)
+
+                    sentence_starts.append(
+                            text_length)
+
+                    text_parts.append(
+                            sentence.text)
+
+                    text_length += \
+                        len(sentence.text)
+
+                if sentence_positions:
+                    text_parts.append(
+                            PARAGRAPH_SEPARATOR)
+
+                    text_length += \
+                        len(PARAGRAPH_SEPARATOR)
+
+                    paragraph_sentence_positions.append(
+                            sentence_positions)
+
+            section_paragraph_sentence_positions.append(
+                    paragraph_sentence_positions)
+
+            heading_paths.append(
+                    heading_path)
+
+        sentence_starts = \
+            np.array(sentence_starts, dtype=np.int64)
+
+        sentence_ends = \
+            sentence_starts + np.fromiter(
+                (len(sentence_text) for sentence_text in sentence_texts),
+                dtype=np.int64,
+                count=len(sentence_texts))
+
+        # One batch for the whole document
+        sentence_numbers_of_tokens = \
+            self.token_counter.count_tokens_batch(
+                sentence_texts).tolist()
+
+        section_chunk_sentence_positions = [
+            self.__pack_section(
+                paragraph_sentence_positions,
+                sentence_numbers_of_tokens)
+            for paragraph_sentence_positions in section_paragraph_sentence_positions
+            ]
+
+        over_budget_positions = [
+            first_position
+            for chunk_sentence_positions in section_chunk_sentence_positions
+            for first_position, last_position in chunk_sentence_positions
+            if first_position == last_position
+            and sentence_numbers_of_tokens[first_position] > self.chunk_size
+            ]
+
+        # One batch for all the sentences over the budget, as spans
+        # within each sentence
+        over_budget_sentence_spans = \
+            dict(
+                zip(
+                    over_budget_positions,
+                    self.token_chunker.get_chunk_spans_batch(
+                        [sentence_texts[position] for position in over_budget_positions])))
+
+        chunk_spans = \
+            list()
+
+        chunk_heading_paths = \
+            list()
+
+        for chunk_sentence_positions, heading_path in zip(
+                section_chunk_sentence_positions,
+                heading_paths):
+            for first_position, last_position in chunk_sentence_positions:
+                if first_position in over_budget_sentence_spans:
+                    spans = \
+                        over_budget_sentence_spans[first_position] + sentence_starts[first_position]
+
+                else:
+                    spans = \
+                        [(sentence_starts[first_position], sentence_ends[last_position])]
+
+                for span in spans:
+                    chunk_spans.append(
+                            tuple(span))
+
+                    chunk_heading_paths.append(
+                            list(heading_path))
+
+        return \
+            "".join(text_parts), \
+            np.array(chunk_spans, dtype=np.int64).reshape(-1, 2), \
+            chunk_heading_paths
+
+    def __pack_section(
+            self,
+            paragraph_sentence_positions: list,
+            sentence_numbers_of_tokens: list) \
+            -> list:
+        """
+        The (first, last) sentence positions of the section's chunks.
+        """
+        chunk_sentence_positions = \
+            list()
+
+        chunk_first_position = \
+            None
+
+        chunk_last_position = \
+            None
+
+        chunk_number_of_tokens = \
+            0
+
+        for sentence_positions in paragraph_sentence_positions:
+            paragraph_number_of_tokens = \
+                sum(sentence_numbers_of_tokens[position] for position in sentence_positions)
+
+            if paragraph_number_of_tokens <= self.chunk_size:
+                # The whole paragraph as one unit
+                units = \
+                    [(sentence_positions[0], sentence_positions[-1], paragraph_number_of_tokens)]
+
+            else:
+                units = [
+                    (position, position, sentence_numbers_of_tokens[position])
+                    for position in sentence_positions
+                    ]
+
+            for first_position, last_position, number_of_tokens in units:
+                if chunk_first_position is not None \
+                        and chunk_number_of_tokens + number_of_tokens > self.chunk_size:
+                    chunk_sentence_positions.append(
+                            (chunk_first_position, chunk_last_position))
+
+                    chunk_first_position = \
+                        None
+
+                    chunk_number_of_tokens = \
+                        0
+
+                if chunk_first_position is None:
+                    chunk_first_position = \
+                        first_position
+
+                chunk_last_position = \
+                    last_position
+
+                chunk_number_of_tokens += \
+                    number_of_tokens
+
+        if chunk_first_position is not None:
+            chunk_sentence_positions.append(
+                    (chunk_first_position, chunk_last_position))
+
+        return \
+            chunk_sentence_positions
+
+    @staticmethod
+    def __get_sections_with_heading_paths(
+            document: Document) \
+            -> list:
+        """
+        Every section, in document order (each before its subsections),
+        with the titles of the sections down to it.
+        """
+        sections_with_heading_paths = \
+            list()
+
+        section_stack = [
+            (section, tuple())
+            for section in reversed(document.sections)
+            ]
+
+        while section_stack:
+            section, parent_heading_path = \
+                section_stack.pop()
+
+            # The parser's default section for text before any heading has no title
+            heading_path = \
+                parent_heading_path + (section.title,) if section.title else parent_heading_path
+
+            sections_with_heading_paths.append(
+                    (section, heading_path))
+
+            section_stack.extend(
+                    (subsection, heading_path)
+                    for subsection in reversed(section.subsections))
+
+        return \
+            sections_with_heading_paths
@@ -0,0 +1,77 @@
+import glob
+import os
+
+from chunking.objects.chunk_spans import ChunkSpans
+from chunking.objects.chunked_texts import ChunkedTexts
+from chunking.objects.texts import Texts
+from chunking.structure_chunker import StructureChunker
+from configurations.constants import PDF_FILE_EXTENSION
+from text_extraction.document_lexical_structure_extractor import DocumentParser
+
+
+def get_structured_chunked_texts(
+        source_texts_folder_path: str,
+        chunker: StructureChunker,
+        chunked_texts_output_file_path: str = None,
+        extension: str = PDF_FILE_EXTENSION,
+        document_parser: DocumentParser = None) \
+        -> ChunkedTexts:
+    """
+    Chunks each document of the folder (any format the DocumentParser
+    reads) by its section, paragraph and sentence structure. The chunk
+    dictionaries carry each chunk's heading path.
+    """
+    if document_parser is None:
+        document_parser = \
+            DocumentParser()
+
+    source_file_paths = \
+        sorted(
+            glob.glob(
+                os.path.join(source_texts_folder_path, '**', f'*{extension}'),
+                recursive=True))
+
+    source_texts = \
+        list()
+
+    document_chunk_spans = \
+        list()
+
+    document_chunk_heading_paths = \
+        list()
+
+    for source_file_path in source_file_paths:
+        source_text, chunk_spans, chunk_heading_paths = \
+            chunker.get_document_chunks(
+                document_parser.parse(source_file_path))
+
+        source_texts.append(
+                source_text)
+
+        document_chunk_spans.append(
+                chunk_spans)
+
+        document_chunk_heading_paths.append(
+                chunk_heading_paths)
+
+    texts = \
+        Texts(
+            source_texts=source_texts,
+            output_folder_path=os.path.dirname(
+                    chunked_texts_output_file_path) if chunked_texts_output_file_path else None)
+
+    chunked_texts = \
+        ChunkedTexts(
+            texts=texts,
+            output_file_path=chunked_texts_output_file_path,
+            chunk_spans=ChunkSpans.from_document_chunk_spans(
+                document_chunk_spans=document_chunk_spans,
+                document_chunk_heading_paths=document_chunk_heading_paths))
+
+    if chunked_texts_output_file_path:
+        texts.export_to_csv()
+
+        chunked_texts.export_to_jsonl()
+
+    return \
+        chunked_texts
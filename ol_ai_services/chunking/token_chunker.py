@@ -0,0 +1,199 @@
+import numpy as np
+from transformers import AutoTokenizer
+
+from chunking.abstract_chunker import AbstractChunker
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from tokenisation.tiktoken_encoding_getter import get_tiktoken_encoding
+from tokenisation.tokeniser_types import TokeniserTypes
+
+
+class TokenChunker(AbstractChunker):
+    """
+    Windows of chunk_size tokens of the target model's tokeniser,
+    consecutive windows sharing chunk_overlap tokens, returned as
+    character spans via the tokens' offsets: a Hugging Face fast
+    tokenizer's offset mapping or tiktoken's token byte lengths.
+
+    Each batch of documents is tokenised once, whole. Chunk sizes exclude
+    special tokens, so leave room for them below a model's maximum length.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            tokeniser_type: TokeniserTypes = TokeniserTypes.HUGGING_FACE,
+            chunk_size: int = NfGeneralConfigurations.DEFAULT_DATA_CHUNK_SIZE_FOR_TRAINING,
+            chunk_overlap: int = NfGeneralConfigurations.DEFAULT_CHUNK_OVERLAP_TOKENS):
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                "Chunk overlap must be at least 0 and less than the chunk size")
+
+        self.tokeniser_type = \
+            tokeniser_type
+
+        self.chunk_size = \
+            chunk_size
+
+        self.chunk_overlap = \
+            chunk_overlap
+
+        match tokeniser_type:
+            case TokeniserTypes.HUGGING_FACE:
+                self.tokenizer = \
+                    AutoTokenizer.from_pretrained(model_name)
+
+                if not self.tokenizer.is_fast:
+                    raise ValueError(
+                        f"Token chunking needs a fast tokenizer with offsets: {model_name}")
+
+            case TokeniserTypes.OPENAI:
+                self.encoding = \
+                    get_tiktoken_encoding(model_name)
+
+                # Built on first use
+                self.__token_byte_lengths = \
+                    None
+
+            case _:
+                raise ValueError(f"Unsupported tokeniser type: {tokeniser_type}")
+
+    def get_chunk_spans(
+            self,
+            text: str) \
+            -> np.ndarray:
+        return \
+            self.get_chunk_spans_batch(
+                [text])[0]
+
+    def get_chunk_spans_batch(
+            self,
+            texts: list) \
+            -> list:
+        if self.tokeniser_type == TokeniserTypes.HUGGING_FACE:
+            token_offsets_batch = \
+                self.__get_hugging_face_token_offsets_batch(texts)
+
+        else:
+            token_offsets_batch = \
+                self.__get_tiktoken_token_offsets_batch(texts)
+
+        return [
+            self.__get_chunk_spans_from_token_offsets(
+                token_offsets)
+            for token_offsets in token_offsets_batch
+            ]
+
+    def __get_chunk_spans_from_token_offsets(
+            self,
+            token_offsets: np.ndarray) \
+            -> np.ndarray:
+        number_of_tokens = \
+            len(token_offsets)
+
+        if number_of_tokens == 0:
+            return np.empty(
+                    (0, 2),
+                    dtype=np.int64)
+
+        step = \
+            self.chunk_size - self.chunk_overlap
+
+        # Windows until one reaches the last token
+        number_of_chunks = \
+            1 + -(-max(number_of_tokens - self.chunk_size, 0) // step)
+
+        first_tokens = \
+            np.arange(number_of_chunks, dtype=np.int64) * step
+
+        last_tokens = \
+            np.minimum(first_tokens + self.chunk_size, number_of_tokens) - 1
+
+        return np.stack(
+                [token_offsets[first_tokens, 0], token_offsets[last_tokens, 1]],
+                axis=1)
+
+    def __get_hugging_face_token_offsets_batch(
+            self,
+            texts: list) \
+            -> list:
+        # Whole documents, so no truncation; verbose=False drops the
+        # warning about sequences longer than the model's maximum
+        tokens = \
+            self.tokenizer(
+                list(texts),
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False)
+
+        return [
+            np.array(offsets, dtype=np.int64).reshape(-1, 2)
+            for offsets in tokens['offset_mapping']
+            ]
+
+    def __get_tiktoken_token_offsets_batch(
+            self,
+            texts: list) \
+            -> list:
+        if self.__token_byte_lengths is None:
+            self.__token_byte_lengths = \
+                self.__get_token_byte_lengths()
+
+        token_offsets_batch = \
+            list()
+
+        for text, token_ids in zip(texts, self.encoding.encode_ordinary_batch(list(texts))):
+            token_byte_ends = \
+                np.cumsum(self.__token_byte_lengths[np.asarray(token_ids, dtype=np.int64)])
+
+            token_byte_starts = \
+                token_byte_ends - self.__token_byte_lengths[np.asarray(token_ids, dtype=np.int64)]
+
+            text_bytes = \
+                np.frombuffer(text.encode(UTF_8_ENCODING), dtype=np.uint8)
+
+            if len(text_bytes) == len(text):
+                # ASCII: byte offsets are character offsets
+                token_offsets = \
+                    np.stack([token_byte_starts, token_byte_ends], axis=1)
+
+            else:
+                # A token can end inside a multi-byte character, so widen
+                # its span to whole characters
+                character_byte_starts = \
+                    np.flatnonzero((text_bytes & 0xC0) != 0x80)
+
+                token_offsets = \
+                    np.stack(
+                        [
+                            np.searchsorted(character_byte_starts, token_byte_starts, side='right') - 1,
+                            np.searchsorted(character_byte_starts, token_byte_ends, side='left')],
+                        axis=1)
+
+            token_offsets_batch.append(
+                    token_offsets.astype(np.int64))
+
+        return \
+            token_offsets_batch
+
+    def __get_token_byte_lengths(
+            self) \
+            -> np.ndarray:
+        token_byte_lengths = \
+            np.zeros(self.encoding.n_vocab, dtype=np.int64)
+
+        for token_id in range(self.encoding.n_vocab):
+            try:
+                token_byte_lengths[token_id] = \
+                    len(self.encoding.decode_single_token_bytes(token_id))
+
+            except KeyError:
+                # Unused ids between the ordinary and the special tokens
+                pass
+
+        return \
+            token_byte_lengths
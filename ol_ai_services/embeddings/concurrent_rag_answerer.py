@@ -0,0 +1,164 @@
+import asyncio
+import os
+from typing import AsyncIterator
+
+from langchain_openai import ChatOpenAI
+
+from configurations.ol_configurations.nf_open_ai_configurations import (
+    NfOpenAiConfigurations,
+)
+from embeddings.context_packer import pack_context
+from embeddings.objects.rag_answer import RagAnswer
+from embeddings.objects.semantic_answer_cache import SemanticAnswerCache
+from embeddings.rag_prompt_messages_getter import get_rag_prompt_messages
+from embeddings.search_embedded_documents import rate_limiter
+from model_management.model_types import ModelTypes
+
+
+async def answer_queries_concurrently(
+        query_contexts: list,
+        model_name: str = ModelTypes.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO,
+        max_context_tokens: int = NfOpenAiConfigurations.DEFAULT_MAX_TRUNCATE_CONTEXT_TOKENS,
+        maximum_number_of_concurrent_requests: int = NfOpenAiConfigurations.DEFAULT_MAXIMUM_NUMBER_OF_CONCURRENT_REQUESTS,
+        retries: int = NfOpenAiConfigurations.DEFAULT_NUMBER_OF_REQUEST_RETRIES,
+        answer_cache: SemanticAnswerCache = None) \
+        -> AsyncIterator[RagAnswer]:
+    """
+    Answer many (query, context) pairs, where a context is the query's
+    retrieved document texts, best first (e.g. RetrievedDocuments.texts).
+
+    Up to maximum_number_of_concurrent_requests requests are in flight at
+    once, all sharing the module rate limiter, and failed requests are
+    retried with exponential backoff by the client. Answers are yielded
+    as they complete, so not in query order; a query that still fails
+    is yielded with its error rather than stopping the batch.
+    """
+    client = ChatOpenAI(
+            api_key=os.environ["OPENAI_API_KEY"],
+            model=model_name,
+            rate_limiter=rate_limiter,
+            max_retries=retries)
+
+    request_semaphore = asyncio.Semaphore(
+            maximum_number_of_concurrent_requests)
+
+    answer_tasks = [
+        asyncio.ensure_future(
+            __answer_query(
+                position=position,
+                query=query,
+                context=context,
+                model_name=model_name,
+                max_context_tokens=max_context_tokens,
+                client=client,
+                request_semaphore=request_semaphore,
+                answer_cache=answer_cache))
+        for position, (query, context) in enumerate(query_contexts)
+        ]
+
+    try:
+        for answer_task in asyncio.as_completed(answer_tasks):
+            yield await answer_task
+
+    finally:
+        # The caller stopped iterating early
+        for answer_task in answer_tasks:
+            answer_task.cancel()
+
+
+def get_responses_using_retrieved_documents_concurrently(
+        query_contexts: list,
+        **answer_queries_concurrently_arguments) \
+        -> list[RagAnswer]:
+    """
+    Synchronous answer_queries_concurrently, returning the answers in
+    query order.
+
+    It runs its own event loop, so it cannot be called from a coroutine
+    or anywhere else an event loop is running (e.g. a notebook or an async
+    web server): iterate answer_queries_concurrently there instead.
+    """
+    try:
+        asyncio.get_running_loop()
+
+    except RuntimeError:
+        pass
+
+    else:
+        raise RuntimeError(
+            "get_responses_using_retrieved_documents_concurrently cannot be called from a "
+            "running event loop, iterate answer_queries_concurrently there instead")
+
+    async def __collect_rag_answers() \
+            -> list[RagAnswer]:
+        return [
+            rag_answer
+            async for rag_answer in answer_queries_concurrently(
+                query_contexts,
+                **answer_queries_concurrently_arguments)
+            ]
+
+    rag_answers = asyncio.run(
+            __collect_rag_answers())
+
+    return sorted(
+            rag_answers,
+            key=lambda rag_answer: rag_answer.position)
+
+
+async def __answer_query(
+        position: int,
+        query: str,
+        context: list,
+        model_name: str,
+        max_context_tokens: int,
+        client: ChatOpenAI,
+        request_semaphore: asyncio.Semaphore,
+        answer_cache: SemanticAnswerCache) \
+        -> RagAnswer:
+    rag_answer = RagAnswer(
+            position=position,
+            query=query)
+
+    try:
+        # Tokenising and the answer cache's embedding and file writes block,
+        # so they run in worker threads to keep the other requests going
+        packed_context = await asyncio.to_thread(
+                pack_context,
+                texts=list(context),
+                maximum_number_of_tokens=max_context_tokens,
+                model_name=model_name)
+
+        rag_answer.number_of_context_tokens = packed_context.number_of_tokens
+
+        if answer_cache is not None:
+            context_fingerprint = answer_cache.get_context_fingerprint(
+                    packed_context.text)
+
+            rag_answer.answer = await asyncio.to_thread(
+                    answer_cache.get_answer,
+                    query=query,
+                    context_fingerprint=context_fingerprint)
+
+            if rag_answer.answer is not None:
+                return rag_answer
+
+        async with request_semaphore:
+            response = await client.ainvoke(
+                    get_rag_prompt_messages(
+                        query=query,
+                        context=packed_context.text))
+
+        rag_answer.answer = response.content
+
+        if answer_cache is not None:
+            await asyncio.to_thread(
+                    answer_cache.add_answer,
+                    query=query,
+                    context_fingerprint=context_fingerprint,
+                    answer=rag_answer.answer)
+
+    except Exception as error:
+        rag_answer.error = error
+
+    return rag_answer
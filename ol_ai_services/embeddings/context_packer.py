@@ -0,0 +1,81 @@
+from bclearer_orchestration_services.reporting_service.wrappers.run_and_log_function_wrapper_latest import run_and_log_function
+from configurations.constants import DOCUMENT_DELIMITER
+from embeddings.objects.packed_context import PackedContext
+from tokenisation.tiktoken_encoding_getter import get_tiktoken_encoding
+
+
+@run_and_log_function()
+def pack_context(
+        texts: list,
+        maximum_number_of_tokens: int,
+        model_name: str,
+        delimiter: str = DOCUMENT_DELIMITER) \
+        -> PackedContext:
+    """
+    Pack documents, best first (e.g. RetrievedDocuments.texts), into a
+    context of at most maximum_number_of_tokens tokens of model_name's
+    tiktoken encoding.
+
+    Documents are added greedily in rank order and are never cut: one that
+    does not fit in the remaining budget is dropped whole and packing goes
+    on with the next, smaller ones. Documents stay in rank order in the
+    context, separated by delimiter.
+    """
+    encoding = get_tiktoken_encoding(
+            model_name)
+
+    numbers_of_tokens = [
+        len(document_tokens)
+        for document_tokens in encoding.encode_ordinary_batch(texts)
+        ]
+
+    number_of_delimiter_tokens = len(
+            encoding.encode_ordinary(delimiter))
+
+    included_positions = list()
+
+    dropped_positions = list()
+
+    number_of_tokens = 0
+
+    for position, number_of_document_tokens in enumerate(numbers_of_tokens):
+        number_of_added_tokens = number_of_document_tokens
+
+        if included_positions:
+            number_of_added_tokens += number_of_delimiter_tokens
+
+        if number_of_tokens + number_of_added_tokens > maximum_number_of_tokens:
+            dropped_positions.append(
+                    position)
+
+            continue
+
+        included_positions.append(
+                position)
+
+        number_of_tokens += number_of_added_tokens
+
+    text = delimiter.join(
+            texts[position] for position in included_positions)
+
+    # Tokens can merge across the joins, so count the packed text itself;
+    # if it is still over budget, drop the lowest ranked documents
+    number_of_tokens = len(
+            encoding.encode_ordinary(text))
+
+    while number_of_tokens > maximum_number_of_tokens:
+        dropped_positions.append(
+                included_positions.pop())
+
+        text = delimiter.join(
+                texts[position] for position in included_positions)
+
+        number_of_tokens = len(
+                encoding.encode_ordinary(text))
+
+    return PackedContext(
+            text=text,
+            included_positions=included_positions,
+            dropped_positions=sorted(dropped_positions),
+            number_of_tokens=number_of_tokens,
+            maximum_number_of_tokens=maximum_number_of_tokens)
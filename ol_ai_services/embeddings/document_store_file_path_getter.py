@@ -0,0 +1,58 @@
+import os
+
+
+DOCUMENT_IDS_FILE_SUFFIX = "_ids.npy"
+
+DOCUMENT_TEXTS_FILE_SUFFIX = "_texts.bin"
+
+DOCUMENT_OFFSETS_FILE_SUFFIX = "_offsets.npy"
+
+LEXICAL_INDEX_FILE_SUFFIX = "_bm25.npz"
+
+DOCUMENT_METADATA_FILE_SUFFIX = "_metadata.npz"
+
+RETRIEVED_QUERIES_FILE_SUFFIX = "_queries.jsonl"
+
+
+# The document store files all sit next to the documents (file_metadata) file
+def get_document_ids_file_path(
+        file_metadata: str) \
+        -> str:
+    return \
+        os.path.splitext(file_metadata)[0] + DOCUMENT_IDS_FILE_SUFFIX
+
+
+def get_document_texts_file_path(
+        file_metadata: str) \
+        -> str:
+    return \
+        os.path.splitext(file_metadata)[0] + DOCUMENT_TEXTS_FILE_SUFFIX
+
+
+def get_document_offsets_file_path(
+        file_metadata: str) \
+        -> str:
+    return \
+        os.path.splitext(file_metadata)[0] + DOCUMENT_OFFSETS_FILE_SUFFIX
+
+
+def get_lexical_index_file_path(
+        file_metadata: str) \
+        -> str:
+    return \
+        os.path.splitext(file_metadata)[0] + LEXICAL_INDEX_FILE_SUFFIX
+
+
+def get_document_metadata_file_path(
+        file_metadata: str) \
+        -> str:
+    return \
+        os.path.splitext(file_metadata)[0] + DOCUMENT_METADATA_FILE_SUFFIX
+
+
+# Next to a retrieved documents file, which holds the documents only
+def get_retrieved_queries_file_path(
+        retrieved_documents_file_path: str) \
+        -> str:
+    return \
+        os.path.splitext(retrieved_documents_file_path)[0] + RETRIEVED_QUERIES_FILE_SUFFIX
@@ -0,0 +1,39 @@
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from embeddings.document_store_file_path_getter import get_document_ids_file_path
+from embeddings.objects.memory_mapped_documents import MemoryMappedDocuments
+
+
+def load_documents_by_id(
+        file_metadata: str) \
+        -> Mapping:
+    """
+    The document id -> text mapping saved by Embeddings.save(), to pass to
+    the retrieval functions without loading the model or index.
+
+    The documents array (file_metadata) holds the texts in the order of the
+    ids file next to it, not indexed by id; arrays saved before ids were
+    persisted have positional ids. Memory-mappable documents are mapped.
+    """
+    if not os.path.exists(file_metadata):
+        return MemoryMappedDocuments(
+                file_metadata)
+
+    documents = np.load(
+            file_metadata,
+            allow_pickle=True).tolist()
+
+    document_ids_file_path = get_document_ids_file_path(
+            file_metadata)
+
+    if not os.path.exists(document_ids_file_path):
+        return dict(
+                enumerate(documents))
+
+    return dict(
+            zip(
+                np.load(document_ids_file_path).tolist(),
+                documents))
@@ -0,0 +1,23 @@
+import numpy as np
+
+from embeddings.objects.embedding_cache import EmbeddingCache
+
+
+def encode_documents(
+        model,
+        documents: list,
+        embedding_cache: EmbeddingCache = None) \
+        -> np.ndarray:
+    if embedding_cache is not None:
+        return embedding_cache.encode(
+                model=model,
+                texts=documents)
+
+    document_embeddings = model.encode(
+            documents,
+            convert_to_tensor=False)
+
+    # Convert embeddings to a numpy array
+    return np.asarray(
+            document_embeddings,
+            dtype=np.float32)
@@ -0,0 +1,142 @@
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.constants import WRITE_ACRONYM
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.documents_encoder import encode_documents
+from embeddings.embedding_encoder_factories import EmbeddingEncoderFactory
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+
+
+EMBEDDING_ENCODER_BENCHMARK_REPORT_VERSION = 1
+
+# Encoded first, untimed, so one-off session and kernel setup is excluded
+NUMBER_OF_WARM_UP_DOCUMENTS = 8
+
+
+def run_embedding_encoder_benchmark(
+        model,
+        documents: list,
+        encoder_types: list = None,
+        artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH,
+        report_file_path: str = None) \
+        -> dict:
+    """
+    Benchmark every embedding encoder backend on one corpus. Per encoder
+    type, the report has the setup time (export or load of the cached
+    artefact), documents per second and the cosine agreement of its
+    embeddings with the PyTorch model's (mean, 5th percentile and
+    minimum). The report is JSON-serialisable and written to
+    report_file_path if given.
+    """
+    if encoder_types is None:
+        encoder_types = list(
+                EmbeddingEncoderTypes)
+
+    warm_up_documents = documents[:NUMBER_OF_WARM_UP_DOCUMENTS]
+
+    encode_documents(
+            model=model,
+            documents=warm_up_documents)
+
+    # The reference embeddings for cosine agreement
+    reference_embeddings = __get_unit_embeddings(
+            encode_documents(
+                model=model,
+                documents=documents))
+
+    embedding_encoder_benchmark_report = {
+        'report_version'     : EMBEDDING_ENCODER_BENCHMARK_REPORT_VERSION,
+        'created_at'         : datetime.now(timezone.utc).isoformat(),
+        'environment'        : {
+            'python_version': platform.python_version(),
+            'numpy_version' : np.__version__,
+            'machine'       : platform.machine(),
+            'cpu_count'     : os.cpu_count()
+            },
+        'number_of_documents': len(documents),
+        'encoder_types'      : [
+            __benchmark_encoder_type(
+                model=model,
+                encoder_type=encoder_type,
+                artefact_folder_path=artefact_folder_path,
+                documents=documents,
+                warm_up_documents=warm_up_documents,
+                reference_embeddings=reference_embeddings)
+            for encoder_type in encoder_types
+            ]
+        }
+
+    if report_file_path:
+        os.makedirs(
+            os.path.dirname(report_file_path) or '.',
+            exist_ok=True)
+
+        with open(report_file_path, WRITE_ACRONYM, encoding=UTF_8_ENCODING) as report_file:
+            json.dump(
+                    embedding_encoder_benchmark_report,
+                    report_file,
+                    indent=2)
+
+    return embedding_encoder_benchmark_report
+
+
+def __benchmark_encoder_type(
+        model,
+        encoder_type: EmbeddingEncoderTypes,
+        artefact_folder_path: str,
+        documents: list,
+        warm_up_documents: list,
+        reference_embeddings: np.ndarray) \
+        -> dict:
+    start_time = time.perf_counter()
+
+    encoder = EmbeddingEncoderFactory(
+            encoder_type=encoder_type,
+            artefact_folder_path=artefact_folder_path).get_encoder(
+                model)
+
+    setup_seconds = time.perf_counter() - start_time
+
+    encode_documents(
+            model=encoder,
+            documents=warm_up_documents)
+
+    start_time = time.perf_counter()
+
+    embeddings = encode_documents(
+            model=encoder,
+            documents=documents)
+
+    encoding_seconds = time.perf_counter() - start_time
+
+    cosine_similarities = np.einsum(
+            'ij,ij->i',
+            __get_unit_embeddings(embeddings),
+            reference_embeddings)
+
+    return {
+        'encoder_type'            : encoder_type.value,
+        'setup_seconds'           : setup_seconds,
+        'encoding_seconds'        : encoding_seconds,
+        'documents_per_second'    : len(documents) / encoding_seconds,
+        'mean_cosine_agreement'   : float(cosine_similarities.mean()),
+        'p05_cosine_agreement'    : float(np.percentile(cosine_similarities, 5)),
+        'minimum_cosine_agreement': float(cosine_similarities.min())
+        }
+
+
+def __get_unit_embeddings(
+        embeddings: np.ndarray) \
+        -> np.ndarray:
+    return embeddings / np.maximum(
+            np.linalg.norm(embeddings, axis=1, keepdims=True),
+            np.finfo(np.float32).tiny)
@@ -0,0 +1,43 @@
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+
+
+class EmbeddingEncoderFactory:
+
+    def __init__(
+            self,
+            encoder_type: EmbeddingEncoderTypes,
+            artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH,
+            number_of_threads: int = 0):
+
+        self.encoder_type = encoder_type
+        self.artefact_folder_path = artefact_folder_path
+        self.number_of_threads = number_of_threads
+
+    def get_encoder(
+            self,
+            model):
+        """
+        Returns an encoder with the model's encode() interface: the
+        sentence-transformer itself, or its ONNX export (optionally int8
+        quantised) run with onnxruntime on number_of_threads threads (0
+        for every physical core).
+        """
+        match self.encoder_type:
+            case EmbeddingEncoderTypes.TORCH:
+                return model
+
+            case EmbeddingEncoderTypes.ONNX | EmbeddingEncoderTypes.ONNX_INT8:
+                # Imported here, so onnxruntime is only needed for ONNX encoders
+                from embeddings.objects.onnx_sentence_encoder import OnnxSentenceEncoder
+
+                return OnnxSentenceEncoder(
+                    model=model,
+                    artefact_folder_path=self.artefact_folder_path,
+                    quantises=self.encoder_type == EmbeddingEncoderTypes.ONNX_INT8,
+                    number_of_threads=self.number_of_threads)
+
+            case _:
+                raise ValueError(f"Unsupported embedding encoder type: {self.encoder_type}")
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class EmbeddingEncoderTypes(Enum):
+    TORCH = "torch"
+    ONNX = "onnx"
+    ONNX_INT8 = "onnx_int8"
@@ -0,0 +1,163 @@
+import math
+
+import faiss
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+
+
+# faiss warns when there are fewer than 39 training points per IVF list
+MINIMUM_TRAINING_POINTS_PER_IVF_LIST = 39
+
+
+class EmbeddingIndexFactory:
+
+    def __init__(
+            self,
+            index_type: EmbeddingIndexTypes,
+            embedding_dimension: int,
+            number_of_vectors: int):
+
+        if index_type == EmbeddingIndexTypes.AUTO:
+            index_type = get_automatic_index_type(
+                    number_of_vectors=number_of_vectors,
+                    embedding_dimension=embedding_dimension)
+
+        self.index_type = index_type
+        self.embedding_dimension = embedding_dimension
+        self.number_of_vectors = number_of_vectors
+
+    def get_index(self) \
+            -> faiss.Index:
+        """
+        Returns an (untrained for IVF types) faiss index addressed by stable
+        document ids. IVF indexes store the ids in their inverted lists;
+        the other types are wrapped in an IndexIDMap.
+        """
+        match self.index_type:
+            case EmbeddingIndexTypes.FLAT:
+                index = faiss.IndexFlatL2(
+                    self.embedding_dimension)
+
+            case EmbeddingIndexTypes.IVF_FLAT:
+                index = faiss.IndexIVFFlat(
+                    faiss.IndexFlatL2(self.embedding_dimension),
+                    self.embedding_dimension,
+                    self.__get_number_of_ivf_lists())
+
+                index.nprobe = self.__get_number_of_ivf_probes(
+                    index.nlist)
+
+            case EmbeddingIndexTypes.IVF_PQ:
+                index = faiss.IndexIVFPQ(
+                    faiss.IndexFlatL2(self.embedding_dimension),
+                    self.embedding_dimension,
+                    self.__get_number_of_ivf_lists(),
+                    self.__get_number_of_pq_sub_quantisers(),
+                    self.__get_number_of_pq_bits())
+
+                index.nprobe = self.__get_number_of_ivf_probes(
+                    index.nlist)
+
+            case EmbeddingIndexTypes.HNSW:
+                index = faiss.IndexHNSWFlat(
+                    self.embedding_dimension,
+                    NfGeneralConfigurations.EMBEDDING_INDEX_HNSW_NEIGHBOURS)
+
+                index.hnsw.efConstruction = \
+                    NfGeneralConfigurations.EMBEDDING_INDEX_HNSW_EF_CONSTRUCTION
+
+                index.hnsw.efSearch = \
+                    NfGeneralConfigurations.EMBEDDING_INDEX_HNSW_EF_SEARCH
+
+            # Scalar-quantised flat storage: 2 or 1 bytes per dimension
+            # instead of 4, searched exhaustively like FLAT
+            case EmbeddingIndexTypes.SQ_FLOAT16:
+                index = faiss.IndexScalarQuantizer(
+                    self.embedding_dimension,
+                    faiss.ScalarQuantizer.QT_fp16,
+                    faiss.METRIC_L2)
+
+            case EmbeddingIndexTypes.SQ_INT8:
+                index = faiss.IndexScalarQuantizer(
+                    self.embedding_dimension,
+                    faiss.ScalarQuantizer.QT_8bit,
+                    faiss.METRIC_L2)
+
+            case _:
+                raise ValueError(f"Unsupported embedding index type: {self.index_type}")
+
+        # IndexIDMap assumes removals renumber the vectors after them, as in
+        # flat storage; IVF removals do not, so its ids would go out of step
+        if isinstance(index, faiss.IndexIVF):
+            return index
+
+        return faiss.IndexIDMap(
+                index)
+
+    def __get_number_of_ivf_lists(self) \
+            -> int:
+        number_of_ivf_lists = \
+            int(4 * math.sqrt(self.number_of_vectors))
+
+        return max(
+                1,
+                min(
+                    number_of_ivf_lists,
+                    self.number_of_vectors // MINIMUM_TRAINING_POINTS_PER_IVF_LIST))
+
+    @staticmethod
+    def __get_number_of_ivf_probes(
+            number_of_ivf_lists: int) \
+            -> int:
+        return max(
+                1,
+                int(math.sqrt(number_of_ivf_lists)))
+
+    def __get_number_of_pq_sub_quantisers(self) \
+            -> int:
+        number_of_pq_sub_quantisers = max(
+                1,
+                self.embedding_dimension
+                // NfGeneralConfigurations.EMBEDDING_INDEX_PQ_SUB_VECTOR_DIMENSION)
+
+        # The number of sub-quantisers must divide the embedding dimension
+        while self.embedding_dimension % number_of_pq_sub_quantisers != 0:
+            number_of_pq_sub_quantisers -= 1
+
+        return number_of_pq_sub_quantisers
+
+    def __get_number_of_pq_bits(self) \
+            -> int:
+        # Each sub-quantiser needs at least 2 ** bits training points
+        return max(
+                1,
+                min(
+                    NfGeneralConfigurations.EMBEDDING_INDEX_PQ_BITS,
+                    int(math.log2(max(2, self.number_of_vectors)))))
+
+
+def get_automatic_index_type(
+        number_of_vectors: int,
+        embedding_dimension: int) \
+        -> EmbeddingIndexTypes:
+    """
+    The index type for a corpus of number_of_vectors embeddings. Only types
+    that support removing documents are picked, so AUTO embeddings can be
+    updated; HNSW, which cannot, is opt-in for read-only corpora.
+    """
+    float32_bytes = \
+        number_of_vectors * embedding_dimension * 4
+
+    if float32_bytes > NfGeneralConfigurations.EMBEDDING_INDEX_MAXIMUM_FLOAT32_BYTES:
+        return EmbeddingIndexTypes.IVF_PQ
+
+    if number_of_vectors <= NfGeneralConfigurations.EMBEDDING_INDEX_FLAT_MAXIMUM_VECTORS:
+        return EmbeddingIndexTypes.FLAT
+
+    if number_of_vectors <= NfGeneralConfigurations.EMBEDDING_INDEX_IVF_FLAT_MAXIMUM_VECTORS:
+        return EmbeddingIndexTypes.IVF_FLAT
+
+    return EmbeddingIndexTypes.IVF_PQ
@@ -0,0 +1,36 @@
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+def train_embedding_index_on_sample(
+        index: faiss.Index,
+        embeddings: np.ndarray,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+        random_seed: int = 0) \
+        -> None:
+    """
+    Train an index that needs training (IVF, PQ) on a random sample of the
+    embeddings rather than the whole corpus. No-op for indexes that are
+    already trained.
+    """
+    if index.is_trained:
+        return
+
+    if len(embeddings) > training_sample_size:
+        sample_positions = \
+            np.random.default_rng(random_seed).choice(
+                len(embeddings),
+                size=training_sample_size,
+                replace=False)
+
+        embeddings = \
+            embeddings[np.sort(sample_positions)]
+
+    index.train(
+            np.ascontiguousarray(
+                embeddings,
+                dtype=np.float32))
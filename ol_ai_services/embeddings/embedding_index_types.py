@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class EmbeddingIndexTypes(Enum):
+    AUTO = "auto"
+    FLAT = "flat"
+    IVF_FLAT = "ivf_flat"
+    IVF_PQ = "ivf_pq"
+    HNSW = "hnsw"
+    SQ_FLOAT16 = "sq_float16"
+    SQ_INT8 = "sq_int8"
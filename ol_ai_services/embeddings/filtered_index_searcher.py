@@ -0,0 +1,161 @@
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+def search_index(
+        index: faiss.Index,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        document_ids: np.ndarray = None,
+        brute_force_maximum_number_of_documents: int = NfGeneralConfigurations.EMBEDDING_FILTERED_SEARCH_BRUTE_FORCE_MAXIMUM_DOCUMENTS) \
+        -> tuple:
+    """
+    Search an embeddings index, restricted to document_ids when given.
+
+    The restriction is applied inside the search. Selections of up to
+    brute_force_maximum_number_of_documents are searched exhaustively:
+    over just their own vectors for flat, HNSW and scalar-quantised
+    indexes, and over every inverted list, computing only the selected
+    documents' distances, for IVF indexes. Larger selections are searched
+    with an ID selector, keeping the index's nprobe / efSearch. Indexes
+    other than IVF ones and IndexIDMaps are taken to be keyed by position.
+    Returns (distances, document_ids), padded with -1 like faiss.
+    """
+    query_embeddings = np.ascontiguousarray(
+            query_embeddings,
+            dtype=np.float32)
+
+    if document_ids is None:
+        return index.search(
+                query_embeddings,
+                top_k)
+
+    document_ids = np.asarray(
+            document_ids,
+            dtype=np.int64)
+
+    # Read indexes can come back as the base faiss.Index
+    index = faiss.downcast_index(
+            index)
+
+    if len(document_ids) <= brute_force_maximum_number_of_documents:
+        return __search_documents_exhaustively(
+                index=index,
+                query_embeddings=query_embeddings,
+                top_k=top_k,
+                document_ids=document_ids)
+
+    document_id_selector = faiss.IDSelectorBatch(
+            document_ids)
+
+    return index.search(
+            query_embeddings,
+            top_k,
+            params=__get_search_parameters(
+                index=index,
+                document_id_selector=document_id_selector))
+
+
+def __search_documents_exhaustively(
+        index: faiss.Index,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        document_ids: np.ndarray) \
+        -> tuple:
+    inverted_file_index = faiss.try_extract_index_ivf(
+            index)
+
+    # IVF vectors cannot be reconstructed without a direct map, so probe
+    # every list instead; only the selected ids' distances are computed
+    if inverted_file_index is not None:
+        document_id_selector = faiss.IDSelectorBatch(
+                document_ids)
+
+        return index.search(
+                query_embeddings,
+                top_k,
+                params=faiss.SearchParametersIVF(
+                    sel=document_id_selector,
+                    nprobe=inverted_file_index.nlist))
+
+    if isinstance(index, faiss.IndexIDMap):
+        index_document_ids = faiss.rev_swig_ptr(
+                index.id_map.data(),
+                index.id_map.size())
+
+        base_index = faiss.downcast_index(
+                index.index)
+
+    else:
+        # Without an id map, faiss ids are the vectors' positions
+        index_document_ids = np.arange(
+                index.ntotal,
+                dtype=np.int64)
+
+        base_index = index
+
+    positions = np.flatnonzero(
+            np.isin(
+                index_document_ids,
+                document_ids))
+
+    distances = np.full(
+            (len(query_embeddings), top_k),
+            np.inf,
+            dtype=np.float32)
+
+    found_document_ids = np.full(
+            (len(query_embeddings), top_k),
+            -1,
+            dtype=np.int64)
+
+    if len(positions) == 0:
+        return distances, found_document_ids
+
+    number_of_results = min(
+            top_k,
+            len(positions))
+
+    found_distances, found_positions = faiss.knn(
+            query_embeddings,
+            base_index.reconstruct_batch(positions),
+            number_of_results)
+
+    distances[:, :number_of_results] = found_distances
+
+    found_document_ids[:, :number_of_results] = \
+        index_document_ids[positions[found_positions]]
+
+    return distances, found_document_ids
+
+
+def __get_search_parameters(
+        index: faiss.Index,
+        document_id_selector: faiss.IDSelector) \
+        -> faiss.SearchParameters:
+    inverted_file_index = faiss.try_extract_index_ivf(
+            index)
+
+    if inverted_file_index is not None:
+        return faiss.SearchParametersIVF(
+                sel=document_id_selector,
+                nprobe=inverted_file_index.nprobe)
+
+    if isinstance(index, faiss.IndexIDMap):
+        base_index = faiss.downcast_index(
+                index.index)
+
+    else:
+        base_index = index
+
+    if isinstance(base_index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(
+                sel=document_id_selector,
+                efSearch=base_index.hnsw.efSearch)
+
+    return faiss.SearchParameters(
+            sel=document_id_selector)
@@ -0,0 +1,105 @@
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+def calculate_recall_at_k(
+        index: faiss.Index,
+        embeddings: np.ndarray,
+        document_ids: np.ndarray,
+        top_k: int = NfGeneralConfigurations.EMBEDDING_INDEX_RECALL_TOP_K,
+        number_of_queries: int = NfGeneralConfigurations.EMBEDDING_INDEX_RECALL_NUMBER_OF_QUERIES,
+        random_seed: int = 0,
+        query_embeddings: np.ndarray = None) \
+        -> float:
+    """
+    Recall@k of an (approximate) index against exact flat search over the
+    same embeddings, using a sample of the embeddings as queries unless
+    query_embeddings are given.
+
+    A sampled query is its own nearest neighbour in both searches, which
+    would inflate recall, so its own document is dropped from both result
+    lists before they are compared.
+    """
+    embeddings = np.ascontiguousarray(
+            embeddings,
+            dtype=np.float32)
+
+    document_ids = \
+        np.asarray(document_ids)
+
+    query_document_ids = \
+        None
+
+    if query_embeddings is None:
+        query_positions = \
+            np.random.default_rng(random_seed).choice(
+                len(embeddings),
+                size=min(number_of_queries, len(embeddings)),
+                replace=False)
+
+        query_embeddings = \
+            embeddings[query_positions]
+
+        query_document_ids = \
+            document_ids[query_positions]
+
+    # One more neighbour per sampled query, to make up for its self-match
+    number_of_neighbours = min(
+            top_k if query_document_ids is None else top_k + 1,
+            len(embeddings))
+
+    query_embeddings = np.ascontiguousarray(
+            query_embeddings,
+            dtype=np.float32)
+
+    exact_index = faiss.IndexFlatL2(
+            embeddings.shape[1])
+
+    exact_index.add(
+            embeddings)
+
+    _, exact_positions = exact_index.search(
+            query_embeddings,
+            number_of_neighbours)
+
+    exact_document_ids = \
+        document_ids[exact_positions]
+
+    _, approximate_document_ids = index.search(
+            query_embeddings,
+            number_of_neighbours)
+
+    if query_document_ids is not None:
+        exact_document_ids = __remove_self_matches(
+                exact_document_ids,
+                query_document_ids,
+                top_k)
+
+        approximate_document_ids = __remove_self_matches(
+                approximate_document_ids,
+                query_document_ids,
+                top_k)
+
+    number_of_matches = sum(
+            len(np.intersect1d(exact_row, approximate_row))
+            for exact_row, approximate_row
+            in zip(exact_document_ids, approximate_document_ids))
+
+    return \
+        number_of_matches / sum(len(exact_row) for exact_row in exact_document_ids)
+
+
+def __remove_self_matches(
+        document_ids_by_query: np.ndarray,
+        query_document_ids: np.ndarray,
+        top_k: int) \
+        -> list:
+    return [
+        row[row != query_document_id][:top_k]
+        for row, query_document_id
+        in zip(document_ids_by_query, query_document_ids)
+        ]
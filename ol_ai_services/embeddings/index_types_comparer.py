@@ -0,0 +1,93 @@
+import time
+
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.embedding_index_factories import EmbeddingIndexFactory
+from embeddings.embedding_index_trainer import train_embedding_index_on_sample
+from embeddings.index_recall_calculator import calculate_recall_at_k
+
+
+def compare_embedding_index_types(
+        embeddings: np.ndarray,
+        index_types: list,
+        document_ids: np.ndarray = None,
+        top_k: int = NfGeneralConfigurations.EMBEDDING_INDEX_RECALL_TOP_K,
+        number_of_queries: int = NfGeneralConfigurations.EMBEDDING_INDEX_RECALL_NUMBER_OF_QUERIES,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE) \
+        -> list:
+    """
+    Build each index type over the same embeddings and report its size,
+    query latency and recall@k against exact float32 flat search, so the
+    storage/accuracy trade-off can be picked per deployment.
+    """
+    embeddings = np.ascontiguousarray(
+            embeddings,
+            dtype=np.float32)
+
+    if document_ids is None:
+        document_ids = np.arange(
+                len(embeddings),
+                dtype=np.int64)
+
+    query_embeddings = embeddings[
+        np.random.default_rng(0).choice(
+            len(embeddings),
+            size=min(number_of_queries, len(embeddings)),
+            replace=False)]
+
+    index_type_reports = list()
+
+    for index_type in index_types:
+        start_time = time.perf_counter()
+
+        index = EmbeddingIndexFactory(
+                index_type=index_type,
+                embedding_dimension=embeddings.shape[1],
+                number_of_vectors=len(embeddings)).get_index()
+
+        train_embedding_index_on_sample(
+                index=index,
+                embeddings=embeddings,
+                training_sample_size=training_sample_size)
+
+        index.add_with_ids(
+                embeddings,
+                document_ids)
+
+        build_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+
+        for query_embedding in query_embeddings:
+            index.search(
+                    query_embedding.reshape(1, -1),
+                    top_k)
+
+        mean_query_latency_milliseconds = \
+            1000 * (time.perf_counter() - start_time) / len(query_embeddings)
+
+        index_bytes = faiss.serialize_index(
+                index).nbytes
+
+        index_type_reports.append(
+                {
+                    'index_type'                      : index_type.value,
+                    'number_of_vectors'               : len(embeddings),
+                    'build_seconds'                   : build_seconds,
+                    'index_bytes'                     : int(index_bytes),
+                    'bytes_per_vector'                : index_bytes / len(embeddings),
+                    'mean_query_latency_milliseconds' : mean_query_latency_milliseconds,
+                    'recall_at_k'                     : calculate_recall_at_k(
+                        index=index,
+                        embeddings=embeddings,
+                        document_ids=document_ids,
+                        top_k=top_k,
+                        number_of_queries=number_of_queries),
+                    'top_k'                           : top_k
+                    })
+
+    return index_type_reports
@@ -0,0 +1,392 @@
+import re
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+
+
+# Identifiers such as account codes (ACC-1001) or ontology terms
+# (bfo:0000001, has_part) are kept whole as well as split into their parts
+BM25_TOKEN_PATTERN = re.compile(
+        r"\w+(?:[.\-/:]\w+)*")
+
+BM25_TOKEN_SEPARATOR_PATTERN = re.compile(
+        r"[.\-/:]")
+
+DEFAULT_BM25_K1 = 1.5
+
+DEFAULT_BM25_B = 0.75
+
+
+class Bm25InvertedIndex:
+    """
+    Lexical inverted index with BM25 scoring over the same id -> document
+    mapping as an Embeddings index.
+
+    Postings are stored in CSR form: for term t, postings_offsets[t] to
+    postings_offsets[t + 1] slice the document positions and their
+    precomputed BM25 weights (idf times the saturated, length-normalised
+    term frequency). A query is then a gather and a sum over its terms'
+    slices.
+
+    The raw term frequencies and document lengths are kept too, so
+    upserted documents are the only ones tokenised again, and the weights
+    of the others are recomputed from their postings.
+    """
+
+    def __init__(
+            self,
+            documents_by_id: Mapping,
+            k1: float = DEFAULT_BM25_K1,
+            b: float = DEFAULT_BM25_B):
+        self.k1 = k1
+
+        self.b = b
+
+        self.document_ids = np.fromiter(
+                documents_by_id.keys(),
+                dtype=np.int64,
+                count=len(documents_by_id))
+
+        self.term_ids_by_term = dict()
+
+        posting_term_ids, posting_positions, posting_term_frequencies, document_lengths = \
+            self.__get_postings(
+                documents=documents_by_id.values(),
+                first_position=0)
+
+        self.__set_postings(
+                posting_term_ids=posting_term_ids,
+                posting_positions=posting_positions,
+                posting_term_frequencies=posting_term_frequencies,
+                document_lengths=document_lengths)
+
+    def __len__(self) \
+            -> int:
+        return len(self.document_ids)
+
+    def search(
+            self,
+            query: str,
+            top_k: int) \
+            -> tuple:
+        """
+        Returns the ids and BM25 scores of the top_k documents, best first.
+        """
+        term_ids = {
+            self.term_ids_by_term[term]
+            for term in get_bm25_terms(query)
+            if term in self.term_ids_by_term
+            }
+
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        posting_slices = [
+            slice(self.postings_offsets[term_id], self.postings_offsets[term_id + 1])
+            for term_id in term_ids
+            ]
+
+        positions = np.concatenate(
+                [self.postings_positions[posting_slice] for posting_slice in posting_slices])
+
+        weights = np.concatenate(
+                [self.postings_weights[posting_slice] for posting_slice in posting_slices])
+
+        if len(posting_slices) > 1:
+            positions, weights = self.__sum_weights_by_position(
+                    positions=positions,
+                    weights=weights,
+                    top_k=top_k,
+                    number_of_terms=len(posting_slices))
+
+        if top_k < len(positions):
+            top_k_positions = np.argpartition(
+                    -weights,
+                    top_k)[:top_k]
+
+            positions = positions[top_k_positions]
+
+            weights = weights[top_k_positions]
+
+        ranked_positions = np.argsort(
+                -weights,
+                kind='stable')
+
+        return \
+            self.document_ids[positions[ranked_positions]], \
+            weights[ranked_positions]
+
+    def upsert_documents(
+            self,
+            documents_by_id: Mapping) \
+            -> None:
+        """
+        Add documents, replacing those whose ids are already indexed.
+        """
+        self.__update_documents(
+                removed_document_ids=np.fromiter(
+                    documents_by_id.keys(),
+                    dtype=np.int64,
+                    count=len(documents_by_id)),
+                added_documents_by_id=documents_by_id)
+
+    def delete_documents(
+            self,
+            document_ids: list) \
+            -> None:
+        self.__update_documents(
+                removed_document_ids=np.asarray(
+                    document_ids,
+                    dtype=np.int64),
+                added_documents_by_id=dict())
+
+    def save(
+            self,
+            file_path: str) \
+            -> None:
+        terms = np.frombuffer(
+                '\n'.join(self.term_ids_by_term.keys()).encode(UTF_8_ENCODING),
+                dtype=np.uint8)
+
+        with open(file_path, 'wb') as file:
+            np.savez(
+                    file,
+                    document_ids=self.document_ids,
+                    terms=terms,
+                    postings_offsets=self.postings_offsets,
+                    postings_positions=self.postings_positions,
+                    postings_weights=self.postings_weights,
+                    postings_term_frequencies=self.postings_term_frequencies,
+                    document_lengths=self.document_lengths,
+                    parameters=np.array([self.k1, self.b]))
+
+    @classmethod
+    def load(
+            cls,
+            file_path: str):
+        bm25_inverted_index = cls.__new__(cls)
+
+        with np.load(file_path) as arrays:
+            bm25_inverted_index.k1, bm25_inverted_index.b = arrays['parameters'].tolist()
+
+            bm25_inverted_index.document_ids = arrays['document_ids']
+
+            terms = arrays['terms'].tobytes().decode(UTF_8_ENCODING)
+
+            bm25_inverted_index.term_ids_by_term = {
+                term: term_id
+                for term_id, term in enumerate(terms.split('\n') if terms else [])
+                }
+
+            bm25_inverted_index.postings_offsets = arrays['postings_offsets']
+
+            bm25_inverted_index.postings_positions = arrays['postings_positions']
+
+            bm25_inverted_index.postings_weights = arrays['postings_weights']
+
+            bm25_inverted_index.postings_term_frequencies = arrays['postings_term_frequencies']
+
+            bm25_inverted_index.document_lengths = arrays['document_lengths']
+
+        return bm25_inverted_index
+
+    def __sum_weights_by_position(
+            self,
+            positions: np.ndarray,
+            weights: np.ndarray,
+            top_k: int,
+            number_of_terms: int) \
+            -> tuple:
+        if len(positions) < len(self.document_ids) // 32:
+            positions, inverse_positions = np.unique(
+                    positions,
+                    return_inverse=True)
+
+            return \
+                positions, \
+                np.bincount(
+                    inverse_positions,
+                    weights=weights).astype(np.float32)
+
+        # Large postings: accumulate densely, then only deduplicate the best
+        # postings. A document has at most number_of_terms postings, so the
+        # top_k documents are among the top top_k * number_of_terms postings.
+        document_scores = np.bincount(
+                positions,
+                weights=weights,
+                minlength=len(self.document_ids)).astype(np.float32)
+
+        number_of_candidate_postings = top_k * number_of_terms
+
+        if number_of_candidate_postings < len(positions):
+            positions = positions[
+                np.argpartition(
+                    -document_scores[positions],
+                    number_of_candidate_postings)[:number_of_candidate_postings]]
+
+        positions = np.unique(
+                positions)
+
+        return positions, document_scores[positions]
+
+    def __update_documents(
+            self,
+            removed_document_ids: np.ndarray,
+            added_documents_by_id: Mapping) \
+            -> None:
+        is_kept_document = ~np.isin(
+                self.document_ids,
+                removed_document_ids)
+
+        # Kept documents close up, and added documents follow them
+        kept_document_positions = \
+            np.cumsum(is_kept_document) - 1
+
+        number_of_kept_documents = int(
+                is_kept_document.sum())
+
+        is_kept_posting = \
+            is_kept_document[self.postings_positions]
+
+        posting_term_ids = np.repeat(
+                np.arange(len(self.postings_offsets) - 1),
+                np.diff(self.postings_offsets))
+
+        added_posting_term_ids, added_posting_positions, added_posting_term_frequencies, added_document_lengths = \
+            self.__get_postings(
+                documents=added_documents_by_id.values(),
+                first_position=number_of_kept_documents)
+
+        self.document_ids = np.concatenate(
+                [
+                    self.document_ids[is_kept_document],
+                    np.fromiter(
+                        added_documents_by_id.keys(),
+                        dtype=np.int64,
+                        count=len(added_documents_by_id))
+                    ])
+
+        self.__set_postings(
+                posting_term_ids=np.concatenate(
+                    [posting_term_ids[is_kept_posting], added_posting_term_ids]),
+                posting_positions=np.concatenate(
+                    [
+                        kept_document_positions[self.postings_positions[is_kept_posting]].astype(np.int32),
+                        added_posting_positions
+                        ]),
+                posting_term_frequencies=np.concatenate(
+                    [self.postings_term_frequencies[is_kept_posting], added_posting_term_frequencies]),
+                document_lengths=np.concatenate(
+                    [self.document_lengths[is_kept_document], added_document_lengths]))
+
+    def __get_postings(
+            self,
+            documents,
+            first_position: int) \
+            -> tuple:
+        """
+        The term ids, document positions and term frequencies of the
+        documents' postings, and the documents' lengths, adding new terms.
+        """
+        posting_term_ids = list()
+
+        posting_positions = list()
+
+        posting_term_frequencies = list()
+
+        document_lengths = list()
+
+        for position, document in enumerate(documents, start=first_position):
+            terms = get_bm25_terms(
+                    document)
+
+            document_lengths.append(
+                    len(terms))
+
+            for term, term_frequency in Counter(terms).items():
+                posting_term_ids.append(
+                        self.term_ids_by_term.setdefault(
+                            term,
+                            len(self.term_ids_by_term)))
+
+                posting_positions.append(
+                        position)
+
+                posting_term_frequencies.append(
+                        term_frequency)
+
+        return \
+            np.array(posting_term_ids, dtype=np.int64), \
+            np.array(posting_positions, dtype=np.int32), \
+            np.array(posting_term_frequencies, dtype=np.float32), \
+            np.array(document_lengths, dtype=np.float32)
+
+    def __set_postings(
+            self,
+            posting_term_ids: np.ndarray,
+            posting_positions: np.ndarray,
+            posting_term_frequencies: np.ndarray,
+            document_lengths: np.ndarray) \
+            -> None:
+        number_of_terms = len(self.term_ids_by_term)
+
+        # Group the postings by term, keeping document order within a term
+        term_order = np.argsort(
+                posting_term_ids,
+                kind='stable')
+
+        posting_term_ids = posting_term_ids[term_order]
+
+        self.postings_positions = posting_positions[term_order]
+
+        self.postings_term_frequencies = posting_term_frequencies[term_order]
+
+        self.document_lengths = document_lengths
+
+        document_frequencies = np.bincount(
+                posting_term_ids,
+                minlength=number_of_terms)
+
+        self.postings_offsets = np.zeros(
+                number_of_terms + 1,
+                dtype=np.int64)
+
+        np.cumsum(
+                document_frequencies,
+                out=self.postings_offsets[1:])
+
+        number_of_documents = len(document_lengths)
+
+        inverse_document_frequencies = np.log1p(
+                (number_of_documents - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        average_document_length = \
+            float(document_lengths.mean()) if number_of_documents else 0.0
+
+        length_normalisations = \
+            self.k1 * (1 - self.b + self.b * document_lengths / max(average_document_length, 1.0))
+
+        self.postings_weights = (
+            inverse_document_frequencies[posting_term_ids]
+            * self.postings_term_frequencies * (self.k1 + 1)
+            / (self.postings_term_frequencies + length_normalisations[self.postings_positions])
+            ).astype(np.float32)
+
+
+def get_bm25_terms(
+        text: str) \
+        -> list:
+    terms = list()
+
+    for token in BM25_TOKEN_PATTERN.findall(text.lower()):
+        terms.append(
+                token)
+
+        if BM25_TOKEN_SEPARATOR_PATTERN.search(token):
+            terms.extend(
+                    BM25_TOKEN_SEPARATOR_PATTERN.split(token))
+
+    return terms
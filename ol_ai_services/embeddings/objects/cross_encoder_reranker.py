@@ -0,0 +1,129 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.objects.retrieved_documents import RetrievedDocuments
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved documents with a cross-encoder (e.g. a
+    sentence_transformers CrossEncoder), which reads the query and the
+    document together and ranks better than embedding distance.
+
+    (query, document) scores are kept in an LRU cache of cache_size pairs,
+    so re-ranking the same candidates again, as in evaluation loops, does
+    not run the model.
+    """
+
+    def __init__(
+            self,
+            model,
+            batch_size: int = NfGeneralConfigurations.RERANKER_BATCH_SIZE,
+            cache_size: int = NfGeneralConfigurations.RERANKER_SCORE_CACHE_SIZE):
+        self.model = model
+
+        self.batch_size = batch_size
+
+        self.cache_size = cache_size
+
+        self.number_of_cache_hits = 0
+
+        self.number_of_cache_misses = 0
+
+        # (query, document text digest) -> score, least recently used first
+        self.__scores_by_pair_key = OrderedDict()
+
+    def get_scores(
+            self,
+            query: str,
+            texts: list) \
+            -> np.ndarray:
+        """
+        Cross-encoder scores of (query, text) pairs, higher is better. Only
+        the pairs missing from the cache are scored, in batches.
+        """
+        pair_keys = [
+            (query, hashlib.blake2b(text.encode(UTF_8_ENCODING), digest_size=16).digest())
+            for text in texts
+            ]
+
+        missing_texts_by_pair_key = dict()
+
+        for pair_key, text in zip(pair_keys, texts):
+            if pair_key in self.__scores_by_pair_key:
+                self.__scores_by_pair_key.move_to_end(
+                        pair_key)
+
+                self.number_of_cache_hits += 1
+
+            else:
+                missing_texts_by_pair_key.setdefault(
+                        pair_key,
+                        text)
+
+        scores_by_pair_key = {
+            pair_key: self.__scores_by_pair_key[pair_key]
+            for pair_key in pair_keys
+            if pair_key in self.__scores_by_pair_key
+            }
+
+        if missing_texts_by_pair_key:
+            self.number_of_cache_misses += len(missing_texts_by_pair_key)
+
+            missing_scores = np.asarray(
+                    self.model.predict(
+                        [[query, text] for text in missing_texts_by_pair_key.values()],
+                        batch_size=self.batch_size,
+                        show_progress_bar=False),
+                    dtype=np.float32).reshape(-1)
+
+            for pair_key, score in zip(missing_texts_by_pair_key.keys(), missing_scores):
+                scores_by_pair_key[pair_key] = float(score)
+
+                self.__add_score_to_cache(
+                        pair_key=pair_key,
+                        score=float(score))
+
+        return np.array(
+                [scores_by_pair_key[pair_key] for pair_key in pair_keys],
+                dtype=np.float32)
+
+    def rerank(
+            self,
+            retrieved_documents: RetrievedDocuments,
+            top_n: int) \
+            -> RetrievedDocuments:
+        """
+        The top_n of the retrieved documents by cross-encoder score, best
+        first. The scores of the result are the cross-encoder scores.
+        """
+        scores = self.get_scores(
+                query=retrieved_documents.query,
+                texts=retrieved_documents.texts)
+
+        ranked_positions = np.argsort(
+                -scores,
+                kind='stable')[:top_n]
+
+        return RetrievedDocuments(
+                query=retrieved_documents.query,
+                document_ids=np.asarray(retrieved_documents.document_ids)[ranked_positions],
+                scores=scores[ranked_positions],
+                texts=[retrieved_documents.texts[position] for position in ranked_positions])
+
+    def __add_score_to_cache(
+            self,
+            pair_key: tuple,
+            score: float) \
+            -> None:
+        self.__scores_by_pair_key[pair_key] = score
+
+        if len(self.__scores_by_pair_key) > self.cache_size:
+            self.__scores_by_pair_key.popitem(
+                    last=False)
@@ -0,0 +1,31 @@
+class DocumentMetadataFilter:
+    """
+    Conditions on document metadata, all of which a document must meet.
+    Conditions left as None are not applied; page and date bounds are
+    inclusive, and documents without a page or date never meet a bound.
+    """
+
+    def __init__(
+            self,
+            source_paths: list = None,
+            source_path_prefix: str = None,
+            titles: list = None,
+            minimum_page: int = None,
+            maximum_page: int = None,
+            start_date=None,
+            end_date=None):
+        self.source_paths = source_paths
+
+        # e.g. a source folder
+        self.source_path_prefix = source_path_prefix
+
+        self.titles = titles
+
+        self.minimum_page = minimum_page
+
+        self.maximum_page = maximum_page
+
+        # datetime.date, datetime.datetime or ISO date strings
+        self.start_date = start_date
+
+        self.end_date = end_date
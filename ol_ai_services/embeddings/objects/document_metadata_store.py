@@ -0,0 +1,290 @@
+import numpy as np
+
+from embeddings.objects.document_metadata_filter import DocumentMetadataFilter
+
+
+SOURCE_PATH_COLUMN_NAME = 'source_path'
+
+TITLE_COLUMN_NAME = 'title'
+
+PAGE_COLUMN_NAME = 'page'
+
+CHUNK_OFFSET_COLUMN_NAME = 'chunk_offset'
+
+DATE_COLUMN_NAME = 'date'
+
+# String columns are stored as integer codes into a list of categories
+CATEGORICAL_COLUMN_NAMES = (
+    SOURCE_PATH_COLUMN_NAME,
+    TITLE_COLUMN_NAME)
+
+# Missing values: code / integer -1, date NaT
+COLUMN_DTYPES = {
+    SOURCE_PATH_COLUMN_NAME : np.int32,
+    TITLE_COLUMN_NAME       : np.int32,
+    PAGE_COLUMN_NAME        : np.int32,
+    CHUNK_OFFSET_COLUMN_NAME: np.int64,
+    DATE_COLUMN_NAME        : 'datetime64[D]'
+    }
+
+CATEGORIES_ARRAY_NAME_SUFFIX = '_categories'
+
+
+class DocumentMetadataStore:
+    """
+    Column store of document metadata (source path, title, page, chunk
+    offset and date), keyed by the same document ids as the faiss index.
+
+    Each column is one numpy array aligned with document_ids, so a filter
+    is a few vectorised comparisons over the columns, giving the ids to
+    restrict a search to.
+    """
+
+    def __init__(
+            self,
+            document_ids,
+            document_metadata: list):
+        if len(document_ids) != len(document_metadata):
+            raise ValueError(
+                "Number of document ids does not match number of document metadata")
+
+        self.document_ids = np.array(
+                document_ids,
+                dtype=np.int64)
+
+        self.categories_by_column_name = {
+            column_name: list()
+            for column_name in CATEGORICAL_COLUMN_NAMES
+            }
+
+        self.columns = self.__get_columns(
+                document_metadata)
+
+    def __len__(self) \
+            -> int:
+        return len(self.document_ids)
+
+    def get_document_metadata(
+            self,
+            document_id: int) \
+            -> dict:
+        positions = np.flatnonzero(
+                self.document_ids == document_id)
+
+        if len(positions) == 0:
+            raise KeyError(document_id)
+
+        position = positions[0]
+
+        document_metadata = dict()
+
+        for column_name, column in self.columns.items():
+            value = column[position]
+
+            if column_name in CATEGORICAL_COLUMN_NAMES:
+                if value >= 0:
+                    document_metadata[column_name] = \
+                        self.categories_by_column_name[column_name][value]
+
+            elif column_name == DATE_COLUMN_NAME:
+                if not np.isnat(value):
+                    document_metadata[column_name] = value.item()
+
+            elif value >= 0:
+                document_metadata[column_name] = int(value)
+
+        return document_metadata
+
+    def get_document_ids(
+            self,
+            metadata_filter: DocumentMetadataFilter) \
+            -> np.ndarray:
+        """
+        Ids of the documents meeting every condition of metadata_filter.
+        """
+        matches = np.ones(
+                len(self.document_ids),
+                dtype=bool)
+
+        if metadata_filter.source_paths is not None:
+            source_paths = set(
+                    metadata_filter.source_paths)
+
+            matches &= self.__get_category_matches(
+                    column_name=SOURCE_PATH_COLUMN_NAME,
+                    category_condition=lambda source_path: source_path in source_paths)
+
+        if metadata_filter.source_path_prefix is not None:
+            matches &= self.__get_category_matches(
+                    column_name=SOURCE_PATH_COLUMN_NAME,
+                    category_condition=lambda source_path: source_path.startswith(metadata_filter.source_path_prefix))
+
+        if metadata_filter.titles is not None:
+            titles = set(
+                    metadata_filter.titles)
+
+            matches &= self.__get_category_matches(
+                    column_name=TITLE_COLUMN_NAME,
+                    category_condition=lambda title: title in titles)
+
+        pages = self.columns[PAGE_COLUMN_NAME]
+
+        if metadata_filter.minimum_page is not None:
+            matches &= pages >= metadata_filter.minimum_page
+
+        if metadata_filter.maximum_page is not None:
+            matches &= (pages >= 0) & (pages <= metadata_filter.maximum_page)
+
+        # Comparisons with NaT are False, so undated documents never match
+        dates = self.columns[DATE_COLUMN_NAME]
+
+        if metadata_filter.start_date is not None:
+            matches &= dates >= np.datetime64(metadata_filter.start_date, 'D')
+
+        if metadata_filter.end_date is not None:
+            matches &= dates <= np.datetime64(metadata_filter.end_date, 'D')
+
+        return self.document_ids[matches]
+
+    def upsert_document_metadata(
+            self,
+            document_ids,
+            document_metadata: list) \
+            -> None:
+        """
+        Replace the metadata of existing documents and add new documents.
+        """
+        if len(document_ids) != len(document_metadata):
+            raise ValueError(
+                "Number of document ids does not match number of document metadata")
+
+        document_ids = np.array(
+                document_ids,
+                dtype=np.int64)
+
+        self.delete_document_metadata(
+                document_ids)
+
+        self.document_ids = np.concatenate(
+                [self.document_ids, document_ids])
+
+        for column_name, column in self.__get_columns(document_metadata).items():
+            self.columns[column_name] = np.concatenate(
+                    [self.columns[column_name], column])
+
+    def delete_document_metadata(
+            self,
+            document_ids) \
+            -> None:
+        kept_positions = ~np.isin(
+                self.document_ids,
+                np.asarray(document_ids, dtype=np.int64))
+
+        self.document_ids = self.document_ids[kept_positions]
+
+        for column_name, column in self.columns.items():
+            self.columns[column_name] = column[kept_positions]
+
+    def save(
+            self,
+            file_path: str) \
+            -> None:
+        categories_arrays = {
+            column_name + CATEGORIES_ARRAY_NAME_SUFFIX: np.array(categories, dtype=str)
+            for column_name, categories in self.categories_by_column_name.items()
+            }
+
+        with open(file_path, 'wb') as file:
+            np.savez(
+                    file,
+                    document_ids=self.document_ids,
+                    **self.columns,
+                    **categories_arrays)
+
+    @classmethod
+    def load(
+            cls,
+            file_path: str):
+        document_metadata_store = cls.__new__(cls)
+
+        with np.load(file_path) as arrays:
+            document_metadata_store.document_ids = arrays['document_ids']
+
+            document_metadata_store.columns = {
+                column_name: arrays[column_name]
+                for column_name in COLUMN_DTYPES
+                }
+
+            document_metadata_store.categories_by_column_name = {
+                column_name: arrays[column_name + CATEGORIES_ARRAY_NAME_SUFFIX].tolist()
+                for column_name in CATEGORICAL_COLUMN_NAMES
+                }
+
+        return document_metadata_store
+
+    def __get_columns(
+            self,
+            document_metadata: list) \
+            -> dict:
+        columns = {
+            column_name: np.empty(len(document_metadata), dtype=column_dtype)
+            for column_name, column_dtype in COLUMN_DTYPES.items()
+            }
+
+        codes_by_category_by_column_name = {
+            column_name: {
+                category: code
+                for code, category in enumerate(categories)
+                }
+            for column_name, categories in self.categories_by_column_name.items()
+            }
+
+        for position, metadata in enumerate(document_metadata):
+            for column_name in CATEGORICAL_COLUMN_NAMES:
+                category = metadata.get(
+                        column_name)
+
+                if category is None:
+                    columns[column_name][position] = -1
+
+                    continue
+
+                codes_by_category = codes_by_category_by_column_name[column_name]
+
+                if category not in codes_by_category:
+                    codes_by_category[category] = len(codes_by_category)
+
+                    self.categories_by_column_name[column_name].append(
+                            category)
+
+                columns[column_name][position] = codes_by_category[category]
+
+            for column_name in (PAGE_COLUMN_NAME, CHUNK_OFFSET_COLUMN_NAME):
+                value = metadata.get(
+                        column_name)
+
+                columns[column_name][position] = -1 if value is None else value
+
+            date = metadata.get(
+                    DATE_COLUMN_NAME)
+
+            columns[DATE_COLUMN_NAME][position] = \
+                np.datetime64('NaT') if date is None else np.datetime64(date, 'D')
+
+        return columns
+
+    def __get_category_matches(
+            self,
+            column_name: str,
+            category_condition) \
+            -> np.ndarray:
+        # Test the distinct categories, then match their codes
+        matching_codes = [
+            code
+            for code, category in enumerate(self.categories_by_column_name[column_name])
+            if category_condition(category)
+            ]
+
+        return np.isin(
+                self.columns[column_name],
+                matching_codes)
@@ -0,0 +1,123 @@
+from concurrent.futures import Future
+
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.objects.micro_batcher import MicroBatcher
+
+
+class EmbeddingBroker:
+    """
+    In-process embedding service shared by concurrent callers. Texts
+    submitted from many threads are gathered for up to
+    maximum_wait_seconds or maximum_batch_size texts and encoded with one
+    model.encode call, instead of one batch-of-one call each.
+
+    encode() has the model's interface, so a broker can be passed wherever
+    the model is (e.g. to retrieve_similar_documents_batch or
+    SemanticAnswerCache). Calls with at least maximum_batch_size texts are
+    already batches and are encoded directly.
+    """
+
+    def __init__(
+            self,
+            model,
+            maximum_batch_size: int = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_BATCH_SIZE,
+            maximum_wait_seconds: float = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_WAIT_SECONDS,
+            number_of_workers: int = 1):
+        self.model = model
+
+        self.maximum_batch_size = maximum_batch_size
+
+        self.micro_batcher = MicroBatcher(
+                process_batch=self.__encode_texts,
+                maximum_batch_size=maximum_batch_size,
+                maximum_wait_seconds=maximum_wait_seconds,
+                number_of_workers=number_of_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+            self,
+            exception_type,
+            exception,
+            traceback) \
+            -> None:
+        self.close()
+
+    def submit(
+            self,
+            text: str) \
+            -> Future:
+        """
+        A future of the text's embedding.
+        """
+        return self.micro_batcher.submit(
+                text)
+
+    def encode(
+            self,
+            sentences,
+            convert_to_tensor: bool = False,
+            **encode_arguments) \
+            -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.submit(
+                    sentences).result()
+
+        if len(sentences) >= self.maximum_batch_size:
+            return self.__encode_batch(
+                    list(sentences))
+
+        futures = [
+            self.submit(
+                sentence)
+            for sentence in sentences
+            ]
+
+        if not futures:
+            return self.__encode_batch(
+                    list())
+
+        return np.stack(
+                [future.result() for future in futures])
+
+    def get_sentence_embedding_dimension(
+            self) \
+            -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def get_statistics(
+            self) \
+            -> dict:
+        return {
+            'number_of_texts'  : self.micro_batcher.number_of_items,
+            'number_of_batches': self.micro_batcher.number_of_batches,
+            'mean_batch_size'  : self.micro_batcher.mean_batch_size
+            }
+
+    def close(
+            self) \
+            -> None:
+        self.micro_batcher.close()
+
+    def __encode_texts(
+            self,
+            texts: list) \
+            -> list:
+        return list(
+                self.__encode_batch(
+                    texts))
+
+    def __encode_batch(
+            self,
+            texts: list) \
+            -> np.ndarray:
+        return np.asarray(
+                self.model.encode(
+                    texts,
+                    convert_to_tensor=False),
+                dtype=np.float32)
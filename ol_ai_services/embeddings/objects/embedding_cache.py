@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+
+
+EMBEDDING_CACHE_VECTORS_FILE_NAME = "vectors.f32"
+
+EMBEDDING_CACHE_KEYS_FILE_NAME = "keys.txt"
+
+EMBEDDING_CACHE_METADATA_FILE_NAME = "metadata.json"
+
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed cache of embeddings for one model and
+    encoder.
+
+    Vectors are appended as raw float32 rows to a single block file; the
+    index file holds one normalised-text hash per line, the line number
+    being the vector's row. Each model and encoder type gets its own
+    folder, as e.g. ONNX_INT8 vectors only approximate the torch ones, so
+    the cache is keyed by (model name, encoder type, text hash).
+
+    A cache folder has a single writer: rows are numbered from the keys
+    this instance has read, so two processes appending to the same folder
+    would give their vectors the same rows. Concurrent builds should use
+    one cache folder each.
+    """
+
+    def __init__(
+            self,
+            cache_folder_path: str,
+            model_name: str,
+            encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH):
+        self.model_name = model_name
+
+        self.encoder_type = encoder_type
+
+        self.model_cache_folder_path = os.path.join(
+                cache_folder_path,
+                re.sub(r'[^A-Za-z0-9_.-]', '_', model_name),
+                encoder_type.value)
+
+        os.makedirs(
+                self.model_cache_folder_path,
+                exist_ok=True)
+
+        self.__vectors_file_path = os.path.join(
+                self.model_cache_folder_path,
+                EMBEDDING_CACHE_VECTORS_FILE_NAME)
+
+        self.__keys_file_path = os.path.join(
+                self.model_cache_folder_path,
+                EMBEDDING_CACHE_KEYS_FILE_NAME)
+
+        self.__metadata_file_path = os.path.join(
+                self.model_cache_folder_path,
+                EMBEDDING_CACHE_METADATA_FILE_NAME)
+
+        self.embedding_dimension = self.__read_embedding_dimension()
+
+        self.rows_by_key = self.__read_rows_by_key()
+
+        # Opened lazily, and re-opened after new vectors are appended
+        self.__vectors = None
+
+    def __len__(self) \
+            -> int:
+        return len(self.rows_by_key)
+
+    @staticmethod
+    def get_text_key(
+            text: str) \
+            -> str:
+        normalised_text = \
+            ' '.join(
+                unicodedata.normalize('NFC', text).split())
+
+        return hashlib.blake2b(
+                normalised_text.encode(UTF_8_ENCODING),
+                digest_size=16).hexdigest()
+
+    def encode(
+            self,
+            model,
+            texts: list,
+            **encode_keyword_arguments) \
+            -> np.ndarray:
+        """
+        Embed texts, encoding only the ones missing from the cache (each
+        distinct text once) and writing their vectors back.
+        """
+        text_keys = [
+            self.get_text_key(text)
+            for text in texts
+            ]
+
+        missing_texts_by_key = dict()
+
+        for text_key, text in zip(text_keys, texts):
+            if text_key not in self.rows_by_key:
+                missing_texts_by_key.setdefault(
+                        text_key,
+                        text)
+
+        if missing_texts_by_key:
+            missing_embeddings = np.asarray(
+                    model.encode(
+                        list(missing_texts_by_key.values()),
+                        convert_to_tensor=False,
+                        **encode_keyword_arguments),
+                    dtype=np.float32)
+
+            self.add_embeddings(
+                    text_keys=list(missing_texts_by_key.keys()),
+                    embeddings=missing_embeddings)
+
+        return self.get_embeddings(
+                text_keys)
+
+    def get_embeddings(
+            self,
+            text_keys: list) \
+            -> np.ndarray:
+        vectors = self.__get_vectors()
+
+        return np.array(
+                vectors[[self.rows_by_key[text_key] for text_key in text_keys]],
+                dtype=np.float32).reshape(
+                    len(text_keys),
+                    self.embedding_dimension or 0)
+
+    def add_embeddings(
+            self,
+            text_keys: list,
+            embeddings: np.ndarray) \
+            -> None:
+        if self.embedding_dimension is None:
+            self.embedding_dimension = embeddings.shape[1]
+
+            with open(self.__metadata_file_path, 'w', encoding=UTF_8_ENCODING) as metadata_file:
+                json.dump(
+                        {
+                            'model_name'         : self.model_name,
+                            'encoder_type'       : self.encoder_type.value,
+                            'embedding_dimension': self.embedding_dimension
+                            },
+                        metadata_file)
+
+        if embeddings.shape[1] != self.embedding_dimension:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match "
+                f"cached dimension {self.embedding_dimension} for {self.model_name} ({self.encoder_type.value})")
+
+        # Vectors are written before keys, so a key always has a vector
+        with open(self.__vectors_file_path, 'ab') as vectors_file:
+            vectors_file.write(
+                    np.ascontiguousarray(
+                        embeddings,
+                        dtype=np.float32).tobytes())
+
+        with open(self.__keys_file_path, 'a', encoding=UTF_8_ENCODING) as keys_file:
+            for text_key in text_keys:
+                self.rows_by_key[text_key] = len(self.rows_by_key)
+
+                keys_file.write(
+                        text_key + '\n')
+
+        self.__vectors = None
+
+    def __get_vectors(
+            self) \
+            -> np.ndarray:
+        if self.__vectors is None:
+            if not self.rows_by_key:
+                return np.empty(
+                        (0, self.embedding_dimension or 0),
+                        dtype=np.float32)
+
+            self.__vectors = np.memmap(
+                    self.__vectors_file_path,
+                    dtype=np.float32,
+                    mode='r',
+                    shape=(len(self.rows_by_key), self.embedding_dimension))
+
+        return self.__vectors
+
+    def __read_embedding_dimension(
+            self):
+        if not os.path.exists(self.__metadata_file_path):
+            return None
+
+        with open(self.__metadata_file_path, 'r', encoding=UTF_8_ENCODING) as metadata_file:
+            return json.load(
+                    metadata_file)['embedding_dimension']
+
+    def __read_rows_by_key(
+            self) \
+            -> dict:
+        if self.embedding_dimension is None:
+            return dict()
+
+        text_keys = list()
+
+        if os.path.exists(self.__keys_file_path):
+            with open(self.__keys_file_path, 'r', encoding=UTF_8_ENCODING) as keys_file:
+                text_keys = keys_file.read().split()
+
+        vector_bytes = 4 * self.embedding_dimension
+
+        number_of_vector_bytes = \
+            os.path.getsize(self.__vectors_file_path) \
+                if os.path.exists(self.__vectors_file_path) else 0
+
+        number_of_rows = min(
+                len(text_keys),
+                number_of_vector_bytes // vector_bytes)
+
+        # Drop a partially written append, so keys and vector rows line up
+        if number_of_rows != len(text_keys) or \
+                number_of_rows * vector_bytes != number_of_vector_bytes:
+            with open(self.__vectors_file_path, 'ab') as vectors_file:
+                vectors_file.truncate(
+                        number_of_rows * vector_bytes)
+
+            with open(self.__keys_file_path, 'w', encoding=UTF_8_ENCODING) as keys_file:
+                keys_file.writelines(
+                        text_key + '\n'
+                        for text_key in text_keys[:number_of_rows])
+
+        return {
+            text_key: row
+            for row, text_key in enumerate(text_keys[:number_of_rows])
+            }
@@ -1,8 +1,47 @@
+import os
+from collections.abc import Mapping
+
 import numpy as np
 
 # TODO: MKh - should we import faiss? - added to requirements faiss-cpu - DONE
 import faiss
 
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.document_store_file_path_getter import (
+    get_document_ids_file_path,
+    get_document_metadata_file_path,
+    get_document_offsets_file_path,
+    get_document_texts_file_path,
+    get_lexical_index_file_path,
+)
+from embeddings.documents_encoder import encode_documents
+from embeddings.embedding_encoder_factories import EmbeddingEncoderFactory
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+from embeddings.embedding_index_factories import EmbeddingIndexFactory
+from embeddings.embedding_index_trainer import train_embedding_index_on_sample
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+from embeddings.index_recall_calculator import calculate_recall_at_k
+from embeddings.objects.bm25_inverted_index import Bm25InvertedIndex
+from embeddings.objects.document_metadata_filter import DocumentMetadataFilter
+from embeddings.objects.document_metadata_store import DocumentMetadataStore
+from embeddings.objects.embedding_cache import EmbeddingCache
+from embeddings.objects.memory_mapped_documents import (
+    MemoryMappedDocuments,
+    MemoryMappedDocumentsWriter,
+)
+
+
+MEMORY_MAPPED_INDEX_IO_FLAGS = \
+    faiss.IO_FLAG_MMAP \
+    | faiss.IO_FLAG_READ_ONLY
+
+# Also maps flat codes (flat, HNSW), but faiss rejects it for IVF indexes
+MEMORY_MAPPED_FLAT_CODES_INDEX_IO_FLAGS = \
+    MEMORY_MAPPED_INDEX_IO_FLAGS \
+    | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+
 
 # TODO: MKh - should we type the parameters? Is there a way of automating this?
 class Embeddings:
@@ -11,43 +50,532 @@ class Embeddings:
             model,
             documents,
             index_file_full_path,
-            file_metadata):
+            file_metadata,
+            document_ids=None,
+            index_type: EmbeddingIndexTypes = EmbeddingIndexTypes.AUTO,
+            training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+            evaluates_recall_at_k: bool = False,
+            embedding_cache: EmbeddingCache = None,
+            builds_lexical_index: bool = False,
+            document_metadata: list = None,
+            encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH,
+            encoder_artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH):
 
         self.model = model
-        
+
+        # Encodes documents and queries: the model itself, or its ONNX export
+        self.encoder_type = encoder_type
+
+        self.encoder = EmbeddingEncoderFactory(
+                encoder_type=encoder_type,
+                artefact_folder_path=encoder_artefact_folder_path).get_encoder(
+                    model)
+
         if len(documents) ==0 :
             raise ValueError("Cannot initialise embeddings with empty documents")
-        
-        self.documents = documents
-        
+
+        # Stable document id -> document text. The ids are the ids stored in
+        # the faiss index, so they stay valid across upserts and deletes.
+        # A mapping (e.g. MemoryMappedDocuments) is used as it is.
+        if isinstance(documents, Mapping):
+            self.documents_by_id = documents
+
+        else:
+            self.documents_by_id = self.__get_documents_by_id(
+                    documents=documents,
+                    document_ids=document_ids)
+
         self.index_file_full_path = index_file_full_path
-        
+
         self.file_metadata = file_metadata
 
-    def create(self):
-        article_embeddings = self.model.encode(
-                self.documents,
-                convert_to_tensor=False)
+        self.index_type = index_type
+
+        self.training_sample_size = training_sample_size
+
+        # Recall@k of the built index against exact flat search, only
+        # calculated for approximate index types when requested
+        self.evaluates_recall_at_k = evaluates_recall_at_k
+
+        self.recall_at_k = None
 
-        # Convert embeddings to a numpy array
-        article_embeddings = np.array(
-                article_embeddings)
+        # Consulted before encoding, so unchanged documents are not re-encoded
+        if embedding_cache is not None and \
+                embedding_cache.encoder_type != encoder_type:
+            raise ValueError(
+                f"Embedding cache holds {embedding_cache.encoder_type.value} embeddings, "
+                f"not {encoder_type.value} ones")
 
+        self.embedding_cache = embedding_cache
+
+        # BM25 index over the same documents, for hybrid retrieval
+        self.builds_lexical_index = builds_lexical_index
+
+        self.lexical_index = None
+
+        # Source path, title, page, chunk offset and date per document, in
+        # document order, for metadata-filtered search
+        if document_metadata is None:
+            self.metadata_store = None
+
+        else:
+            self.metadata_store = DocumentMetadataStore(
+                    document_ids=self.document_ids,
+                    document_metadata=document_metadata)
+
+        self.index = None
+
+        self.is_memory_mapped = False
+
+    @property
+    def documents(
+            self) \
+            -> list:
+        return list(
+                self.documents_by_id.values())
+
+    @property
+    def document_ids(
+            self) \
+            -> np.ndarray:
+        return np.fromiter(
+                self.documents_by_id.keys(),
+                dtype=np.int64,
+                count=len(self.documents_by_id))
+
+    def create(self):
+        article_embeddings = self._encode(
+                self.documents)
 
         embedding_dimension = article_embeddings.shape[1]  # Dimension of embeddings
 
-        self.index = faiss.IndexFlatL2(
-                embedding_dimension)
-        
-        self.index.add(
-                article_embeddings)
+        index_factory = EmbeddingIndexFactory(
+                index_type=self.index_type,
+                embedding_dimension=embedding_dimension,
+                number_of_vectors=len(article_embeddings))
+
+        self.index = index_factory.get_index()
+
+        train_embedding_index_on_sample(
+                index=self.index,
+                embeddings=article_embeddings,
+                training_sample_size=self.training_sample_size)
+
+        self.index.add_with_ids(
+                article_embeddings,
+                self.document_ids)
+
+        if self.builds_lexical_index:
+            self.lexical_index = Bm25InvertedIndex(
+                    self.documents_by_id)
 
-    def save(self):
+        if self.evaluates_recall_at_k and \
+                index_factory.index_type != EmbeddingIndexTypes.FLAT:
+            self.recall_at_k = calculate_recall_at_k(
+                    index=self.index,
+                    embeddings=article_embeddings,
+                    document_ids=self.document_ids)
+
+    def get_filtered_document_ids(
+            self,
+            metadata_filter: DocumentMetadataFilter) \
+            -> np.ndarray:
+        """
+        Ids of the documents whose metadata meets metadata_filter, to
+        restrict a search to.
+        """
+        if self.metadata_store is None:
+            raise ValueError(
+                "Embeddings have no document metadata to filter on")
+
+        return self.metadata_store.get_document_ids(
+                metadata_filter)
+
+    def upsert_documents(
+            self,
+            documents: list,
+            document_ids: list,
+            document_metadata: list = None) \
+            -> int:
+        """
+        Add new documents and re-embed changed ones, leaving the rest of the
+        index untouched. Documents whose text is unchanged are skipped.
+        HNSW indexes (never picked by AUTO) do not support removal, so new
+        documents can be added to them but changed documents cannot be
+        re-embedded. document_metadata, if given, replaces the
+        metadata of all the documents passed.
+
+        Returns the number of documents that were (re-)encoded.
+        """
+        self.__check_index_is_writable()
+
+        if len(document_ids) != len(documents):
+            raise ValueError(
+                "Number of document ids does not match number of documents")
+
+        changed_documents_by_id = {
+            int(document_id): document
+            for document_id, document in zip(document_ids, documents)
+            if self.documents_by_id.get(int(document_id)) != document
+            }
+
+        replaced_document_ids = [
+            document_id
+            for document_id in changed_documents_by_id
+            if document_id in self.documents_by_id
+            ]
+
+        # Checked before anything changes, so a failure leaves the documents,
+        # metadata and index in step
+        if replaced_document_ids:
+            self.__check_index_supports_removal()
+
+        self.__upsert_document_metadata(
+                document_ids=document_ids,
+                document_metadata=document_metadata)
+
+        if not changed_documents_by_id:
+            return 0
+
+        changed_document_ids = np.fromiter(
+                changed_documents_by_id.keys(),
+                dtype=np.int64,
+                count=len(changed_documents_by_id))
+
+        if replaced_document_ids:
+            self.index.remove_ids(
+                    np.array(
+                        replaced_document_ids,
+                        dtype=np.int64))
+
+        self.index.add_with_ids(
+                self._encode(
+                    list(changed_documents_by_id.values())),
+                changed_document_ids)
+
+        self.documents_by_id.update(
+                changed_documents_by_id)
+
+        if self.lexical_index is not None:
+            self.lexical_index.upsert_documents(
+                    changed_documents_by_id)
+
+        return len(changed_documents_by_id)
+
+    def delete_documents(
+            self,
+            document_ids: list) \
+            -> int:
+        """
+        Remove documents from the index and the document store.
+
+        Returns the number of documents removed.
+        """
+        self.__check_index_is_writable()
+
+        existing_document_ids = [
+            int(document_id)
+            for document_id in document_ids
+            if int(document_id) in self.documents_by_id
+            ]
+
+        if not existing_document_ids:
+            return 0
+
+        self.__check_index_supports_removal()
+
+        self.index.remove_ids(
+                np.array(
+                    existing_document_ids,
+                    dtype=np.int64))
+
+        for document_id in existing_document_ids:
+            del self.documents_by_id[document_id]
+
+        if self.metadata_store is not None:
+            self.metadata_store.delete_document_metadata(
+                    existing_document_ids)
+
+        if self.lexical_index is not None:
+            self.lexical_index.delete_documents(
+                    existing_document_ids)
+
+        return len(existing_document_ids)
+
+    def save(
+            self,
+            saves_memory_mappable_documents: bool = False):
         # Save the index and article metadata for later use
         faiss.write_index(
                 self.index,
                 self.index_file_full_path)
 
+        lexical_index_file_path = get_lexical_index_file_path(
+                self.file_metadata)
+
+        if self.lexical_index is not None:
+            self.lexical_index.save(
+                    lexical_index_file_path)
+
+        elif os.path.exists(lexical_index_file_path):
+            os.remove(
+                lexical_index_file_path)
+
+        document_metadata_file_path = get_document_metadata_file_path(
+                self.file_metadata)
+
+        if self.metadata_store is not None:
+            self.metadata_store.save(
+                    document_metadata_file_path)
+
+        elif os.path.exists(document_metadata_file_path):
+            os.remove(
+                document_metadata_file_path)
+
+        if saves_memory_mappable_documents:
+            # One UTF-8 blob plus offsets, instead of a pickled array
+            with MemoryMappedDocumentsWriter(self.file_metadata) as documents_writer:
+                documents_writer.add_documents(
+                        documents=self.documents_by_id.values(),
+                        document_ids=self.documents_by_id.keys())
+
+            # load() prefers the array format, so remove a stale one
+            if os.path.exists(self.file_metadata):
+                os.remove(
+                    self.file_metadata)
+
+            return
+
+        # The texts in the order of the ids file, not indexed by id; read
+        # them back with load(), which pairs them with their ids
         np.save(
                 self.file_metadata,
                 self.documents)
+
+        np.save(
+                get_document_ids_file_path(
+                    self.file_metadata),
+                self.document_ids)
+
+        # Remove stale memory-mappable documents from an earlier save
+        for memory_mappable_documents_file_path in (
+                get_document_texts_file_path(self.file_metadata),
+                get_document_offsets_file_path(self.file_metadata)):
+            if os.path.exists(memory_mappable_documents_file_path):
+                os.remove(
+                    memory_mappable_documents_file_path)
+
+    @classmethod
+    def load(
+            cls,
+            model,
+            index_file_full_path,
+            file_metadata,
+            memory_maps: bool = False,
+            encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH,
+            encoder_artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH):
+        """
+        Load an index saved with save(), together with its id -> document
+        mapping. Indexes saved before ids were persisted fall back to
+        positional ids. Memory-mappable documents are read into memory when
+        there is no documents array.
+
+        With memory_maps, the faiss index and the documents (saved with
+        saves_memory_mappable_documents) are memory-mapped read-only, so
+        retrieval workers share them through the page cache. Memory-mapped
+        embeddings cannot be updated.
+
+        encoder_type must be the one the index was created with, as its
+        embeddings are only approximately equal to the other encoders'.
+        """
+        if memory_maps:
+            embeddings = cls(
+                    model=model,
+                    documents=MemoryMappedDocuments(file_metadata),
+                    index_file_full_path=index_file_full_path,
+                    file_metadata=file_metadata,
+                    encoder_type=encoder_type,
+                    encoder_artefact_folder_path=encoder_artefact_folder_path)
+
+            embeddings.index = cls.__read_memory_mapped_index(
+                    index_file_full_path)
+
+            embeddings.is_memory_mapped = True
+
+            embeddings.__load_lexical_index()
+
+            embeddings.__load_metadata_store()
+
+            return embeddings
+
+        if not os.path.exists(file_metadata):
+            # Saved as memory-mappable documents only, so read them into a dict
+            embeddings = cls(
+                    model=model,
+                    documents=dict(
+                        MemoryMappedDocuments(file_metadata).items()),
+                    index_file_full_path=index_file_full_path,
+                    file_metadata=file_metadata,
+                    encoder_type=encoder_type,
+                    encoder_artefact_folder_path=encoder_artefact_folder_path)
+
+            embeddings.index = faiss.read_index(
+                    index_file_full_path)
+
+            embeddings.__load_lexical_index()
+
+            embeddings.__load_metadata_store()
+
+            return embeddings
+
+        documents = np.load(
+                file_metadata,
+                allow_pickle=True)
+
+        document_ids_file_path = get_document_ids_file_path(
+                file_metadata)
+
+        if os.path.exists(document_ids_file_path):
+            document_ids = np.load(
+                    document_ids_file_path)
+
+        else:
+            document_ids = None
+
+        embeddings = cls(
+                model=model,
+                documents=documents.tolist(),
+                index_file_full_path=index_file_full_path,
+                file_metadata=file_metadata,
+                document_ids=document_ids,
+                encoder_type=encoder_type,
+                encoder_artefact_folder_path=encoder_artefact_folder_path)
+
+        embeddings.index = faiss.read_index(
+                index_file_full_path)
+
+        embeddings.__load_lexical_index()
+
+        embeddings.__load_metadata_store()
+
+        return embeddings
+
+    def _encode(
+            self,
+            documents: list) \
+            -> np.ndarray:
+        return encode_documents(
+                model=self.encoder,
+                documents=documents,
+                embedding_cache=self.embedding_cache)
+
+    def __load_lexical_index(
+            self) \
+            -> None:
+        lexical_index_file_path = get_lexical_index_file_path(
+                self.file_metadata)
+
+        if os.path.exists(lexical_index_file_path):
+            self.lexical_index = Bm25InvertedIndex.load(
+                    lexical_index_file_path)
+
+            self.builds_lexical_index = True
+
+    def __load_metadata_store(
+            self) \
+            -> None:
+        document_metadata_file_path = get_document_metadata_file_path(
+                self.file_metadata)
+
+        if os.path.exists(document_metadata_file_path):
+            self.metadata_store = DocumentMetadataStore.load(
+                    document_metadata_file_path)
+
+    def __upsert_document_metadata(
+            self,
+            document_ids: list,
+            document_metadata: list) \
+            -> None:
+        if document_metadata is None:
+            if self.metadata_store is None:
+                return
+
+            # New documents get empty metadata, existing ones keep theirs
+            document_ids = [
+                document_id
+                for document_id in document_ids
+                if int(document_id) not in self.documents_by_id
+                ]
+
+            document_metadata = [dict()] * len(document_ids)
+
+        elif self.metadata_store is None:
+            self.metadata_store = DocumentMetadataStore(
+                    document_ids=self.document_ids,
+                    document_metadata=[dict()] * len(self.documents_by_id))
+
+        self.metadata_store.upsert_document_metadata(
+                document_ids=document_ids,
+                document_metadata=document_metadata)
+
+    @staticmethod
+    def __read_memory_mapped_index(
+            index_file_full_path: str) \
+            -> faiss.Index:
+        try:
+            return faiss.read_index(
+                    index_file_full_path,
+                    MEMORY_MAPPED_FLAT_CODES_INDEX_IO_FLAGS)
+
+        except RuntimeError:
+            return faiss.read_index(
+                    index_file_full_path,
+                    MEMORY_MAPPED_INDEX_IO_FLAGS)
+
+    @staticmethod
+    def __get_documents_by_id(
+            documents,
+            document_ids) \
+            -> dict:
+        if document_ids is None:
+            document_ids = range(
+                    len(documents))
+
+        if len(document_ids) != len(documents):
+            raise ValueError(
+                "Number of document ids does not match number of documents")
+
+        documents_by_id = dict(
+                zip(
+                    (int(document_id) for document_id in document_ids),
+                    documents))
+
+        if len(documents_by_id) != len(documents):
+            raise ValueError("Document ids must be unique")
+
+        return documents_by_id
+
+    def __check_index_is_writable(
+            self) \
+            -> None:
+        if self.index is None:
+            raise ValueError(
+                "Embeddings index has not been created or loaded")
+
+        if self.is_memory_mapped:
+            raise ValueError(
+                "Memory-mapped embeddings are read-only, load them without memory_maps to update them")
+
+    def __check_index_supports_removal(
+            self) \
+            -> None:
+        index = self.index
+
+        if isinstance(index, faiss.IndexIDMap):
+            index = faiss.downcast_index(
+                    index.index)
+
+        if isinstance(index, faiss.IndexHNSW):
+            raise ValueError(
+                "HNSW embeddings indexes do not support removing documents, create the embeddings with a "
+                "FLAT, IVF or SQ index_type to update or delete documents")
@@ -0,0 +1,196 @@
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from embeddings.document_store_file_path_getter import (
+    get_document_ids_file_path,
+    get_document_offsets_file_path,
+    get_document_texts_file_path,
+)
+
+
+class MemoryMappedDocuments(Mapping):
+    """
+    Read-only document id -> text mapping over one contiguous UTF-8 blob and
+    an offsets array, both memory-mapped. Worker processes that open the same
+    files share a single copy of the corpus through the page cache, and a
+    document is only decoded when it is looked up.
+    """
+
+    def __init__(
+            self,
+            file_metadata: str):
+        texts_file_path = get_document_texts_file_path(
+                file_metadata)
+
+        # np.memmap cannot map an empty file
+        if os.path.getsize(texts_file_path) == 0:
+            self.__texts = np.empty(
+                    0,
+                    dtype=np.uint8)
+
+        else:
+            self.__texts = np.memmap(
+                    texts_file_path,
+                    dtype=np.uint8,
+                    mode='r')
+
+        self.__offsets = np.load(
+                get_document_offsets_file_path(file_metadata),
+                mmap_mode='r')
+
+        self.__document_ids = np.load(
+                get_document_ids_file_path(file_metadata),
+                mmap_mode='r')
+
+        # Positional ids (0..n-1) need no lookup table
+        self.__has_positional_ids = bool(
+                np.array_equal(
+                    self.__document_ids,
+                    np.arange(len(self.__document_ids))))
+
+        if self.__has_positional_ids:
+            self.__sorted_positions = None
+            self.__sorted_document_ids = None
+
+        else:
+            self.__sorted_positions = np.argsort(
+                    self.__document_ids,
+                    kind='stable')
+
+            self.__sorted_document_ids = \
+                self.__document_ids[self.__sorted_positions]
+
+    @property
+    def document_ids(
+            self) \
+            -> np.ndarray:
+        return self.__document_ids
+
+    def get_document_at_position(
+            self,
+            position: int) \
+            -> str:
+        return bytes(
+                self.__texts[self.__offsets[position]: self.__offsets[position + 1]]
+                ).decode(UTF_8_ENCODING)
+
+    def __getitem__(
+            self,
+            document_id: int) \
+            -> str:
+        return self.get_document_at_position(
+                self.__get_position(
+                    int(document_id)))
+
+    def __contains__(
+            self,
+            document_id) \
+            -> bool:
+        try:
+            self.__get_position(
+                int(document_id))
+
+        except KeyError:
+            return False
+
+        return True
+
+    def __iter__(self):
+        for document_id in self.__document_ids:
+            yield int(document_id)
+
+    def __len__(self) \
+            -> int:
+        return len(self.__document_ids)
+
+    def __get_position(
+            self,
+            document_id: int) \
+            -> int:
+        if self.__has_positional_ids:
+            if 0 <= document_id < len(self.__document_ids):
+                return document_id
+
+            raise KeyError(document_id)
+
+        sorted_position = int(
+                np.searchsorted(
+                    self.__sorted_document_ids,
+                    document_id))
+
+        if sorted_position == len(self.__sorted_document_ids) or \
+                self.__sorted_document_ids[sorted_position] != document_id:
+            raise KeyError(document_id)
+
+        return int(self.__sorted_positions[sorted_position])
+
+
+class MemoryMappedDocumentsWriter:
+    """
+    Writes documents in the format read by MemoryMappedDocuments. Documents
+    can be added in batches, so the texts never have to be held in memory
+    all at once.
+    """
+
+    def __init__(
+            self,
+            file_metadata: str):
+        self.file_metadata = file_metadata
+
+        self.__texts_file = open(
+                get_document_texts_file_path(file_metadata),
+                'wb')
+
+        self.__offsets = [0]
+
+        self.__document_ids = list()
+
+    def add_documents(
+            self,
+            documents: list,
+            document_ids: list) \
+            -> None:
+        for document_id, document in zip(document_ids, documents):
+            encoded_document = document.encode(
+                    UTF_8_ENCODING)
+
+            self.__texts_file.write(
+                    encoded_document)
+
+            self.__offsets.append(
+                    self.__offsets[-1] + len(encoded_document))
+
+            self.__document_ids.append(
+                    int(document_id))
+
+    def close(self) \
+            -> None:
+        if self.__texts_file.closed:
+            return
+
+        self.__texts_file.close()
+
+        np.save(
+                get_document_offsets_file_path(self.file_metadata),
+                np.array(
+                    self.__offsets,
+                    dtype=np.int64))
+
+        np.save(
+                get_document_ids_file_path(self.file_metadata),
+                np.array(
+                    self.__document_ids,
+                    dtype=np.int64))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+            self,
+            exc_type,
+            exc_value,
+            traceback):
+        self.close()
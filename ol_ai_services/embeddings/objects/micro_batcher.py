@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+# Put on the queue once per worker to stop it
+STOP_WORKER_ITEM = object()
+
+
+class MicroBatcher:
+    """
+    Gathers items submitted concurrently by many callers into batches for
+    one process_batch call, so e.g. single-query encodes run as one batch.
+
+    A worker waits for an item, then gathers more for up to
+    maximum_wait_seconds or until maximum_batch_size items, and calls
+    process_batch(items), which must return one result per item, in
+    order. Each caller gets a Future for its own result; if process_batch
+    raises, every future of the batch gets the exception.
+    """
+
+    def __init__(
+            self,
+            process_batch,
+            maximum_batch_size: int = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_BATCH_SIZE,
+            maximum_wait_seconds: float = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_WAIT_SECONDS,
+            number_of_workers: int = 1):
+        self.process_batch = process_batch
+
+        self.maximum_batch_size = maximum_batch_size
+
+        self.maximum_wait_seconds = maximum_wait_seconds
+
+        self.number_of_batches = 0
+
+        self.number_of_items = 0
+
+        self.is_closed = False
+
+        self.__item_queue = queue.Queue()
+
+        self.__statistics_lock = threading.Lock()
+
+        self.__workers = [
+            threading.Thread(
+                target=self.__run_worker,
+                name=f"micro-batcher-{worker_number}",
+                daemon=True)
+            for worker_number in range(number_of_workers)
+            ]
+
+        for worker in self.__workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+            self,
+            exception_type,
+            exception,
+            traceback) \
+            -> None:
+        self.close()
+
+    @property
+    def mean_batch_size(
+            self) \
+            -> float:
+        if self.number_of_batches == 0:
+            return 0.0
+
+        return self.number_of_items / self.number_of_batches
+
+    def submit(
+            self,
+            item) \
+            -> Future:
+        if self.is_closed:
+            raise RuntimeError(
+                "Cannot submit to a closed micro-batcher")
+
+        future = Future()
+
+        self.__item_queue.put(
+                (item, future))
+
+        return future
+
+    def close(
+            self) \
+            -> None:
+        """
+        Stop the workers once the items already submitted are processed.
+        """
+        if self.is_closed:
+            return
+
+        self.is_closed = True
+
+        for _ in self.__workers:
+            self.__item_queue.put(
+                    STOP_WORKER_ITEM)
+
+        for worker in self.__workers:
+            worker.join()
+
+    def __run_worker(
+            self) \
+            -> None:
+        while True:
+            queued_item = self.__item_queue.get()
+
+            if queued_item is STOP_WORKER_ITEM:
+                return
+
+            batch = [queued_item]
+
+            deadline = time.monotonic() + self.maximum_wait_seconds
+
+            while len(batch) < self.maximum_batch_size:
+                remaining_wait_seconds = deadline - time.monotonic()
+
+                if remaining_wait_seconds <= 0:
+                    break
+
+                try:
+                    queued_item = self.__item_queue.get(
+                            timeout=remaining_wait_seconds)
+
+                except queue.Empty:
+                    break
+
+                if queued_item is STOP_WORKER_ITEM:
+                    # Leave it for after this batch
+                    self.__item_queue.put(
+                            queued_item)
+
+                    break
+
+                batch.append(
+                        queued_item)
+
+            self.__process_batch(
+                    batch)
+
+    def __process_batch(
+            self,
+            batch: list) \
+            -> None:
+        # Callers may have cancelled while their items were queued
+        batch = [
+            (item, future)
+            for item, future in batch
+            if future.set_running_or_notify_cancel()
+            ]
+
+        if not batch:
+            return
+
+        with self.__statistics_lock:
+            self.number_of_batches += 1
+
+            self.number_of_items += len(batch)
+
+        try:
+            results = self.process_batch(
+                    [item for item, _ in batch])
+
+        except Exception as exception:
+            for _, future in batch:
+                future.set_exception(
+                        exception)
+
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(
+                    result)
@@ -0,0 +1,389 @@
+import hashlib
+import inspect
+import os
+import re
+
+import numpy as np
+import onnxruntime
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers.models import Normalize, Pooling, Transformer
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+LAST_HIDDEN_STATE_OUTPUT_NAME = "last_hidden_state"
+
+ONNX_FILE_EXTENSION = ".onnx"
+
+INT8_ARTEFACT_NAME_SUFFIX = "-int8"
+
+WEIGHTS_FILE_EXTENSIONS = (
+    '.safetensors',
+    '.bin')
+
+SUPPORTED_POOLING_MODES = (
+    'cls',
+    'mean',
+    'max')
+
+# Older sentence-transformers configure pooling with one flag per mode
+POOLING_MODES_BY_CONFIGURATION_NAME = {
+    'pooling_mode_cls_token'  : 'cls',
+    'pooling_mode_mean_tokens': 'mean',
+    'pooling_mode_max_tokens' : 'max'
+    }
+
+
+class OnnxSentenceEncoder:
+    """
+    Runs a sentence-transformer (transformer, pooling and optional
+    normalisation modules) as an ONNX model with onnxruntime on CPU, with
+    the model's encode() interface. Embeddings are always numpy arrays.
+
+    The transformer is exported once, and with quantises also dynamically
+    quantised to int8; the artefacts are cached in artefact_folder_path
+    under the model name and a digest of its configuration and revision
+    (the hub commit, or the sizes and modification times of a local
+    model's weight files), so a changed model is exported again without
+    its weights being hashed on every load. Weights changed in memory and
+    not saved are not detected.
+    """
+
+    def __init__(
+            self,
+            model,
+            artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH,
+            quantises: bool = False,
+            batch_size: int = NfGeneralConfigurations.EMBEDDING_ONNX_BATCH_SIZE,
+            number_of_threads: int = 0):
+        self.model = model
+
+        self.quantises = quantises
+
+        self.batch_size = batch_size
+
+        self.tokenizer = model.tokenizer
+
+        self.max_seq_length = model.max_seq_length
+
+        self.pooling_mode, self.normalises = self.__get_post_processing()
+
+        os.makedirs(
+                artefact_folder_path,
+                exist_ok=True)
+
+        self.artefact_file_path = self.__get_artefact_file_path(
+                artefact_folder_path)
+
+        if not os.path.exists(self.artefact_file_path):
+            self.__export()
+
+        session_options = onnxruntime.SessionOptions()
+
+        # 0 lets onnxruntime use every physical core
+        session_options.intra_op_num_threads = number_of_threads
+
+        self.__session = onnxruntime.InferenceSession(
+                self.artefact_file_path,
+                sess_options=session_options,
+                providers=['CPUExecutionProvider'])
+
+        self.__input_names = [
+            session_input.name
+            for session_input in self.__session.get_inputs()
+            ]
+
+    def get_sentence_embedding_dimension(
+            self) \
+            -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(
+            self,
+            sentences,
+            batch_size: int = None,
+            convert_to_tensor: bool = False,
+            **encode_arguments) \
+            -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode(
+                    [sentences],
+                    batch_size=batch_size)[0]
+
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        if len(sentences) == 0:
+            return np.empty(
+                    (0, self.get_sentence_embedding_dimension()),
+                    dtype=np.float32)
+
+        embeddings = None
+
+        # Longest first, so each batch pads to similar lengths
+        sorted_positions = np.argsort(
+                [-len(sentence) for sentence in sentences],
+                kind='stable')
+
+        for batch_start in range(0, len(sentences), batch_size):
+            batch_positions = sorted_positions[batch_start:batch_start + batch_size]
+
+            batch_embeddings = self.__encode_batch(
+                    [sentences[position] for position in batch_positions])
+
+            if embeddings is None:
+                embeddings = np.empty(
+                        (len(sentences), batch_embeddings.shape[1]),
+                        dtype=np.float32)
+
+            embeddings[batch_positions] = batch_embeddings
+
+        return embeddings
+
+    def __encode_batch(
+            self,
+            sentences: list) \
+            -> np.ndarray:
+        tokens = self.tokenizer(
+                sentences,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np')
+
+        token_embeddings = self.__session.run(
+                [LAST_HIDDEN_STATE_OUTPUT_NAME],
+                {
+                    input_name: tokens[input_name].astype(np.int64)
+                    for input_name in self.__input_names
+                    })[0]
+
+        attention_mask = tokens['attention_mask'][:, :, None].astype(np.float32)
+
+        match self.pooling_mode:
+            case 'cls':
+                sentence_embeddings = token_embeddings[:, 0]
+
+            case 'mean':
+                sentence_embeddings = \
+                    (token_embeddings * attention_mask).sum(axis=1) \
+                    / np.maximum(attention_mask.sum(axis=1), 1e-9)
+
+            case 'max':
+                sentence_embeddings = np.where(
+                        attention_mask > 0,
+                        token_embeddings,
+                        -np.inf).max(axis=1)
+
+        if self.normalises:
+            sentence_embeddings = sentence_embeddings / np.maximum(
+                    np.linalg.norm(sentence_embeddings, axis=1, keepdims=True),
+                    1e-12)
+
+        return sentence_embeddings
+
+    def __get_post_processing(
+            self) \
+            -> tuple:
+        modules = list(
+                self.model)
+
+        if len(modules) not in (2, 3) \
+                or not isinstance(modules[0], Transformer) \
+                or not isinstance(modules[1], Pooling) \
+                or (len(modules) == 3 and not isinstance(modules[2], Normalize)):
+            raise ValueError(
+                f"Unsupported sentence-transformer modules for ONNX encoding: "
+                f"{[type(module).__name__ for module in modules]}")
+
+        pooling_configuration = modules[1].get_config_dict()
+
+        if isinstance(pooling_configuration.get('pooling_mode'), str):
+            pooling_modes = [pooling_configuration['pooling_mode']]
+
+        else:
+            pooling_modes = [
+                POOLING_MODES_BY_CONFIGURATION_NAME.get(name, name)
+                for name, value in pooling_configuration.items()
+                if name.startswith('pooling_mode') and value is True
+                ]
+
+        if len(pooling_modes) != 1 \
+                or pooling_modes[0] not in SUPPORTED_POOLING_MODES:
+            raise ValueError(
+                f"Unsupported pooling for ONNX encoding: {pooling_configuration}")
+
+        return pooling_modes[0], len(modules) == 3
+
+    def __get_artefact_file_path(
+            self,
+            artefact_folder_path: str,
+            quantises: bool = None) \
+            -> str:
+        if quantises is None:
+            quantises = self.quantises
+
+        transformer_model = self.model[0].auto_model
+
+        model_digest = hashlib.blake2b(
+                str(self.max_seq_length).encode(),
+                digest_size=8)
+
+        model_digest.update(
+                transformer_model.config.to_json_string().encode())
+
+        for revision in self.__get_model_revisions(transformer_model.config):
+            model_digest.update(
+                    revision.encode())
+
+        model_name = re.sub(
+                r'[^A-Za-z0-9_.-]',
+                '_',
+                transformer_model.config.name_or_path or 'model')
+
+        artefact_name = f"{model_name}-{model_digest.hexdigest()}"
+
+        if quantises:
+            artefact_name += INT8_ARTEFACT_NAME_SUFFIX
+
+        return os.path.join(
+                artefact_folder_path,
+                artefact_name + ONNX_FILE_EXTENSION)
+
+    @staticmethod
+    def __get_model_revisions(
+            model_configuration) \
+            -> list:
+        """
+        The hub commit the model was downloaded at, or else the names,
+        sizes and modification times of its local weight files.
+        """
+        commit_hash = getattr(
+                model_configuration,
+                '_commit_hash',
+                None)
+
+        if commit_hash:
+            return [commit_hash]
+
+        model_folder_path = model_configuration.name_or_path
+
+        if not model_folder_path or not os.path.isdir(model_folder_path):
+            return []
+
+        model_revisions = list()
+
+        for file_name in sorted(os.listdir(model_folder_path)):
+            if os.path.splitext(file_name)[1] not in WEIGHTS_FILE_EXTENSIONS:
+                continue
+
+            file_status = os.stat(
+                    os.path.join(model_folder_path, file_name))
+
+            model_revisions.append(
+                    f"{file_name}:{file_status.st_size}:{file_status.st_mtime_ns}")
+
+        return model_revisions
+
+    def __export(
+            self) \
+            -> None:
+        float32_artefact_file_path = self.__get_artefact_file_path(
+                os.path.dirname(self.artefact_file_path),
+                quantises=False)
+
+        if not os.path.exists(float32_artefact_file_path):
+            self.__export_float32_model(
+                    float32_artefact_file_path)
+
+        if self.quantises:
+            # Write then rename, so an interrupted export is not cached
+            temporary_artefact_file_path = self.artefact_file_path + '.tmp'
+
+            quantize_dynamic(
+                    float32_artefact_file_path,
+                    temporary_artefact_file_path,
+                    weight_type=QuantType.QInt8)
+
+            os.replace(
+                    temporary_artefact_file_path,
+                    self.artefact_file_path)
+
+    def __export_float32_model(
+            self,
+            artefact_file_path: str) \
+            -> None:
+        transformer_model = self.model[0].auto_model
+
+        sample_tokens = self.tokenizer(
+                ["sample sentence for export", "sample"],
+                padding=True,
+                return_tensors='pt')
+
+        input_names = list(
+                sample_tokens.keys())
+
+        exported_model = _LastHiddenStateModel(
+                transformer_model=transformer_model,
+                input_names=input_names)
+
+        was_training = transformer_model.training
+
+        exported_model.eval()
+
+        export_arguments = dict()
+
+        # Newer torch defaults to the dynamo exporter, which needs onnxscript
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            export_arguments['dynamo'] = False
+
+        temporary_artefact_file_path = artefact_file_path + '.tmp'
+
+        try:
+            with torch.no_grad():
+                torch.onnx.export(
+                        exported_model,
+                        tuple(sample_tokens[input_name] for input_name in input_names),
+                        temporary_artefact_file_path,
+                        input_names=input_names,
+                        output_names=[LAST_HIDDEN_STATE_OUTPUT_NAME],
+                        dynamic_axes={
+                            name: {0: 'batch', 1: 'sequence'}
+                            for name in input_names + [LAST_HIDDEN_STATE_OUTPUT_NAME]
+                            },
+                        opset_version=NfGeneralConfigurations.EMBEDDING_ONNX_OPSET_VERSION,
+                        **export_arguments)
+
+        finally:
+            transformer_model.train(
+                    was_training)
+
+        os.replace(
+                temporary_artefact_file_path,
+                artefact_file_path)
+
+
+class _LastHiddenStateModel(torch.nn.Module):
+    """
+    The transformer taking its inputs positionally, in tokenizer order, and
+    returning only the token embeddings, for export.
+    """
+
+    def __init__(
+            self,
+            transformer_model,
+            input_names: list):
+        super().__init__()
+
+        self.transformer_model = transformer_model
+
+        self.input_names = input_names
+
+    def forward(
+            self,
+            *inputs):
+        return self.transformer_model(
+                **dict(zip(self.input_names, inputs))).last_hidden_state
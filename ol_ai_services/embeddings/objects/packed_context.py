@@ -0,0 +1,33 @@
+class PackedContext:
+    """
+    A prompt context packed into a token budget: the context text, the
+    positions (in rank order) of the documents it includes and of those
+    dropped because they did not fit, and the number of tokens used.
+    """
+
+    def __init__(
+            self,
+            text: str,
+            included_positions: list,
+            dropped_positions: list,
+            number_of_tokens: int,
+            maximum_number_of_tokens: int):
+        self.text = text
+
+        self.included_positions = included_positions
+
+        self.dropped_positions = dropped_positions
+
+        self.number_of_tokens = number_of_tokens
+
+        self.maximum_number_of_tokens = maximum_number_of_tokens
+
+    def to_dictionary(
+            self) \
+            -> dict:
+        return {
+            'included_positions'      : self.included_positions,
+            'dropped_positions'       : self.dropped_positions,
+            'number_of_tokens'        : self.number_of_tokens,
+            'maximum_number_of_tokens': self.maximum_number_of_tokens
+            }
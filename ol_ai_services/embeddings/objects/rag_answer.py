@@ -0,0 +1,40 @@
+class RagAnswer:
+    """
+    The outcome of answering one query over its retrieved context:
+    position is the query's position in the batch, answer is None and
+    error holds the exception when answering failed.
+    """
+
+    def __init__(
+            self,
+            position: int,
+            query: str,
+            answer: str = None,
+            error: Exception = None,
+            number_of_context_tokens: int = 0):
+        self.position = position
+
+        self.query = query
+
+        self.answer = answer
+
+        self.error = error
+
+        self.number_of_context_tokens = number_of_context_tokens
+
+    @property
+    def is_successful(
+            self) \
+            -> bool:
+        return self.error is None
+
+    def to_dictionary(
+            self) \
+            -> dict:
+        return {
+            'position'                : self.position,
+            'query'                   : self.query,
+            'answer'                  : self.answer,
+            'error'                   : None if self.error is None else repr(self.error),
+            'number_of_context_tokens': self.number_of_context_tokens
+            }
@@ -0,0 +1,191 @@
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from configurations.ol_configurations.nf_open_ai_configurations import (
+    NfOpenAiConfigurations,
+)
+from embeddings.concurrent_rag_answerer import (
+    get_responses_using_retrieved_documents_concurrently,
+)
+from embeddings.objects.cross_encoder_reranker import CrossEncoderReranker
+from embeddings.objects.retrieval_client import RetrievalClient
+from embeddings.objects.semantic_answer_cache import SemanticAnswerCache
+from embeddings.search_embedded_documents import (
+    get_response_using_retrieved_document_texts,
+    retrieve_similar_documents_batch,
+    write_retrieved_documents_batch,
+)
+from model_management.model_types import ModelTypes
+
+
+class RagPipeline:
+    """
+    Retrieve-then-generate over a loaded model, index and documents, with
+    the retrieved documents passed to generation in memory.
+
+    Nothing is written to disk unless debug_output_file is given, in which
+    case each call's retrieved documents are written there for inspection.
+    """
+
+    def __init__(
+            self,
+            model,
+            index: faiss.Index,
+            documents,
+            model_name: str = ModelTypes.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO,
+            top_k: int = 5,
+            max_context_tokens: int = NfOpenAiConfigurations.DEFAULT_MAX_TRUNCATE_CONTEXT_TOKENS,
+            reranker: CrossEncoderReranker = None,
+            number_of_candidates: int = NfGeneralConfigurations.RERANKER_NUMBER_OF_CANDIDATES,
+            answer_cache: SemanticAnswerCache = None,
+            maximum_number_of_concurrent_requests: int = NfOpenAiConfigurations.DEFAULT_MAXIMUM_NUMBER_OF_CONCURRENT_REQUESTS,
+            debug_output_file: str = None):
+        # Encodes the queries, so it must be the model the index was built with
+        self.model = model
+
+        self.index = index
+
+        # Document id -> text, e.g. Embeddings.documents_by_id
+        self.documents = documents
+
+        # The generating model
+        self.model_name = model_name
+
+        self.top_k = top_k
+
+        self.max_context_tokens = max_context_tokens
+
+        self.reranker = reranker
+
+        self.number_of_candidates = number_of_candidates
+
+        self.answer_cache = answer_cache
+
+        self.maximum_number_of_concurrent_requests = maximum_number_of_concurrent_requests
+
+        self.debug_output_file = debug_output_file
+
+        # Set by from_retrieval_client to search a RetrievalServer instead
+        self.retrieval_client = None
+
+    @classmethod
+    def from_embeddings(
+            cls,
+            embeddings,
+            **rag_pipeline_arguments):
+        """
+        A pipeline over created or loaded Embeddings.
+        """
+        return cls(
+                model=embeddings.encoder,
+                index=embeddings.index,
+                documents=embeddings.documents_by_id,
+                **rag_pipeline_arguments)
+
+    @classmethod
+    def from_retrieval_client(
+            cls,
+            retrieval_client: RetrievalClient,
+            **rag_pipeline_arguments):
+        """
+        A pipeline retrieving from a warm RetrievalServer, so the model and
+        index are not loaded in this process.
+        """
+        rag_pipeline = cls(
+                model=None,
+                index=None,
+                documents=None,
+                **rag_pipeline_arguments)
+
+        rag_pipeline.retrieval_client = retrieval_client
+
+        return rag_pipeline
+
+    def retrieve(
+            self,
+            queries: list,
+            filter_document_ids: np.ndarray = None) \
+            -> list:
+        if self.retrieval_client is not None:
+            return self.__retrieve_from_retrieval_client(
+                    queries=queries,
+                    filter_document_ids=filter_document_ids)
+
+        return retrieve_similar_documents_batch(
+                queries=queries,
+                model=self.model,
+                index=self.index,
+                documents=self.documents,
+                top_k=self.top_k,
+                output_file=self.debug_output_file,
+                filter_document_ids=filter_document_ids,
+                reranker=self.reranker,
+                number_of_candidates=self.number_of_candidates)
+
+    def answer(
+            self,
+            query: str,
+            filter_document_ids: np.ndarray = None) \
+            -> str:
+        retrieved_documents = self.retrieve(
+                queries=[query],
+                filter_document_ids=filter_document_ids)[0]
+
+        return get_response_using_retrieved_document_texts(
+                query=query,
+                texts=retrieved_documents.texts,
+                model_name=self.model_name,
+                max_context_tokens=self.max_context_tokens,
+                answer_cache=self.answer_cache)
+
+    def answer_many(
+            self,
+            queries: list,
+            filter_document_ids: np.ndarray = None) \
+            -> list:
+        """
+        Answers to queries, in query order, as RagAnswer objects. The
+        queries are retrieved in one batch and answered concurrently; a
+        query that fails carries its error instead of an answer.
+        """
+        retrieved_documents_batch = self.retrieve(
+                queries=queries,
+                filter_document_ids=filter_document_ids)
+
+        return get_responses_using_retrieved_documents_concurrently(
+                [
+                    (retrieved_documents.query, retrieved_documents.texts)
+                    for retrieved_documents in retrieved_documents_batch
+                    ],
+                model_name=self.model_name,
+                max_context_tokens=self.max_context_tokens,
+                maximum_number_of_concurrent_requests=self.maximum_number_of_concurrent_requests,
+                answer_cache=self.answer_cache)
+
+    def __retrieve_from_retrieval_client(
+            self,
+            queries: list,
+            filter_document_ids: np.ndarray) \
+            -> list:
+        retrieved_documents_batch = self.retrieval_client.retrieve_similar_documents_batch(
+                queries=queries,
+                top_k=self.top_k if self.reranker is None else max(self.top_k, self.number_of_candidates),
+                filter_document_ids=filter_document_ids)
+
+        if self.reranker is not None:
+            retrieved_documents_batch = [
+                self.reranker.rerank(
+                    retrieved_documents=retrieved_documents,
+                    top_n=self.top_k)
+                for retrieved_documents in retrieved_documents_batch
+                ]
+
+        if self.debug_output_file:
+            write_retrieved_documents_batch(
+                    retrieved_documents_batch=retrieved_documents_batch,
+                    output_file=self.debug_output_file)
+
+        return retrieved_documents_batch
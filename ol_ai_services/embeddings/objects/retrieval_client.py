@@ -0,0 +1,103 @@
+import json
+import urllib.request
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.objects.retrieval_server import (
+    HEALTH_PATH,
+    JSON_CONTENT_TYPE,
+    SEARCH_PATH,
+    STATISTICS_PATH,
+)
+from embeddings.objects.retrieved_documents import RetrievedDocuments
+
+
+class RetrievalClient:
+    """
+    Client of a RetrievalServer, returning the same RetrievedDocuments as
+    retrieve_similar_documents_batch, so callers can search a warm server
+    instead of loading the model and index themselves.
+    """
+
+    def __init__(
+            self,
+            url: str = f"http://{NfGeneralConfigurations.RETRIEVAL_SERVER_HOST}:{NfGeneralConfigurations.RETRIEVAL_SERVER_PORT}",
+            timeout_seconds: float = 60):
+        self.url = url.rstrip('/')
+
+        self.timeout_seconds = timeout_seconds
+
+    def retrieve_similar_documents_batch(
+            self,
+            queries: list,
+            top_k: int = 5,
+            filter_document_ids: np.ndarray = None) \
+            -> list[RetrievedDocuments]:
+        search_request = {
+            'queries': list(queries),
+            'top_k'  : top_k
+            }
+
+        if filter_document_ids is not None:
+            search_request['filter_document_ids'] = np.asarray(
+                    filter_document_ids,
+                    dtype=np.int64).tolist()
+
+        search_response = self.__get_json_response(
+                path=SEARCH_PATH,
+                request=search_request)
+
+        return [
+            RetrievedDocuments.from_dictionary(
+                result)
+            for result in search_response['results']
+            ]
+
+    def retrieve_similar_documents(
+            self,
+            query: str,
+            top_k: int = 5,
+            filter_document_ids: np.ndarray = None) \
+            -> RetrievedDocuments:
+        return self.retrieve_similar_documents_batch(
+                queries=[query],
+                top_k=top_k,
+                filter_document_ids=filter_document_ids)[0]
+
+    def get_health(
+            self) \
+            -> dict:
+        return self.__get_json_response(
+                path=HEALTH_PATH)
+
+    def get_statistics(
+            self) \
+            -> dict:
+        return self.__get_json_response(
+                path=STATISTICS_PATH)
+
+    def __get_json_response(
+            self,
+            path: str,
+            request: dict = None) \
+            -> dict:
+        if request is None:
+            http_request = urllib.request.Request(
+                    self.url + path)
+
+        else:
+            http_request = urllib.request.Request(
+                    self.url + path,
+                    data=json.dumps(request).encode(UTF_8_ENCODING),
+                    headers={'Content-Type': JSON_CONTENT_TYPE},
+                    method='POST')
+
+        with urllib.request.urlopen(
+                http_request,
+                timeout=self.timeout_seconds) as http_response:
+            return json.loads(
+                    http_response.read().decode(UTF_8_ENCODING))
@@ -0,0 +1,294 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.objects.micro_batcher import MicroBatcher
+from embeddings.retrieval_requests_searcher import search_retrieval_requests
+
+
+HEALTH_PATH = "/health"
+
+STATISTICS_PATH = "/stats"
+
+SEARCH_PATH = "/search"
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+class RetrievalServer:
+    """
+    Local HTTP server keeping loaded Embeddings (model, index and
+    documents) warm across queries.
+
+    POST /search with {"queries": [...], "top_k": 5,
+    "filter_document_ids": [...] (optional)} returns {"results": [...]},
+    one RetrievedDocuments dictionary per query. Queries from concurrent
+    requests are micro-batched into one encode call and one search per
+    distinct filter. GET /health and GET /stats report readiness and
+    request latency and batching statistics.
+    """
+
+    def __init__(
+            self,
+            embeddings,
+            host: str = NfGeneralConfigurations.RETRIEVAL_SERVER_HOST,
+            port: int = NfGeneralConfigurations.RETRIEVAL_SERVER_PORT,
+            maximum_batch_size: int = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_BATCH_SIZE,
+            maximum_wait_seconds: float = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_WAIT_SECONDS,
+            latency_window_size: int = NfGeneralConfigurations.RETRIEVAL_SERVER_LATENCY_WINDOW_SIZE):
+        self.embeddings = embeddings
+
+        self.micro_batcher = MicroBatcher(
+                process_batch=self.__search_retrieval_requests,
+                maximum_batch_size=maximum_batch_size,
+                maximum_wait_seconds=maximum_wait_seconds)
+
+        self.started_at = time.time()
+
+        self.number_of_requests = 0
+
+        self.number_of_failed_requests = 0
+
+        # Latencies of the most recent search requests
+        self.latencies_seconds = deque(
+                maxlen=latency_window_size)
+
+        self.__statistics_lock = threading.Lock()
+
+        self.__http_server = ThreadingHTTPServer(
+                (host, port),
+                _RetrievalRequestHandler)
+
+        self.__http_server.daemon_threads = True
+
+        self.__http_server.retrieval_server = self
+
+        self.__serving_thread = None
+
+    @property
+    def url(
+            self) \
+            -> str:
+        host, port = self.__http_server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def serve_forever(
+            self) \
+            -> None:
+        self.__http_server.serve_forever()
+
+    def start(
+            self) \
+            -> None:
+        """
+        Serve from a background thread, e.g. in tests or notebooks.
+        """
+        self.__serving_thread = threading.Thread(
+                target=self.serve_forever,
+                name="retrieval-server",
+                daemon=True)
+
+        self.__serving_thread.start()
+
+    def shutdown(
+            self) \
+            -> None:
+        self.__http_server.shutdown()
+
+        self.__http_server.server_close()
+
+        self.micro_batcher.close()
+
+        if self.__serving_thread is not None:
+            self.__serving_thread.join()
+
+    def search(
+            self,
+            queries: list,
+            top_k: int,
+            filter_document_ids=None) \
+            -> list:
+        started_at = time.perf_counter()
+
+        try:
+            if filter_document_ids is not None:
+                filter_document_ids = np.asarray(
+                        filter_document_ids,
+                        dtype=np.int64)
+
+            # One item per query, so they batch with other requests' queries
+            futures = [
+                self.micro_batcher.submit(
+                    (query, top_k, filter_document_ids))
+                for query in queries
+                ]
+
+            retrieved_documents_batch = [
+                future.result()
+                for future in futures
+                ]
+
+        except Exception:
+            with self.__statistics_lock:
+                self.number_of_failed_requests += 1
+
+            raise
+
+        with self.__statistics_lock:
+            self.number_of_requests += 1
+
+            self.latencies_seconds.append(
+                    time.perf_counter() - started_at)
+
+        return retrieved_documents_batch
+
+    def get_health(
+            self) \
+            -> dict:
+        return {
+            'status'             : 'ok',
+            'number_of_documents': int(self.embeddings.index.ntotal)
+            }
+
+    def get_statistics(
+            self) \
+            -> dict:
+        with self.__statistics_lock:
+            latencies_milliseconds = np.array(
+                    self.latencies_seconds,
+                    dtype=np.float64) * 1000
+
+            statistics = {
+                'uptime_seconds'           : time.time() - self.started_at,
+                'number_of_requests'       : self.number_of_requests,
+                'number_of_failed_requests': self.number_of_failed_requests,
+                'number_of_queries'        : self.micro_batcher.number_of_items,
+                'number_of_batches'        : self.micro_batcher.number_of_batches,
+                'mean_batch_size'          : self.micro_batcher.mean_batch_size
+                }
+
+        if len(latencies_milliseconds) > 0:
+            statistics['latency_milliseconds'] = {
+                'mean': float(latencies_milliseconds.mean()),
+                'p50' : float(np.percentile(latencies_milliseconds, 50)),
+                'p95' : float(np.percentile(latencies_milliseconds, 95)),
+                'p99' : float(np.percentile(latencies_milliseconds, 99))
+                }
+
+        return statistics
+
+    def __search_retrieval_requests(
+            self,
+            retrieval_requests: list) \
+            -> list:
+        return search_retrieval_requests(
+                model=self.embeddings.encoder,
+                index=self.embeddings.index,
+                documents=self.embeddings.documents_by_id,
+                retrieval_requests=retrieval_requests)
+
+
+class _RetrievalRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        retrieval_server = self.server.retrieval_server
+
+        if self.path == HEALTH_PATH:
+            self.__write_json_response(
+                    200,
+                    retrieval_server.get_health())
+
+        elif self.path == STATISTICS_PATH:
+            self.__write_json_response(
+                    200,
+                    retrieval_server.get_statistics())
+
+        else:
+            self.__write_json_response(
+                    404,
+                    {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != SEARCH_PATH:
+            self.__write_json_response(
+                    404,
+                    {'error': f"Unknown path {self.path}"})
+
+            return
+
+        try:
+            search_request = json.loads(
+                    self.rfile.read(int(self.headers['Content-Length'])).decode(UTF_8_ENCODING))
+
+            queries = search_request['queries']
+
+            top_k = int(
+                    search_request.get('top_k', 5))
+
+        except (KeyError, TypeError, ValueError) as error:
+            self.__write_json_response(
+                    400,
+                    {'error': f"Invalid search request: {error}"})
+
+            return
+
+        try:
+            retrieved_documents_batch = self.server.retrieval_server.search(
+                    queries=queries,
+                    top_k=top_k,
+                    filter_document_ids=search_request.get('filter_document_ids'))
+
+        except Exception as error:
+            self.__write_json_response(
+                    500,
+                    {'error': repr(error)})
+
+            return
+
+        self.__write_json_response(
+                200,
+                {
+                    'results': [
+                        retrieved_documents.to_dictionary()
+                        for retrieved_documents in retrieved_documents_batch
+                        ]
+                    })
+
+    def log_message(
+            self,
+            format,
+            *args):
+        # Per-request access logs would swamp the output under load
+        pass
+
+    def __write_json_response(
+            self,
+            status_code: int,
+            response: dict) \
+            -> None:
+        response_bytes = json.dumps(
+                response).encode(UTF_8_ENCODING)
+
+        self.send_response(
+                status_code)
+
+        self.send_header(
+                'Content-Type',
+                JSON_CONTENT_TYPE)
+
+        self.send_header(
+                'Content-Length',
+                str(len(response_bytes)))
+
+        self.end_headers()
+
+        self.wfile.write(
+                response_bytes)
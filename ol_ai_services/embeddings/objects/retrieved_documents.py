@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class RetrievedDocuments:
+    """
+    The documents retrieved for one query: their ids, their scores and the
+    document texts, in rank order. Vector search scores are L2 distances
+    (lower is closer); fused hybrid and cross-encoder scores are
+    higher-is-better.
+    """
+
+    def __init__(
+            self,
+            query: str,
+            document_ids: np.ndarray,
+            scores: np.ndarray,
+            texts: list):
+        self.query = query
+
+        self.document_ids = document_ids
+
+        self.scores = scores
+
+        self.texts = texts
+
+    def __len__(self) \
+            -> int:
+        return len(self.texts)
+
+    def to_dictionary(
+            self) \
+            -> dict:
+        return {
+            'query'       : self.query,
+            'document_ids': self.document_ids.tolist(),
+            'scores'      : self.scores.tolist(),
+            'texts'       : self.texts
+            }
+
+    @classmethod
+    def from_dictionary(
+            cls,
+            dictionary: dict):
+        return cls(
+                query=dictionary['query'],
+                document_ids=np.array(dictionary['document_ids'], dtype=np.int64),
+                scores=np.array(dictionary['scores'], dtype=np.float32),
+                texts=dictionary['texts'])
@@ -0,0 +1,393 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of LLM answers looked up by query meaning rather than exact text.
+
+    A query is embedded (with a sentence-transformer model) and matched
+    against previously answered queries by cosine similarity; the stored
+    answer is only returned when the similarity is at least
+    similarity_threshold and the answer was given for the same context
+    fingerprint, so answers are not reused after the retrieved context
+    changes. Answers expire after time_to_live_seconds and the least
+    recently used are evicted beyond maximum_number_of_answers.
+
+    With a cache_file_path the cache is loaded from that file, and saved
+    to it every save_interval_number_of_answers new answers and on
+    flush() or close(), so answering does not rewrite the file each time.
+    """
+
+    def __init__(
+            self,
+            model,
+            cache_file_path: str = None,
+            similarity_threshold: float = NfGeneralConfigurations.SEMANTIC_ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            time_to_live_seconds: float = NfGeneralConfigurations.SEMANTIC_ANSWER_CACHE_TIME_TO_LIVE_SECONDS,
+            maximum_number_of_answers: int = NfGeneralConfigurations.SEMANTIC_ANSWER_CACHE_MAXIMUM_NUMBER_OF_ANSWERS,
+            save_interval_number_of_answers: int = NfGeneralConfigurations.SEMANTIC_ANSWER_CACHE_SAVE_INTERVAL_NUMBER_OF_ANSWERS):
+        self.model = model
+
+        self.cache_file_path = cache_file_path
+
+        self.similarity_threshold = similarity_threshold
+
+        self.time_to_live_seconds = time_to_live_seconds
+
+        self.maximum_number_of_answers = maximum_number_of_answers
+
+        self.save_interval_number_of_answers = save_interval_number_of_answers
+
+        self.number_of_cache_hits = 0
+
+        self.number_of_cache_misses = 0
+
+        self.queries = list()
+
+        self.context_fingerprints = list()
+
+        self.answers = list()
+
+        # Buffers grown by doubling, of which the first len(self) rows are
+        # the cached answers': unit-length query embeddings and timestamps
+        self.__query_embeddings_buffer = None
+
+        self.__created_at_buffer = np.empty(
+                0,
+                dtype=np.float64)
+
+        self.__last_used_at_buffer = np.empty(
+                0,
+                dtype=np.float64)
+
+        # Answers added, and whether anything changed, since the last save
+        self.__number_of_unsaved_answers = 0
+
+        self.__has_unsaved_changes = False
+
+        self.__lock = threading.Lock()
+
+        # (query, embedding), so get_answer then add_answer for the same
+        # query encodes it once
+        self.__last_query_and_embedding = (None, None)
+
+        if cache_file_path and os.path.exists(cache_file_path):
+            self.__load()
+
+    def __len__(self) \
+            -> int:
+        return len(self.answers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+            self,
+            exception_type,
+            exception,
+            traceback) \
+            -> None:
+        self.close()
+
+    @property
+    def query_embeddings(
+            self) \
+            -> np.ndarray:
+        if self.__query_embeddings_buffer is None:
+            return None
+
+        return self.__query_embeddings_buffer[:len(self.answers)]
+
+    @property
+    def created_at(
+            self) \
+            -> np.ndarray:
+        return self.__created_at_buffer[:len(self.answers)]
+
+    @property
+    def last_used_at(
+            self) \
+            -> np.ndarray:
+        return self.__last_used_at_buffer[:len(self.answers)]
+
+    @staticmethod
+    def get_context_fingerprint(
+            context: str) \
+            -> str:
+        return hashlib.blake2b(
+                context.encode(UTF_8_ENCODING),
+                digest_size=16).hexdigest()
+
+    def get_answer(
+            self,
+            query: str,
+            context_fingerprint: str):
+        """
+        The cached answer to the most similar earlier query over the same
+        context, or None.
+        """
+        query_embedding = self.__encode(
+                query)
+
+        with self.__lock:
+            self.__remove_expired_answers()
+
+            if not self.answers:
+                self.number_of_cache_misses += 1
+
+                return None
+
+            similarities = self.query_embeddings @ query_embedding
+
+            # Only answers given for the same context can be reused
+            similarities[
+                np.array(self.context_fingerprints) != context_fingerprint] = -np.inf
+
+            best_position = int(
+                    np.argmax(similarities))
+
+            if similarities[best_position] < self.similarity_threshold:
+                self.number_of_cache_misses += 1
+
+                return None
+
+            self.last_used_at[best_position] = time.time()
+
+            self.__has_unsaved_changes = True
+
+            self.number_of_cache_hits += 1
+
+            return self.answers[best_position]
+
+    def add_answer(
+            self,
+            query: str,
+            context_fingerprint: str,
+            answer: str) \
+            -> None:
+        query_embedding = self.__encode(
+                query)
+
+        with self.__lock:
+            self.__remove_expired_answers()
+
+            now = time.time()
+
+            if len(self.answers) >= self.maximum_number_of_answers:
+                # The least recently used answer is evicted by overwriting it
+                position = int(
+                        np.argmin(self.last_used_at))
+
+                self.queries[position] = query
+
+                self.context_fingerprints[position] = context_fingerprint
+
+                self.answers[position] = answer
+
+            else:
+                position = len(self.answers)
+
+                self.__reserve_buffers(
+                        number_of_answers=position + 1,
+                        embedding_dimension=len(query_embedding))
+
+                self.queries.append(
+                        query)
+
+                self.context_fingerprints.append(
+                        context_fingerprint)
+
+                self.answers.append(
+                        answer)
+
+            self.__query_embeddings_buffer[position] = query_embedding
+
+            self.__created_at_buffer[position] = now
+
+            self.__last_used_at_buffer[position] = now
+
+            self.__number_of_unsaved_answers += 1
+
+            self.__has_unsaved_changes = True
+
+            if self.cache_file_path and \
+                    self.__number_of_unsaved_answers >= self.save_interval_number_of_answers:
+                self.__save()
+
+    def flush(
+            self) \
+            -> None:
+        """
+        Save the cache to its cache_file_path if it changed since the last
+        save.
+        """
+        with self.__lock:
+            if self.cache_file_path and self.__has_unsaved_changes:
+                self.__save()
+
+    def close(
+            self) \
+            -> None:
+        self.flush()
+
+    def __reserve_buffers(
+            self,
+            number_of_answers: int,
+            embedding_dimension: int) \
+            -> None:
+        if self.__query_embeddings_buffer is not None and \
+                number_of_answers <= len(self.__query_embeddings_buffer):
+            return
+
+        capacity = max(
+                16,
+                2 * number_of_answers)
+
+        query_embeddings_buffer = np.empty(
+                (capacity, embedding_dimension),
+                dtype=np.float32)
+
+        created_at_buffer = np.empty(
+                capacity,
+                dtype=np.float64)
+
+        last_used_at_buffer = np.empty(
+                capacity,
+                dtype=np.float64)
+
+        number_of_kept_answers = len(self.answers)
+
+        if self.__query_embeddings_buffer is not None:
+            query_embeddings_buffer[:number_of_kept_answers] = self.query_embeddings
+
+        created_at_buffer[:number_of_kept_answers] = self.created_at
+
+        last_used_at_buffer[:number_of_kept_answers] = self.last_used_at
+
+        self.__query_embeddings_buffer = query_embeddings_buffer
+
+        self.__created_at_buffer = created_at_buffer
+
+        self.__last_used_at_buffer = last_used_at_buffer
+
+    def __encode(
+            self,
+            query: str) \
+            -> np.ndarray:
+        last_query, last_query_embedding = self.__last_query_and_embedding
+
+        if query == last_query:
+            return last_query_embedding
+
+        query_embedding = np.asarray(
+                self.model.encode(
+                    [query],
+                    convert_to_tensor=False),
+                dtype=np.float32)[0]
+
+        query_embedding /= max(
+                float(np.linalg.norm(query_embedding)),
+                np.finfo(np.float32).tiny)
+
+        self.__last_query_and_embedding = (query, query_embedding)
+
+        return query_embedding
+
+    def __remove_expired_answers(
+            self) \
+            -> None:
+        unexpired_positions = \
+            self.created_at > time.time() - self.time_to_live_seconds
+
+        if not unexpired_positions.all():
+            self.__keep_answers(
+                    unexpired_positions)
+
+    def __keep_answers(
+            self,
+            kept_positions: np.ndarray) \
+            -> None:
+        number_of_kept_answers = int(
+                kept_positions.sum())
+
+        # Compacted within the buffers, whose capacity is kept
+        self.__query_embeddings_buffer[:number_of_kept_answers] = \
+            self.query_embeddings[kept_positions]
+
+        self.__created_at_buffer[:number_of_kept_answers] = \
+            self.created_at[kept_positions]
+
+        self.__last_used_at_buffer[:number_of_kept_answers] = \
+            self.last_used_at[kept_positions]
+
+        self.__has_unsaved_changes = True
+
+        for texts in (self.queries, self.context_fingerprints, self.answers):
+            texts[:] = [
+                text
+                for text, is_kept in zip(texts, kept_positions)
+                if is_kept
+                ]
+
+    def __save(
+            self) \
+            -> None:
+        texts = json.dumps(
+                {
+                    'queries'             : self.queries,
+                    'context_fingerprints': self.context_fingerprints,
+                    'answers'             : self.answers
+                    })
+
+        os.makedirs(
+                os.path.dirname(self.cache_file_path) or '.',
+                exist_ok=True)
+
+        # Write then rename, so a crash never leaves a truncated cache file
+        temporary_cache_file_path = self.cache_file_path + '.tmp'
+
+        with open(temporary_cache_file_path, 'wb') as cache_file:
+            np.savez(
+                    cache_file,
+                    query_embeddings=self.query_embeddings,
+                    created_at=self.created_at,
+                    last_used_at=self.last_used_at,
+                    texts=np.frombuffer(texts.encode(UTF_8_ENCODING), dtype=np.uint8))
+
+        os.replace(
+                temporary_cache_file_path,
+                self.cache_file_path)
+
+        self.__number_of_unsaved_answers = 0
+
+        self.__has_unsaved_changes = False
+
+    def __load(
+            self) \
+            -> None:
+        with np.load(self.cache_file_path) as arrays:
+            self.__query_embeddings_buffer = arrays['query_embeddings']
+
+            self.__created_at_buffer = arrays['created_at']
+
+            self.__last_used_at_buffer = arrays['last_used_at']
+
+            texts = json.loads(
+                    arrays['texts'].tobytes().decode(UTF_8_ENCODING))
+
+        self.queries = texts['queries']
+
+        self.context_fingerprints = texts['context_fingerprints']
+
+        self.answers = texts['answers']
@@ -0,0 +1,22 @@
+def get_rag_prompt_messages(
+        query: str,
+        context: str) \
+        -> list:
+    # Craft the prompt with query and context
+    prompt = (
+        f"Context: {context}\n\n"
+        f"Based on the provided context, please answer the following question: "
+        f"{query}\n"
+        f"Answer:"
+    )
+
+    return [
+        {
+            "role"   : "system",
+            "content": "You are a helpful assistant."
+            },
+        {
+            "role"   : "user",
+            "content": prompt
+            },
+        ]
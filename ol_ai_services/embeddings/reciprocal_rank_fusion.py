@@ -0,0 +1,33 @@
+import numpy as np
+
+
+DEFAULT_RECIPROCAL_RANK_FUSION_CONSTANT = 60
+
+
+def fuse_rankings_by_reciprocal_rank(
+        rankings: list,
+        top_k: int,
+        rank_constant: int = DEFAULT_RECIPROCAL_RANK_FUSION_CONSTANT) \
+        -> tuple:
+    """
+    Reciprocal-rank fusion of several best-first rankings of document ids:
+    each document scores the sum of 1 / (rank_constant + rank) over the
+    rankings it appears in. Returns the fused top_k ids and scores.
+    """
+    fused_scores_by_document_id = dict()
+
+    for ranking in rankings:
+        for rank, document_id in enumerate(ranking, start=1):
+            document_id = int(document_id)
+
+            fused_scores_by_document_id[document_id] = \
+                fused_scores_by_document_id.get(document_id, 0.0) + 1.0 / (rank_constant + rank)
+
+    fused_document_ids = sorted(
+            fused_scores_by_document_id,
+            key=fused_scores_by_document_id.get,
+            reverse=True)[:top_k]
+
+    return \
+        np.array(fused_document_ids, dtype=np.int64), \
+        np.array([fused_scores_by_document_id[document_id] for document_id in fused_document_ids], dtype=np.float32)
@@ -0,0 +1,237 @@
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+import faiss
+import numpy as np
+
+from configurations.constants import UTF_8_ENCODING
+from configurations.constants import WRITE_ACRONYM
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.documents_encoder import encode_documents
+from embeddings.embedding_index_factories import EmbeddingIndexFactory
+from embeddings.embedding_index_trainer import train_embedding_index_on_sample
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+from embeddings.index_recall_calculator import calculate_recall_at_k
+
+# Unix only, so resident memory is not measured on Windows
+try:
+    import resource
+
+except ImportError:
+    resource = None
+
+
+RETRIEVAL_BENCHMARK_REPORT_VERSION = 1
+
+BENCHMARK_QPS_MINIMUM_SECONDS = 1.0
+
+
+def generate_synthetic_corpus(
+        number_of_documents: int,
+        words_per_document: int = 100,
+        vocabulary_size: int = 20_000,
+        random_seed: int = 0) \
+        -> list:
+    """
+    Documents of Zipf-distributed pseudo-words, so term frequencies (and
+    therefore lexical and embedding neighbourhoods) look like natural text.
+    """
+    random_number_generator = np.random.default_rng(
+            random_seed)
+
+    word_ranks = np.minimum(
+            random_number_generator.zipf(1.2, size=(number_of_documents, words_per_document)),
+            vocabulary_size)
+
+    return [
+        ' '.join(f"w{word_rank}" for word_rank in document_word_ranks)
+        for document_word_ranks in word_ranks
+        ]
+
+
+def run_retrieval_benchmark(
+        model,
+        documents: list,
+        queries: list,
+        index_types: list = None,
+        top_k: int = NfGeneralConfigurations.EMBEDDING_INDEX_RECALL_TOP_K,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+        report_file_path: str = None) \
+        -> dict:
+    """
+    Benchmark every index variant supported by Embeddings on one corpus and
+    query set. Documents and queries are encoded once; then, per index
+    type, the report has build time, index size, resident memory growth,
+    p50/p95 single-query latency, batch QPS and recall@k against exact
+    search. The report is JSON-serialisable and written to report_file_path
+    if given, so it can be diffed between releases.
+    """
+    if index_types is None:
+        index_types = [
+            index_type
+            for index_type in EmbeddingIndexTypes
+            if index_type != EmbeddingIndexTypes.AUTO
+            ]
+
+    start_time = time.perf_counter()
+
+    document_embeddings = encode_documents(
+            model=model,
+            documents=documents)
+
+    encoding_seconds = time.perf_counter() - start_time
+
+    query_embeddings = encode_documents(
+            model=model,
+            documents=queries)
+
+    document_ids = np.arange(
+            len(documents),
+            dtype=np.int64)
+
+    retrieval_benchmark_report = {
+        'report_version'     : RETRIEVAL_BENCHMARK_REPORT_VERSION,
+        'created_at'         : datetime.now(timezone.utc).isoformat(),
+        'environment'        : {
+            'python_version': platform.python_version(),
+            'faiss_version' : faiss.__version__,
+            'numpy_version' : np.__version__,
+            'machine'       : platform.machine(),
+            'cpu_count'     : os.cpu_count()
+            },
+        'number_of_documents': len(documents),
+        'number_of_queries'  : len(queries),
+        'embedding_dimension': int(document_embeddings.shape[1]),
+        'top_k'              : top_k,
+        'encoding'           : {
+            'seconds'              : encoding_seconds,
+            'documents_per_second' : len(documents) / encoding_seconds
+            },
+        'index_types'        : [
+            __benchmark_index_type(
+                index_type=index_type,
+                document_embeddings=document_embeddings,
+                document_ids=document_ids,
+                query_embeddings=query_embeddings,
+                top_k=top_k,
+                training_sample_size=training_sample_size)
+            for index_type in index_types
+            ]
+        }
+
+    if report_file_path:
+        os.makedirs(
+            os.path.dirname(report_file_path) or '.',
+            exist_ok=True)
+
+        with open(report_file_path, WRITE_ACRONYM, encoding=UTF_8_ENCODING) as report_file:
+            json.dump(
+                    retrieval_benchmark_report,
+                    report_file,
+                    indent=2)
+
+    return retrieval_benchmark_report
+
+
+def __benchmark_index_type(
+        index_type: EmbeddingIndexTypes,
+        document_embeddings: np.ndarray,
+        document_ids: np.ndarray,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        training_sample_size: int) \
+        -> dict:
+    resident_memory_bytes_before_build = __get_resident_memory_bytes()
+
+    start_time = time.perf_counter()
+
+    index = EmbeddingIndexFactory(
+            index_type=index_type,
+            embedding_dimension=document_embeddings.shape[1],
+            number_of_vectors=len(document_embeddings)).get_index()
+
+    train_embedding_index_on_sample(
+            index=index,
+            embeddings=document_embeddings,
+            training_sample_size=training_sample_size)
+
+    index.add_with_ids(
+            document_embeddings,
+            document_ids)
+
+    build_seconds = time.perf_counter() - start_time
+
+    resident_memory_bytes_after_build = __get_resident_memory_bytes()
+
+    if resident_memory_bytes_before_build is None:
+        resident_memory_increase_bytes = None
+
+    else:
+        resident_memory_increase_bytes = \
+            resident_memory_bytes_after_build - resident_memory_bytes_before_build
+
+    query_latencies_milliseconds = list()
+
+    for query_embedding in query_embeddings:
+        start_time = time.perf_counter()
+
+        index.search(
+                query_embedding.reshape(1, -1),
+                top_k)
+
+        query_latencies_milliseconds.append(
+                1000 * (time.perf_counter() - start_time))
+
+    # Batch throughput, repeated for long enough to be measurable
+    number_of_batch_queries = 0
+
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < BENCHMARK_QPS_MINIMUM_SECONDS:
+        index.search(
+                query_embeddings,
+                top_k)
+
+        number_of_batch_queries += len(query_embeddings)
+
+    queries_per_second = \
+        number_of_batch_queries / (time.perf_counter() - start_time)
+
+    return {
+        'index_type'                           : index_type.value,
+        'build_seconds'                        : build_seconds,
+        'index_bytes'                          : int(faiss.serialize_index(index).nbytes),
+        'resident_memory_increase_bytes'       : resident_memory_increase_bytes,
+        'p50_query_latency_milliseconds'       : float(np.percentile(query_latencies_milliseconds, 50)),
+        'p95_query_latency_milliseconds'       : float(np.percentile(query_latencies_milliseconds, 95)),
+        'queries_per_second'                   : queries_per_second,
+        'recall_at_k'                          : calculate_recall_at_k(
+            index=index,
+            embeddings=document_embeddings,
+            document_ids=document_ids,
+            top_k=top_k,
+            query_embeddings=query_embeddings)
+        }
+
+
+def __get_resident_memory_bytes() \
+        -> int | None:
+    # Current resident set size on Linux, peak resident set size on other
+    # Unix systems, None on Windows
+    if os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm', 'r') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    if resource is None:
+        return None
+
+    maximum_resident_set_size = resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return maximum_resident_set_size if platform.system() == 'Darwin' else maximum_resident_set_size * 1024
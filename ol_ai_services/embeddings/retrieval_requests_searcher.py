@@ -0,0 +1,56 @@
+import faiss
+import numpy as np
+
+from embeddings.filtered_index_searcher import search_index
+from embeddings.search_embedded_documents import get_retrieved_documents
+
+
+def search_retrieval_requests(
+        model,
+        index: faiss.Index,
+        documents,
+        retrieval_requests: list) \
+        -> list:
+    """
+    Retrieve documents for many (query, top_k, filter_document_ids)
+    requests, with one model.encode call and one search per distinct
+    filter (filter_document_ids None for no filter). Returns one
+    RetrievedDocuments per request, in request order.
+    """
+    query_embeddings = np.asarray(
+            model.encode(
+                [query for query, _, _ in retrieval_requests],
+                convert_to_tensor=False),
+            dtype=np.float32)
+
+    filter_and_positions_by_filter_key = dict()
+
+    for position, (_, _, filter_document_ids) in enumerate(retrieval_requests):
+        filter_key = None \
+            if filter_document_ids is None \
+            else np.asarray(filter_document_ids, dtype=np.int64).tobytes()
+
+        filter_and_positions_by_filter_key.setdefault(
+                filter_key,
+                (filter_document_ids, list()))[1].append(
+                    position)
+
+    retrieved_documents_batch = [None] * len(retrieval_requests)
+
+    for filter_document_ids, positions in filter_and_positions_by_filter_key.values():
+        distances, indices = search_index(
+                index=index,
+                query_embeddings=query_embeddings[positions],
+                top_k=max(retrieval_requests[position][1] for position in positions),
+                document_ids=filter_document_ids)
+
+        for position, query_distances, query_indices in zip(positions, distances, indices):
+            query, top_k, _ = retrieval_requests[position]
+
+            retrieved_documents_batch[position] = get_retrieved_documents(
+                    query=query,
+                    distances=query_distances[:top_k],
+                    indices=query_indices[:top_k],
+                    documents=documents)
+
+    return retrieved_documents_batch
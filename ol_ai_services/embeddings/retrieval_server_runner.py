@@ -0,0 +1,88 @@
+import argparse
+
+from sentence_transformers import SentenceTransformer
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+from embeddings.objects.embeddings import Embeddings
+from embeddings.objects.retrieval_server import RetrievalServer
+
+
+def run_retrieval_server(
+        model_name: str,
+        index_file_full_path: str,
+        file_metadata: str,
+        host: str = NfGeneralConfigurations.RETRIEVAL_SERVER_HOST,
+        port: int = NfGeneralConfigurations.RETRIEVAL_SERVER_PORT,
+        memory_maps: bool = False,
+        maximum_batch_size: int = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_BATCH_SIZE,
+        maximum_wait_seconds: float = NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_WAIT_SECONDS,
+        encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH) \
+        -> None:
+    """
+    Load the sentence-transformer model and the saved embeddings once and
+    serve searches over them until interrupted.
+    """
+    embeddings = Embeddings.load(
+            model=SentenceTransformer(model_name),
+            index_file_full_path=index_file_full_path,
+            file_metadata=file_metadata,
+            memory_maps=memory_maps,
+            encoder_type=encoder_type)
+
+    retrieval_server = RetrievalServer(
+            embeddings=embeddings,
+            host=host,
+            port=port,
+            maximum_batch_size=maximum_batch_size,
+            maximum_wait_seconds=maximum_wait_seconds)
+
+    print(
+        f"Serving {embeddings.index.ntotal} documents at {retrieval_server.url}")
+
+    try:
+        retrieval_server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        retrieval_server.shutdown()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+            description="Serve searches over saved embeddings from a warm model and index.")
+
+    argument_parser.add_argument("model_name")
+
+    argument_parser.add_argument("index_file_full_path")
+
+    argument_parser.add_argument("file_metadata")
+
+    argument_parser.add_argument("--host", default=NfGeneralConfigurations.RETRIEVAL_SERVER_HOST)
+
+    argument_parser.add_argument("--port", type=int, default=NfGeneralConfigurations.RETRIEVAL_SERVER_PORT)
+
+    argument_parser.add_argument("--memory-maps", action="store_true")
+
+    argument_parser.add_argument("--maximum-batch-size", type=int, default=NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_BATCH_SIZE)
+
+    argument_parser.add_argument("--maximum-wait-seconds", type=float, default=NfGeneralConfigurations.MICRO_BATCH_MAXIMUM_WAIT_SECONDS)
+
+    argument_parser.add_argument("--encoder-type", choices=[encoder_type.value for encoder_type in EmbeddingEncoderTypes], default=EmbeddingEncoderTypes.TORCH.value)
+
+    arguments = argument_parser.parse_args()
+
+    run_retrieval_server(
+        model_name=arguments.model_name,
+        index_file_full_path=arguments.index_file_full_path,
+        file_metadata=arguments.file_metadata,
+        host=arguments.host,
+        port=arguments.port,
+        memory_maps=arguments.memory_maps,
+        maximum_batch_size=arguments.maximum_batch_size,
+        maximum_wait_seconds=arguments.maximum_wait_seconds,
+        encoder_type=EmbeddingEncoderTypes(arguments.encoder_type))
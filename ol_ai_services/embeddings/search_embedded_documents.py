@@ -1,5 +1,9 @@
+import json
 import os
 import time
+import warnings
+from collections.abc import Mapping
+
 import numpy as np
 
 
@@ -8,14 +12,25 @@ from langchain_openai import ChatOpenAI
 from bclearer_orchestration_services.reporting_service.wrappers.run_and_log_function_wrapper_latest import run_and_log_function
 from openai import RateLimitError
 
-from configurations.boro_configurations.nf_general_configurations import (
+from configurations.ol_configurations.nf_general_configurations import (
     NfGeneralConfigurations,
 )
 from configurations.ol_configurations.nf_open_ai_configurations import (
     NfOpenAiConfigurations,
 )
+from configurations.constants import DOCUMENT_DELIMITER
 from configurations.constants import UTF_8_ENCODING
 from configurations.constants import WRITE_ACRONYM
+from embeddings.context_packer import pack_context
+from embeddings.document_store_file_path_getter import get_retrieved_queries_file_path
+from embeddings.filtered_index_searcher import search_index
+from embeddings.objects.bm25_inverted_index import Bm25InvertedIndex
+from embeddings.objects.cross_encoder_reranker import CrossEncoderReranker
+from embeddings.objects.retrieved_documents import RetrievedDocuments
+from embeddings.objects.semantic_answer_cache import SemanticAnswerCache
+from embeddings.rag_prompt_messages_getter import get_rag_prompt_messages
+from embeddings.reciprocal_rank_fusion import fuse_rankings_by_reciprocal_rank
+from model_management.model_types import ModelTypes
 
 
 # Initialize rate limiter
@@ -25,6 +40,7 @@ rate_limiter = InMemoryRateLimiter(
     max_bucket_size=10  # Allow for small bursts of requests
 )
 
+
 @run_and_log_function()
 def retrieve_similar_documents(
     query,
@@ -33,23 +49,20 @@ def retrieve_similar_documents(
     documents,
     top_k=5,
     output_file="retrieved_similar_articles.txt",
+    filter_document_ids=None,
+    reranker: CrossEncoderReranker = None,
+    number_of_candidates=NfGeneralConfigurations.RERANKER_NUMBER_OF_CANDIDATES,
 ):
-    # Create an embedding for the query
-    query_embedding = model.encode(
-            [query],
-            convert_to_tensor=False)
+    retrieved_documents = retrieve_similar_documents_batch(
+            queries=[query],
+            model=model,
+            index=index,
+            documents=documents,
+            top_k=top_k,
+            filter_document_ids=filter_document_ids,
+            reranker=reranker,
+            number_of_candidates=number_of_candidates)[0].texts
 
-    # Search for similar articles in the index
-    distances, indices = index.search(
-            np.array(
-                    query_embedding),
-            top_k)
-
-    # Retrieve the top-k articles
-    retrieved_documents = [documents[i] for i in indices[0]]
-    
-    document_delimiter = "\n---\n"
-    
     #TODO: make this a method in the exporter service
     with open(
             output_file,
@@ -57,11 +70,216 @@ def retrieve_similar_documents(
             encoding=UTF_8_ENCODING) as file:
         for document in retrieved_documents:
             file.write(
-                document + document_delimiter
+                document + DOCUMENT_DELIMITER
             )
 
     return retrieved_documents
 
+
+@run_and_log_function()
+def retrieve_similar_documents_batch(
+    queries: list,
+    model,
+    index,
+    documents,
+    top_k: int = 5,
+    output_file: str = None,
+    filter_document_ids: np.ndarray = None,
+    reranker: CrossEncoderReranker = None,
+    number_of_candidates: int = NfGeneralConfigurations.RERANKER_NUMBER_OF_CANDIDATES,
+) -> list[RetrievedDocuments]:
+    """
+    Retrieve the top-k documents for many queries with one model.encode and
+    one index.search call. Results are returned in memory, in query order;
+    they are only written to output_file, once, if it is given.
+    documents maps the index's document ids to texts (e.g.
+    Embeddings.documents_by_id, or load_documents_by_id of a saved
+    documents file); the ids are stable ids, not positions. A positional
+    list of texts is deprecated.
+    filter_document_ids (e.g. from Embeddings.get_filtered_document_ids)
+    restricts the search to those documents.
+
+    With a reranker, number_of_candidates documents are retrieved per
+    query and re-scored by the cross-encoder, keeping the best top_k.
+    """
+    # Create the embeddings for all queries at once
+    query_embeddings = np.asarray(
+            model.encode(
+                queries,
+                convert_to_tensor=False),
+            dtype=np.float32)
+
+    # Search for similar articles in the index
+    distances, indices = search_index(
+            index=index,
+            query_embeddings=query_embeddings,
+            top_k=top_k if reranker is None else max(top_k, number_of_candidates),
+            document_ids=filter_document_ids)
+
+    retrieved_documents_batch = [
+        get_retrieved_documents(
+            query=query,
+            distances=query_distances,
+            indices=query_indices,
+            documents=documents)
+        for query, query_distances, query_indices
+        in zip(queries, distances, indices)
+        ]
+
+    if reranker is not None:
+        retrieved_documents_batch = [
+            reranker.rerank(
+                retrieved_documents=retrieved_documents,
+                top_n=top_k)
+            for retrieved_documents in retrieved_documents_batch
+            ]
+
+    if output_file:
+        write_retrieved_documents_batch(
+            retrieved_documents_batch=retrieved_documents_batch,
+            output_file=output_file)
+
+    return retrieved_documents_batch
+
+
+@run_and_log_function()
+def retrieve_similar_documents_hybrid(
+    query: str,
+    model,
+    index,
+    lexical_index: Bm25InvertedIndex,
+    documents,
+    top_k: int = 5,
+    number_of_candidates: int = 50,
+    output_file: str = None,
+    filter_document_ids: np.ndarray = None,
+) -> RetrievedDocuments:
+    """
+    Hybrid retrieval: the top number_of_candidates documents from vector
+    search and from BM25 lexical search are fused with reciprocal-rank
+    fusion, so exact identifiers missed by dense search still surface.
+    The scores of the result are the fused scores (higher is better).
+    """
+    vector_retrieved_documents = retrieve_similar_documents_batch(
+            queries=[query],
+            model=model,
+            index=index,
+            documents=documents,
+            top_k=number_of_candidates,
+            filter_document_ids=filter_document_ids)[0]
+
+    if filter_document_ids is None:
+        lexical_document_ids, _ = lexical_index.search(
+                query,
+                number_of_candidates)
+
+    else:
+        # BM25 scoring is cheap, so filter a full lexical ranking
+        lexical_document_ids, _ = lexical_index.search(
+                query,
+                len(lexical_index))
+
+        lexical_document_ids = lexical_document_ids[
+            np.isin(
+                lexical_document_ids,
+                filter_document_ids)][:number_of_candidates]
+
+    document_ids, scores = fuse_rankings_by_reciprocal_rank(
+            rankings=[
+                vector_retrieved_documents.document_ids,
+                lexical_document_ids],
+            top_k=top_k)
+
+    retrieved_documents = RetrievedDocuments(
+            query=query,
+            document_ids=document_ids,
+            scores=scores,
+            texts=__get_document_texts(
+                documents=documents,
+                document_ids=document_ids))
+
+    if output_file:
+        write_retrieved_documents_batch(
+            retrieved_documents_batch=[retrieved_documents],
+            output_file=output_file)
+
+    return retrieved_documents
+
+
+def get_retrieved_documents(
+        query: str,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        documents) \
+        -> RetrievedDocuments:
+    # faiss pads missing results with -1
+    found_positions = indices != -1
+
+    document_ids = indices[found_positions]
+
+    return RetrievedDocuments(
+            query=query,
+            document_ids=document_ids,
+            scores=distances[found_positions],
+            texts=__get_document_texts(
+                documents=documents,
+                document_ids=document_ids))
+
+
+def __get_document_texts(
+        documents,
+        document_ids: np.ndarray) \
+        -> list:
+    # Index ids stop being positions once documents are deleted or have
+    # hashed ids, so a positional sequence can return the wrong texts. It is
+    # still read by position, as before ids were stable, for existing callers.
+    if not isinstance(documents, Mapping):
+        warnings.warn(
+            f"Passing documents as a positional {type(documents).__name__} is deprecated, "
+            "pass the id -> text mapping (Embeddings.documents_by_id, or load_documents_by_id "
+            "of the saved documents file) instead",
+            DeprecationWarning,
+            stacklevel=3)
+
+    return [
+        documents[int(document_id)]
+        for document_id in document_ids
+        ]
+
+
+def write_retrieved_documents_batch(
+        retrieved_documents_batch: list[RetrievedDocuments],
+        output_file: str) \
+        -> None:
+    """
+    Write the retrieved documents, in query order, to output_file and the
+    queries to a JSON lines file next to it, each with the number of the
+    documents that are its own. output_file then holds documents only, so
+    it can be read back as a context.
+    """
+    with open(
+            output_file,
+            WRITE_ACRONYM,
+            encoding=UTF_8_ENCODING) as file:
+        for retrieved_documents in retrieved_documents_batch:
+            for document in retrieved_documents.texts:
+                file.write(
+                    document + DOCUMENT_DELIMITER
+                )
+
+    with open(
+            get_retrieved_queries_file_path(output_file),
+            WRITE_ACRONYM,
+            encoding=UTF_8_ENCODING) as queries_file:
+        for retrieved_documents in retrieved_documents_batch:
+            queries_file.write(
+                json.dumps(
+                    {
+                        'query'              : retrieved_documents.query,
+                        'number_of_documents': len(retrieved_documents.texts)
+                        }) + "\n")
+
+
 def truncate_context(
         context,
         max_tokens=NfGeneralConfigurations.DEFAULT_TRUNCATE_CONTEXT_MAX_TOKENS
@@ -73,52 +291,87 @@ def truncate_context(
 # Function to get response using retrieved documents
 def get_response_using_retrieved_documents(
     query,
-    model_name=NfOpenAiConfigurations.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO,
-    input_file="retrieved_articles.txt",
+    model_name=ModelTypes.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO,
+    input_file="retrieved_similar_articles.txt",
     max_context_tokens=NfOpenAiConfigurations.DEFAULT_MAX_TRUNCATE_CONTEXT_TOKENS,
     retries = 3,
     # Number of retries before giving up
-    backoff_factor = 2
+    backoff_factor = 2,
     # Exponential backoff factor
+    answer_cache: SemanticAnswerCache = None
+    # Reuses answers to similar queries over the same context
 ):
-    
+    # Read the retrieved articles from the file
+    with open(input_file, "r", encoding=UTF_8_ENCODING) as file:
+        context = file.read()
+
+    return get_response_using_retrieved_document_texts(
+            query=query,
+            texts=[
+                document
+                for document in context.split(DOCUMENT_DELIMITER)
+                if document.strip()
+                ],
+            model_name=model_name,
+            max_context_tokens=max_context_tokens,
+            retries=retries,
+            backoff_factor=backoff_factor,
+            answer_cache=answer_cache)
+
+
+def get_response_using_retrieved_document_texts(
+    query: str,
+    texts: list,
+    model_name: str = ModelTypes.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO,
+    max_context_tokens: int = NfOpenAiConfigurations.DEFAULT_MAX_TRUNCATE_CONTEXT_TOKENS,
+    retries: int = 3,
+    backoff_factor: int = 2,
+    answer_cache: SemanticAnswerCache = None,
+) -> str:
+    """
+    Answer query over its retrieved document texts, best first (e.g.
+    RetrievedDocuments.texts), passed in memory.
+    """
+    # Pack whole retrieved documents, best first, into max_context_tokens
+    # tokens of the model's encoding
+    packed_context = pack_context(
+            texts=texts,
+            maximum_number_of_tokens=max_context_tokens,
+            model_name=model_name)
+
+    if answer_cache is not None:
+        context_fingerprint = answer_cache.get_context_fingerprint(
+                packed_context.text)
+
+        cached_answer = answer_cache.get_answer(
+                query=query,
+                context_fingerprint=context_fingerprint)
+
+        if cached_answer is not None:
+            return cached_answer
+
     client = ChatOpenAI(
             api_key=os.environ["OPENAI_API_KEY"],
             model=model_name,
             rate_limiter=rate_limiter
             )
-    
-    # Read the retrieved articles from the file
-    with open(input_file, "r", encoding=UTF_8_ENCODING) as file:
-        context = file.read()
 
-    # Truncate the context to fit within the max context tokens
-    truncated_context = truncate_context(
-            context,
-            max_context_tokens)
-
-    # Craft the prompt with query and context
-    prompt = (
-        f"Context: {truncated_context}\n\n"
-        f"Based on the provided context, please answer the following question: "
-        f"{query}\n"
-        f"Answer:"
-    )
+    prompt_messages = get_rag_prompt_messages(
+            query=query,
+            context=packed_context.text)
     
     for attempt in range(
             retries):
         try:
             response = client(
-                    [
-                        {
-                            "role"   : "system",
-                            "content": "You are a helpful assistant."
-                            },
-                        {
-                            "role"   : "user",
-                            "content": prompt
-                            },
-                        ])
+                    prompt_messages)
+
+            if answer_cache is not None:
+                answer_cache.add_answer(
+                        query=query,
+                        context_fingerprint=context_fingerprint,
+                        answer=response.content)
+
             return response.content
         
         except RateLimitError as e:
@@ -0,0 +1,309 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.embedding_encoder_factories import EmbeddingEncoderFactory
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+from embeddings.embedding_index_factories import EmbeddingIndexFactory
+from embeddings.embedding_index_trainer import train_embedding_index_on_sample
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+from embeddings.objects.embeddings import Embeddings
+
+
+SHARD_INDEX_FILE_NAME_FORMAT = "shard_{shard_number:04d}.index"
+
+# Set once per worker process by __initialise_shard_worker
+__shard_worker_encoder = None
+
+
+def build_embeddings_in_shards(
+        model_name: str,
+        documents: list,
+        index_file_full_path: str,
+        file_metadata: str,
+        document_ids: list = None,
+        number_of_workers: int = None,
+        threads_per_worker: int = None,
+        index_type: EmbeddingIndexTypes = EmbeddingIndexTypes.AUTO,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+        model=None,
+        encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH,
+        encoder_artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH) \
+        -> Embeddings:
+    """
+    Build and save embeddings with the corpus split across worker processes.
+
+    Each worker loads its own copy of the sentence-transformer model_name
+    and its encoder_type encoder, with its thread count pinned, encodes one
+    contiguous shard and writes a flat shard index keyed by the global
+    document ids. The shard indexes are then merged, one at a time, into a
+    single index of index_type.
+
+    model is only attached to the returned Embeddings, for later updates;
+    for ONNX encoders model_name is loaded when it is not given, and the
+    encoder is exported once, before the workers start.
+    """
+    if len(documents) == 0:
+        raise ValueError("Cannot initialise embeddings with empty documents")
+
+    if document_ids is None:
+        document_ids = range(
+                len(documents))
+
+    number_of_workers = min(
+            number_of_workers or os.cpu_count(),
+            len(documents))
+
+    if threads_per_worker is None:
+        threads_per_worker = max(
+                1,
+                os.cpu_count() // number_of_workers)
+
+    if model is None and encoder_type != EmbeddingEncoderTypes.TORCH:
+        # Imported here, as for the workers
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(
+                model_name,
+                device='cpu')
+
+    # Builds the encoder, so the workers load an exported ONNX encoder
+    # rather than all exporting it at once
+    embeddings = Embeddings(
+            model=model,
+            documents=documents,
+            index_file_full_path=index_file_full_path,
+            file_metadata=file_metadata,
+            document_ids=document_ids,
+            index_type=index_type,
+            training_sample_size=training_sample_size,
+            encoder_type=encoder_type,
+            encoder_artefact_folder_path=encoder_artefact_folder_path)
+
+    shard_positions = np.array_split(
+            np.arange(len(documents)),
+            number_of_workers)
+
+    with tempfile.TemporaryDirectory() as shard_folder_path:
+        shard_index_file_paths = [
+            os.path.join(
+                shard_folder_path,
+                SHARD_INDEX_FILE_NAME_FORMAT.format(shard_number=shard_number))
+            for shard_number in range(number_of_workers)
+            ]
+
+        # spawn, so every worker starts with a clean torch/OpenMP state
+        with ProcessPoolExecutor(
+                max_workers=number_of_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=__initialise_shard_worker,
+                initargs=(model_name, threads_per_worker, encoder_type, encoder_artefact_folder_path)) as executor:
+            list(
+                executor.map(
+                    __build_shard_index,
+                    shard_index_file_paths,
+                    [[documents[position] for position in positions] for positions in shard_positions],
+                    [[document_ids[position] for position in positions] for positions in shard_positions]))
+
+        index = merge_shard_indexes(
+                shard_index_file_paths=shard_index_file_paths,
+                index_type=index_type,
+                training_sample_size=training_sample_size)
+
+    embeddings.index = index
+
+    embeddings.save()
+
+    return embeddings
+
+
+def merge_shard_indexes(
+        shard_index_file_paths: list,
+        index_type: EmbeddingIndexTypes = EmbeddingIndexTypes.AUTO,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+        random_seed: int = 0) \
+        -> faiss.Index:
+    """
+    Merge flat IndexIDMap shard indexes into one index of index_type,
+    keeping the shard document ids. Shards are read one at a time; index
+    types that need training are trained on a uniform random sample of the
+    vectors of all the shards.
+    """
+    random_number_generator = np.random.default_rng(
+            random_seed)
+
+    number_of_vectors = 0
+
+    training_keys = None
+
+    training_embeddings = None
+
+    for shard_index_file_path in shard_index_file_paths:
+        shard_index = faiss.read_index(
+                shard_index_file_path)
+
+        number_of_vectors += shard_index.ntotal
+
+        shard_embeddings, _ = __get_shard_embeddings(
+                shard_index)
+
+        # Every vector gets a random key, and the sample is the vectors
+        # with the smallest keys so far, so it is uniform over all shards
+        # without holding more than one shard and the sample
+        shard_keys = random_number_generator.random(
+                len(shard_embeddings))
+
+        if training_keys is None:
+            training_keys = shard_keys
+
+            training_embeddings = shard_embeddings
+
+        else:
+            training_keys = np.concatenate(
+                    [training_keys, shard_keys])
+
+            training_embeddings = np.concatenate(
+                    [training_embeddings, shard_embeddings])
+
+        if len(training_keys) > training_sample_size:
+            sample_positions = np.sort(
+                    np.argpartition(
+                        training_keys,
+                        training_sample_size - 1)[:training_sample_size])
+
+            training_keys = training_keys[sample_positions]
+
+            training_embeddings = training_embeddings[sample_positions]
+
+    index = EmbeddingIndexFactory(
+            index_type=index_type,
+            embedding_dimension=training_embeddings.shape[1],
+            number_of_vectors=number_of_vectors).get_index()
+
+    train_embedding_index_on_sample(
+            index=index,
+            embeddings=training_embeddings,
+            training_sample_size=training_sample_size)
+
+    del training_embeddings
+
+    for shard_index_file_path in shard_index_file_paths:
+        shard_embeddings, shard_document_ids = __get_shard_embeddings(
+                faiss.read_index(shard_index_file_path))
+
+        index.add_with_ids(
+                shard_embeddings,
+                shard_document_ids)
+
+    return index
+
+
+def benchmark_sharded_embeddings_build(
+        model_name: str,
+        documents: list,
+        index_file_full_path: str,
+        file_metadata: str,
+        numbers_of_workers: list,
+        threads_per_worker: int = None) \
+        -> dict:
+    """
+    Time a sharded build for each number of workers and report the
+    throughput in documents per second, including model loading.
+    """
+    documents_per_second_by_number_of_workers = dict()
+
+    for number_of_workers in numbers_of_workers:
+        start_time = time.perf_counter()
+
+        build_embeddings_in_shards(
+            model_name=model_name,
+            documents=documents,
+            index_file_full_path=index_file_full_path,
+            file_metadata=file_metadata,
+            number_of_workers=number_of_workers,
+            threads_per_worker=threads_per_worker,
+            index_type=EmbeddingIndexTypes.FLAT)
+
+        documents_per_second_by_number_of_workers[number_of_workers] = \
+            len(documents) / (time.perf_counter() - start_time)
+
+    return documents_per_second_by_number_of_workers
+
+
+def __initialise_shard_worker(
+        model_name: str,
+        threads_per_worker: int,
+        encoder_type: EmbeddingEncoderTypes,
+        encoder_artefact_folder_path: str) \
+        -> None:
+    global __shard_worker_encoder
+
+    for thread_count_variable_name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[thread_count_variable_name] = str(threads_per_worker)
+
+    # Imported here so the thread limits apply before torch initialises
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(
+        threads_per_worker)
+
+    faiss.omp_set_num_threads(
+        threads_per_worker)
+
+    __shard_worker_encoder = EmbeddingEncoderFactory(
+            encoder_type=encoder_type,
+            artefact_folder_path=encoder_artefact_folder_path,
+            number_of_threads=threads_per_worker).get_encoder(
+                SentenceTransformer(
+                    model_name,
+                    device='cpu'))
+
+
+def __build_shard_index(
+        shard_index_file_path: str,
+        documents: list,
+        document_ids: list) \
+        -> str:
+    shard_embeddings = np.asarray(
+            __shard_worker_encoder.encode(
+                documents,
+                convert_to_tensor=False),
+            dtype=np.float32)
+
+    shard_index = faiss.IndexIDMap(
+            faiss.IndexFlatL2(
+                shard_embeddings.shape[1]))
+
+    shard_index.add_with_ids(
+            shard_embeddings,
+            np.array(
+                document_ids,
+                dtype=np.int64))
+
+    faiss.write_index(
+            shard_index,
+            shard_index_file_path)
+
+    return shard_index_file_path
+
+
+def __get_shard_embeddings(
+        shard_index: faiss.Index) \
+        -> tuple:
+    shard_embeddings = shard_index.index.reconstruct_n(
+            0,
+            shard_index.ntotal)
+
+    shard_document_ids = faiss.vector_to_array(
+            shard_index.id_map)
+
+    return shard_embeddings, shard_document_ids
@@ -0,0 +1,25 @@
+import hashlib
+
+from configurations.constants import UTF_8_ENCODING
+
+
+MAXIMUM_FAISS_DOCUMENT_ID = 0x7FFF_FFFF_FFFF_FFFF
+
+
+def get_stable_document_id(
+        document_key: str) \
+        -> int:
+    """
+    Derive a stable, non-negative int64 faiss id from a document key (for
+    example a source path plus chunk number), so that the same document gets
+    the same id on every run.
+    """
+    document_key_digest = \
+        hashlib.blake2b(
+            document_key.encode(UTF_8_ENCODING),
+            digest_size=8).digest()
+
+    return \
+        int.from_bytes(
+            document_key_digest,
+            byteorder='big') & MAXIMUM_FAISS_DOCUMENT_ID
@@ -0,0 +1,199 @@
+import itertools
+import os
+from typing import Callable, Iterable
+
+import faiss
+import numpy as np
+
+from configurations.ol_configurations.nf_general_configurations import (
+    NfGeneralConfigurations,
+)
+from embeddings.document_store_file_path_getter import (
+    get_document_metadata_file_path,
+    get_lexical_index_file_path,
+)
+from embeddings.documents_encoder import encode_documents
+from embeddings.embedding_encoder_factories import EmbeddingEncoderFactory
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+from embeddings.embedding_index_factories import EmbeddingIndexFactory
+from embeddings.embedding_index_trainer import train_embedding_index_on_sample
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+from embeddings.objects.embedding_cache import EmbeddingCache
+from embeddings.objects.embeddings import Embeddings
+from embeddings.objects.memory_mapped_documents import MemoryMappedDocumentsWriter
+
+
+def build_embeddings_from_document_stream(
+        model,
+        documents: Iterable[str],
+        index_file_full_path: str,
+        file_metadata: str,
+        document_ids: Iterable[int] = None,
+        index_type: EmbeddingIndexTypes = EmbeddingIndexTypes.FLAT,
+        expected_number_of_documents: int = None,
+        batch_size: int = NfGeneralConfigurations.EMBEDDING_STREAMING_BATCH_SIZE,
+        training_sample_size: int = NfGeneralConfigurations.EMBEDDING_INDEX_TRAINING_SAMPLE_SIZE,
+        embedding_cache: EmbeddingCache = None,
+        progress_callback: Callable[[int], None] = None,
+        memory_maps: bool = True,
+        encoder_type: EmbeddingEncoderTypes = EmbeddingEncoderTypes.TORCH,
+        encoder_artefact_folder_path: str = NfGeneralConfigurations.EMBEDDING_ONNX_ARTEFACT_FOLDER_PATH) \
+        -> Embeddings:
+    """
+    Build and save embeddings from a document iterator in bounded memory.
+
+    Documents are encoded and added to the index one batch at a time, and
+    their text is spilled to the memory-mappable document store as it goes,
+    so neither the corpus nor the embedding matrix is held in full. Index
+    types that need training buffer only the training sample first.
+    expected_number_of_documents sizes AUTO and IVF indexes.
+
+    progress_callback is called with the number of documents processed
+    after every batch. The saved embeddings are returned loaded, memory-
+    mapped unless memory_maps is False.
+
+    Documents are encoded with the encoder_type encoder of the model, as in
+    Embeddings, and the embeddings are loaded with the same encoder.
+    """
+    if embedding_cache is not None and \
+            embedding_cache.encoder_type != encoder_type:
+        raise ValueError(
+            f"Embedding cache holds {embedding_cache.encoder_type.value} embeddings, "
+            f"not {encoder_type.value} ones")
+
+    encoder = EmbeddingEncoderFactory(
+            encoder_type=encoder_type,
+            artefact_folder_path=encoder_artefact_folder_path).get_encoder(
+                model)
+
+    if document_ids is None:
+        document_ids = itertools.count()
+
+    document_id_and_documents = iter(
+            zip(document_ids, documents))
+
+    index = None
+
+    # Batches held back until the index has enough vectors to be trained
+    pending_document_ids = list()
+
+    pending_embeddings = list()
+
+    number_of_documents = 0
+
+    with MemoryMappedDocumentsWriter(file_metadata) as documents_writer:
+        while True:
+            batch = list(
+                itertools.islice(
+                    document_id_and_documents,
+                    batch_size))
+
+            if not batch:
+                break
+
+            batch_document_ids, batch_documents = zip(*batch)
+
+            documents_writer.add_documents(
+                    documents=batch_documents,
+                    document_ids=batch_document_ids)
+
+            batch_embeddings = encode_documents(
+                    model=encoder,
+                    documents=list(batch_documents),
+                    embedding_cache=embedding_cache)
+
+            if index is None:
+                index = EmbeddingIndexFactory(
+                        index_type=index_type,
+                        embedding_dimension=batch_embeddings.shape[1],
+                        number_of_vectors=expected_number_of_documents or training_sample_size
+                        ).get_index()
+
+            pending_document_ids.extend(
+                    batch_document_ids)
+
+            pending_embeddings.append(
+                    batch_embeddings)
+
+            if index.is_trained or \
+                    len(pending_document_ids) >= training_sample_size:
+                __add_pending_embeddings_to_index(
+                    index=index,
+                    pending_document_ids=pending_document_ids,
+                    pending_embeddings=pending_embeddings,
+                    training_sample_size=training_sample_size)
+
+            number_of_documents += len(batch)
+
+            if progress_callback is not None:
+                progress_callback(
+                    number_of_documents)
+
+    if index is None:
+        raise ValueError("Cannot initialise embeddings with empty documents")
+
+    # Streams shorter than the training sample are trained on all vectors
+    __add_pending_embeddings_to_index(
+        index=index,
+        pending_document_ids=pending_document_ids,
+        pending_embeddings=pending_embeddings,
+        training_sample_size=training_sample_size)
+
+    faiss.write_index(
+            index,
+            index_file_full_path)
+
+    __remove_stale_document_store_files(
+        file_metadata)
+
+    return Embeddings.load(
+            model=model,
+            index_file_full_path=index_file_full_path,
+            file_metadata=file_metadata,
+            memory_maps=memory_maps,
+            encoder_type=encoder_type,
+            encoder_artefact_folder_path=encoder_artefact_folder_path)
+
+
+def __remove_stale_document_store_files(
+        file_metadata: str) \
+        -> None:
+    # An earlier save() to the same paths would otherwise be loaded with the
+    # new index: its documents array (which load() prefers to the memory-
+    # mappable documents), lexical index and document metadata. The ids
+    # file is shared with the memory-mappable documents, so was rewritten.
+    for stale_file_path in (
+            file_metadata,
+            get_lexical_index_file_path(file_metadata),
+            get_document_metadata_file_path(file_metadata)):
+        if os.path.exists(stale_file_path):
+            os.remove(
+                stale_file_path)
+
+
+def __add_pending_embeddings_to_index(
+        index: faiss.Index,
+        pending_document_ids: list,
+        pending_embeddings: list,
+        training_sample_size: int) \
+        -> None:
+    if not pending_embeddings:
+        return
+
+    embeddings = np.concatenate(
+            pending_embeddings)
+
+    train_embedding_index_on_sample(
+            index=index,
+            embeddings=embeddings,
+            training_sample_size=training_sample_size)
+
+    index.add_with_ids(
+            embeddings,
+            np.array(
+                pending_document_ids,
+                dtype=np.int64))
+
+    pending_document_ids.clear()
+
+    pending_embeddings.clear()
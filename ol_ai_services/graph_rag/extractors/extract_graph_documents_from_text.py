@@ -62,9 +62,8 @@ def extract_graph_documents_from_text(
     
     graph_documents = []
     
-    for chunk_dict in chunked_texts.chunked_texts:
-        
-        chunk = chunk_dict['text']
+    # Chunks are sliced from the text one at a time, as they are consumed
+    for chunk in chunked_texts:
         
         doc = Document(
                 page_content=chunk)
@@ -13,4 +13,7 @@ class ModelTypes():
     OLLAMA_MODEL_CODELLAMA = "codellama"
     OLLAMA_MODEL_PHI3 = "phi3"
     OLLAMA_MODEL_GEMMA = "gemma"
-    OLLAMA_MODEL_MIXTRAL = "mixtral"
\ No newline at end of file
+    OLLAMA_MODEL_MIXTRAL = "mixtral"
+
+    # Sentence-transformers cross-encoder models
+    CROSS_ENCODER_MODEL_NAME_MS_MARCO_MINILM_L6 = "cross-encoder/ms-marco-MiniLM-L-6-v2"
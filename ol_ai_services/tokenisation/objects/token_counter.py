@@ -0,0 +1,63 @@
+import numpy as np
+from transformers import AutoTokenizer
+
+from tokenisation.tiktoken_encoding_getter import get_tiktoken_encoding
+from tokenisation.tokeniser_types import TokeniserTypes
+
+
+class TokenCounter:
+    """
+    Counts the tokens of texts with a model's tokeniser, a batch of texts
+    per call. Special tokens are not counted.
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            tokeniser_type: TokeniserTypes = TokeniserTypes.HUGGING_FACE):
+        self.model_name = model_name
+
+        self.tokeniser_type = tokeniser_type
+
+        match tokeniser_type:
+            case TokeniserTypes.HUGGING_FACE:
+                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+            case TokeniserTypes.OPENAI:
+                self.encoding = get_tiktoken_encoding(model_name)
+
+            case _:
+                raise ValueError(f"Unsupported tokeniser type: {tokeniser_type}")
+
+    def count_tokens_batch(
+            self,
+            texts: list) \
+            -> np.ndarray:
+        if len(texts) == 0:
+            return np.empty(
+                    0,
+                    dtype=np.int64)
+
+        if self.tokeniser_type == TokeniserTypes.HUGGING_FACE:
+            token_ids_batch = self.tokenizer(
+                    list(texts),
+                    add_special_tokens=False,
+                    return_attention_mask=False,
+                    return_token_type_ids=False,
+                    verbose=False)['input_ids']
+
+        else:
+            token_ids_batch = self.encoding.encode_ordinary_batch(
+                    list(texts))
+
+        return np.fromiter(
+                (len(token_ids) for token_ids in token_ids_batch),
+                dtype=np.int64,
+                count=len(texts))
+
+    def count_tokens(
+            self,
+            text: str) \
+            -> int:
+        return int(
+                self.count_tokens_batch([text])[0])
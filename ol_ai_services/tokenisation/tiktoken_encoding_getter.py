@@ -0,0 +1,21 @@
+import tiktoken
+
+from configurations.ol_configurations.nf_open_ai_configurations import (
+    NfOpenAiConfigurations,
+)
+
+
+def get_tiktoken_encoding(
+        model_name: str) \
+        -> tiktoken.Encoding:
+    """
+    The tiktoken encoding of an OpenAI model, or the default encoding for
+    models tiktoken does not know (e.g. newer or non-OpenAI models).
+    """
+    try:
+        return tiktoken.encoding_for_model(
+                model_name)
+
+    except KeyError:
+        return tiktoken.get_encoding(
+                NfOpenAiConfigurations.DEFAULT_TIKTOKEN_ENCODING_NAME)
@@ -0,0 +1,328 @@
+import os
+import pytest
+
+from chunking.chunked_texts_getter import get_chunked_texts
+from chunking.chunk_analyser import analyse_chunk_statistics
+from chunking.duplicate_chunks_remover import remove_duplicate_chunks
+from chunking.objects.chunk_spans import ChunkSpans
+from chunking.objects.chunked_texts import ChunkedTexts
+from chunking.objects.texts import Texts
+from chunking.structure_chunker import StructureChunker
+from chunking.token_chunker import TokenChunker
+from text_extraction.document_lexical_structure_extractor import Document, Paragraph, Section, Sentence
+from tokenisation.objects.token_counter import TokenCounter
+
+
+class TestChunkingServices:
+    @pytest.fixture(autouse=True)
+    def setup_method(self,
+                     outputs_folder_absolute_path,
+                     inputs_folder_absolute_path):
+
+        self.pdf_folder = os.path.join(
+                inputs_folder_absolute_path,
+                "pdf/bclearer")
+
+        self.chunked_texts_output_file_path = os.path.join(
+                outputs_folder_absolute_path,
+                "chunking/chunked_texts.json")
+
+    def test_chunking_texts_into_spans(self):
+        source_texts = [
+            "the classification pattern relates a class to its members",
+            "",
+            "short",
+            "the composition pattern relates a whole to its parts"]
+
+        chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=source_texts),
+                chunk_size=16,
+                output_file_path=self.chunked_texts_output_file_path)
+
+        expected_chunks = [
+            source_text[start:start + 16]
+            for source_text in source_texts
+            for start in range(0, len(source_text), 16)
+            ]
+
+        assert list(chunked_texts) == expected_chunks
+
+        assert len(chunked_texts) == len(expected_chunks)
+
+        assert chunked_texts.chunk_spans.document_positions.tolist() == \
+               [0, 0, 0, 0, 2, 3, 3, 3, 3]
+
+        os.makedirs(
+                os.path.dirname(self.chunked_texts_output_file_path),
+                exist_ok=True)
+
+        chunked_texts.export_to_jsonl()
+
+        with open(self.chunked_texts_output_file_path) as chunked_texts_file:
+            assert len(chunked_texts_file.readlines()) == len(expected_chunks)
+
+    def test_chunking_texts_by_tokens(self):
+        source_texts = [
+            "the classification pattern relates a class to its members, "
+            "and the composition pattern relates a whole to its parts",
+            ""]
+
+        token_chunker = TokenChunker(
+                model_name="gpt2",
+                chunk_size=8,
+                chunk_overlap=2)
+
+        chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=source_texts),
+                chunker=token_chunker)
+
+        chunks = list(chunked_texts)
+
+        number_of_tokens_by_chunk = [
+            len(token_chunker.tokenizer(chunk, add_special_tokens=False)['input_ids'])
+            for chunk in chunks
+            ]
+
+        assert len(chunks) > 1
+
+        assert max(number_of_tokens_by_chunk) <= 8
+
+        assert chunks[0].startswith("the classification")
+
+        assert chunks[-1].endswith("to its parts")
+
+        # Consecutive chunks share their overlapping tokens
+        assert (chunked_texts.chunk_spans.starts[1:] < chunked_texts.chunk_spans.ends[:-1]).all()
+
+    def test_chunking_documents_by_structure(self):
+        patterns_section = Section(
+                "Patterns",
+                1)
+
+        patterns_section.paragraphs.append(
+                self.__get_paragraph(
+                    ["Patterns recur across ontologies.", "They are reused."]))
+
+        classification_section = Section(
+                "Classification",
+                2)
+
+        classification_section.paragraphs.extend(
+                [
+                    self.__get_paragraph(
+                        ["A class has members.", "Members are instances of the class."]),
+                    self.__get_paragraph(
+                        ["Classes can be nested.", "A nested class is a subclass.", "Subclasses inherit."])])
+
+        patterns_section.subsections.append(
+                classification_section)
+
+        document = Document()
+
+        document.sections.append(
+                patterns_section)
+
+        structure_chunker = StructureChunker(
+                model_name="gpt2",
+                chunk_size=64)
+
+        source_text, chunk_spans, chunk_heading_paths = \
+            structure_chunker.get_document_chunks(
+                document)
+
+        chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=[source_text]),
+                chunk_spans=ChunkSpans.from_document_chunk_spans(
+                    document_chunk_spans=[chunk_spans],
+                    document_chunk_heading_paths=[chunk_heading_paths]))
+
+        # Both sections would fit in one chunk, but sections are never crossed
+        assert chunked_texts.chunked_texts == [
+            {
+                'text'        : "Patterns recur across ontologies. They are reused.",
+                'heading_path': ["Patterns"]
+                },
+            {
+                'text'        : "A class has members. Members are instances of the class.\n\n"
+                                "Classes can be nested. A nested class is a subclass. Subclasses inherit.",
+                'heading_path': ["Patterns", "Classification"]
+                }]
+
+    def test_chunking_documents_with_sentences_over_the_chunk_size(self):
+        section = Section(
+                "Patterns",
+                1)
+
+        section.paragraphs.append(
+                self.__get_paragraph(
+                    [
+                        "Patterns recur.",
+                        "the classification pattern relates a class to its members, "
+                        "and the composition pattern relates a whole to its parts, "
+                        "and the specialisation pattern relates a class to its subclasses",
+                        "They are reused."]))
+
+        document = Document()
+
+        document.sections.append(
+                section)
+
+        structure_chunker = StructureChunker(
+                model_name="gpt2",
+                chunk_size=8)
+
+        source_text, chunk_spans, chunk_heading_paths = \
+            structure_chunker.get_document_chunks(
+                document)
+
+        chunks = [
+            source_text[start:end]
+            for start, end in chunk_spans
+            ]
+
+        number_of_tokens_by_chunk = \
+            structure_chunker.token_counter.count_tokens_batch(
+                chunks)
+
+        # The long sentence is split into token windows, the others stay whole
+        assert len(chunks) > 3
+
+        assert max(number_of_tokens_by_chunk) <= 8
+
+        assert chunks[0] == "Patterns recur."
+
+        assert chunks[1].startswith("the classification")
+
+        assert chunks[-2].endswith("to its subclasses")
+
+        assert chunks[-1] == "They are reused."
+
+        assert chunk_heading_paths == [["Patterns"]] * len(chunks)
+
+    @staticmethod
+    def __get_paragraph(
+            sentence_texts: list) \
+            -> Paragraph:
+        return Paragraph(
+                " ".join(sentence_texts),
+                [
+                    Sentence(sentence_text, [])
+                    for sentence_text in sentence_texts
+                    ])
+
+    def test_analysing_chunk_statistics(self):
+        chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=[
+                        "classification pattern",
+                        "",
+                        "comp\x00sition\ufffd"]),
+                chunk_size=8)
+
+        chunk_statistics_report = analyse_chunk_statistics(
+                chunked_texts=chunked_texts,
+                token_counter=TokenCounter(
+                    model_name="gpt2"),
+                cost_per_million_tokens=1.0)
+
+        assert chunk_statistics_report.character_lengths.tolist() == [8, 8, 6, 8, 4]
+
+        assert chunk_statistics_report.document_numbers_of_chunks.tolist() == [3, 0, 2]
+
+        assert chunk_statistics_report.whitespace_ratios.tolist() == [0, 1 / 8, 0, 0, 0]
+
+        assert chunk_statistics_report.garbage_ratios.tolist() == [0, 0, 0, 1 / 8, 1 / 4]
+
+        assert not chunk_statistics_report.has_sampled_token_lengths
+
+        assert chunk_statistics_report.projected_number_of_tokens == \
+               chunk_statistics_report.token_lengths.sum()
+
+        assert chunk_statistics_report.projected_cost == \
+               chunk_statistics_report.projected_number_of_tokens / 1_000_000
+
+        chunk_statistics_folder_path = os.path.dirname(
+                self.chunked_texts_output_file_path)
+
+        chunk_statistics_report.export_to_json(
+                os.path.join(chunk_statistics_folder_path, "chunk_statistics.json"))
+
+        chunk_statistics_report.export_to_csv(
+                os.path.join(chunk_statistics_folder_path, "chunk_statistics.csv"))
+
+    def test_chunking_texts_in_parallel(self):
+        source_texts = [
+            "the classification pattern relates a class to its members " * number_of_repeats
+            for number_of_repeats in (40, 1, 0, 200, 3)]
+
+        chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=source_texts),
+                chunk_size=64,
+                output_file_path=self.chunked_texts_output_file_path)
+
+        parallel_chunked_texts = ChunkedTexts(
+                texts=Texts(
+                    source_texts=source_texts),
+                chunk_size=64,
+                output_file_path=self.chunked_texts_output_file_path)
+
+        parallel_chunked_texts.chunk_texts_in_parallel(
+                number_of_workers=2,
+                exports_to_jsonl=True)
+
+        with open(self.chunked_texts_output_file_path) as chunked_texts_file:
+            parallel_chunk_lines = chunked_texts_file.readlines()
+
+        # Same chunks, in document order, as chunking in one process
+        assert parallel_chunked_texts.chunk_spans.document_positions.tolist() == \
+               chunked_texts.chunk_spans.document_positions.tolist()
+
+        assert list(parallel_chunked_texts) == list(chunked_texts)
+
+        chunked_texts.export_to_jsonl()
+
+        with open(self.chunked_texts_output_file_path) as chunked_texts_file:
+            assert parallel_chunk_lines == chunked_texts_file.readlines()
+
+    def test_removing_duplicate_chunks(self):
+        chunked_texts = get_chunked_texts(
+                source_texts_folder_path=self.pdf_folder,
+                chunked_texts_output_file_path=self.chunked_texts_output_file_path)
+
+        number_of_chunks = len(chunked_texts.chunked_texts)
+
+        chunk_deduplication_report = \
+            chunked_texts.remove_duplicate_chunks()
+
+        assert chunk_deduplication_report.number_of_chunks == number_of_chunks
+
+        assert len(chunked_texts.chunked_texts) == \
+               number_of_chunks - chunk_deduplication_report.number_of_dropped_chunks
+
+    def test_removing_near_duplicate_chunks(self):
+        original_text = \
+            "the classification pattern relates a class to its members " \
+            "and is one of the most common patterns in information systems " \
+            "where each member may belong to several classes at once"
+
+        revised_text = original_text.replace(
+                "several",
+                "many")
+
+        unrelated_text = \
+            "a completely different chunk about ontologies of money and " \
+            "virtual currencies which shares almost no shingles with the others"
+
+        chunk_deduplication_report = remove_duplicate_chunks(
+                texts=[original_text, unrelated_text, original_text, revised_text],
+                similarity_threshold=0.7)
+
+        assert chunk_deduplication_report.kept_positions.tolist() == [0, 1]
+
+        assert chunk_deduplication_report.exact_duplicate_of == {2: 0}
+
+        assert chunk_deduplication_report.near_duplicate_of == {3: 0}
@@ -1,14 +1,42 @@
+import asyncio
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+import faiss
 import pytest
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+from sentence_transformers import CrossEncoder, SentenceTransformer
 
+from embeddings.concurrent_rag_answerer import get_responses_using_retrieved_documents_concurrently
+from embeddings.context_packer import pack_context
+from embeddings.document_store_file_path_getter import get_retrieved_queries_file_path
+from embeddings.documents_by_id_loader import load_documents_by_id
+from embeddings.embedding_encoder_types import EmbeddingEncoderTypes
+from embeddings.embedding_index_factories import get_automatic_index_type
+from embeddings.embedding_index_types import EmbeddingIndexTypes
+from embeddings.filtered_index_searcher import search_index
+from embeddings.index_types_comparer import compare_embedding_index_types
+from embeddings.objects.bm25_inverted_index import Bm25InvertedIndex
+from embeddings.objects.cross_encoder_reranker import CrossEncoderReranker
+from embeddings.objects.embedding_broker import EmbeddingBroker
+from embeddings.objects.document_metadata_filter import DocumentMetadataFilter
+from embeddings.objects.embedding_cache import EmbeddingCache
 from embeddings.objects.embeddings import Embeddings
+from embeddings.objects.rag_pipeline import RagPipeline
+from embeddings.objects.retrieval_client import RetrievalClient
+from embeddings.objects.retrieval_server import RetrievalServer
+from embeddings.objects.semantic_answer_cache import SemanticAnswerCache
+from embeddings.sharded_embeddings_builder import build_embeddings_in_shards
+from embeddings.stable_document_id_getter import get_stable_document_id
+from embeddings.streaming_embeddings_builder import build_embeddings_from_document_stream
 from embeddings.search_embedded_documents import (
     retrieve_similar_documents,
+    retrieve_similar_documents_batch,
+    retrieve_similar_documents_hybrid,
     get_response_using_retrieved_documents,
 )
+from configurations.constants import DOCUMENT_DELIMITER, UTF_8_ENCODING
+from model_management.model_types import ModelTypes
 from text_extraction.pdf_folder_extractor import extract_text_from_pdfs_in_folder
 
 
@@ -57,20 +85,430 @@ class TestEmbeddings:
         embedding.create()
         embedding.save()
 
-    def test_querying_embeddings(self):
-        
-        index = faiss.read_index(
-                self.index_file_full_path)
+    @pytest.mark.parametrize(
+            "encoder_type",
+            [EmbeddingEncoderTypes.ONNX, EmbeddingEncoderTypes.ONNX_INT8])
+    def test_embeddings_with_onnx_encoder(
+            self,
+            encoder_type,
+            outputs_folder_absolute_path):
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            encoder_type=encoder_type,
+            encoder_artefact_folder_path=os.path.join(
+                outputs_folder_absolute_path,
+                "onnx_encoders")
+        )
+
+        embedding.create()
+
+        torch_embeddings = self.model.encode(
+                self.articles[:5],
+                convert_to_tensor=False)
+
+        onnx_embeddings = embedding.encoder.encode(
+                self.articles[:5])
+
+        cosine_similarities = np.sum(
+                torch_embeddings * onnx_embeddings,
+                axis=1) / (
+                np.linalg.norm(torch_embeddings, axis=1) * np.linalg.norm(onnx_embeddings, axis=1))
+
+        assert cosine_similarities.min() > 0.98
+
+    def test_comparing_embeddings_index_types(self):
+        article_embeddings = self.model.encode(
+                self.articles)
+
+        index_type_reports = compare_embedding_index_types(
+                embeddings=article_embeddings,
+                index_types=[
+                    EmbeddingIndexTypes.FLAT,
+                    EmbeddingIndexTypes.SQ_FLOAT16,
+                    EmbeddingIndexTypes.SQ_INT8])
+
+        flat_report, float16_report, int8_report = index_type_reports
+
+        assert flat_report['recall_at_k'] == 1.0
+
+        assert int8_report['index_bytes'] < float16_report['index_bytes'] < flat_report['index_bytes']
+
+        for index_type_report in index_type_reports:
+            print(index_type_report)
+
+    def test_incremental_embeddings(self):
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            document_ids=[
+                get_stable_document_id(article)
+                for article in self.articles],
+        )
+
+        embedding.create()
+
+        new_article = \
+            "an ontology is a formal specification of a conceptualisation"
+
+        new_article_id = get_stable_document_id(
+                new_article)
+
+        number_of_encoded_articles = embedding.upsert_documents(
+                self.articles + [new_article],
+                embedding.document_ids.tolist() + [new_article_id])
+
+        assert number_of_encoded_articles == 1
+
+        assert embedding.index.ntotal == len(self.articles) + 1
+
+        number_of_deleted_articles = embedding.delete_documents(
+                [new_article_id])
+
+        assert number_of_deleted_articles == 1
+
+        assert embedding.index.ntotal == len(self.articles)
+
+        assert new_article_id not in embedding.documents_by_id
+
+        # Ids are no longer positions once a document is deleted
+        embedding.delete_documents(
+                [embedding.document_ids[0]])
+
+        retrieved_articles = retrieve_similar_documents_batch(
+                [self.articles[-1]],
+                self.model,
+                embedding.index,
+                embedding.documents_by_id,
+                top_k=1)[0]
+
+        assert retrieved_articles.texts == [self.articles[-1]]
+
+        # Positional documents are deprecated, as they go out of step
+        with pytest.warns(DeprecationWarning):
+            retrieve_similar_documents_batch(
+                    [self.articles[-1]],
+                    self.model,
+                    embedding.index,
+                    embedding.documents)
+
+        embedding.save()
+
+        assert load_documents_by_id(
+                self.file_metadata) == embedding.documents_by_id
+
+    def test_incremental_embeddings_on_hnsw_index(self):
+        # AUTO only picks index types that support removal
+        assert get_automatic_index_type(
+                number_of_vectors=200_000,
+                embedding_dimension=384) == EmbeddingIndexTypes.IVF_FLAT
+
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            index_type=EmbeddingIndexTypes.HNSW,
+            document_metadata=[
+                {'title': str(position)}
+                for position in range(len(self.articles))],
+        )
+
+        embedding.create()
+
+        new_article = \
+            "an ontology is a formal specification of a conceptualisation"
+
+        # New documents can still be added
+        assert embedding.upsert_documents(
+                [new_article],
+                [len(self.articles)]) == 1
+
+        assert embedding.index.ntotal == len(self.articles) + 1
+
+        with pytest.raises(ValueError, match="HNSW"):
+            embedding.upsert_documents(
+                    [new_article + " changed"],
+                    [0],
+                    document_metadata=[{'title': 'changed'}])
+
+        with pytest.raises(ValueError, match="HNSW"):
+            embedding.delete_documents(
+                    [0])
+
+        # Nothing changed by the rejected updates
+        assert embedding.documents_by_id[0] == self.articles[0]
+
+        assert embedding.index.ntotal == len(self.articles) + 1
+
+        assert embedding.get_filtered_document_ids(
+                DocumentMetadataFilter(
+                    titles=['0'])).tolist() == [0]
+
+    @pytest.mark.parametrize(
+            "index_type",
+            [
+                EmbeddingIndexTypes.IVF_FLAT,
+                EmbeddingIndexTypes.IVF_PQ,
+                EmbeddingIndexTypes.HNSW,
+                EmbeddingIndexTypes.SQ_FLOAT16,
+                EmbeddingIndexTypes.SQ_INT8,
+                ])
+    def test_approximate_embeddings_index_types(
+            self,
+            index_type):
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            index_type=index_type,
+            evaluates_recall_at_k=True,
+        )
+
+        embedding.create()
+
+        assert embedding.index.ntotal == len(self.articles)
+
+        print(
+            f"{index_type.value} recall@k: {embedding.recall_at_k}")
+
+    def test_memory_mapped_embeddings(self):
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+        )
+
+        embedding.create()
+        embedding.save(
+                saves_memory_mappable_documents=True)
+
+        memory_mapped_embedding = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                memory_maps=True)
+
+        assert memory_mapped_embedding.index.ntotal == len(self.articles)
+
+        assert memory_mapped_embedding.documents == self.articles
+
+    def test_embeddings_with_embedding_cache(
+            self,
+            outputs_folder_absolute_path):
+        embedding_cache = EmbeddingCache(
+                cache_folder_path=os.path.join(
+                    outputs_folder_absolute_path,
+                    "embeddings/cache"),
+                model_name="all-MiniLM-L6-v2")
+
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            embedding_cache=embedding_cache,
+        )
+
+        embedding.create()
+
+        assert len(embedding_cache) >= len(set(self.articles))
+
+        cached_embeddings = embedding_cache.encode(
+                self.model,
+                self.articles)
+
+        assert np.allclose(
+                cached_embeddings,
+                self.model.encode(self.articles),
+                atol=1e-5)
+
+        # Quantised ONNX vectors are cached apart from the torch ones
+        onnx_int8_embedding_cache = EmbeddingCache(
+                cache_folder_path=os.path.join(
+                    outputs_folder_absolute_path,
+                    "embeddings/cache"),
+                model_name="all-MiniLM-L6-v2",
+                encoder_type=EmbeddingEncoderTypes.ONNX_INT8)
+
+        assert onnx_int8_embedding_cache.model_cache_folder_path != \
+            embedding_cache.model_cache_folder_path
+
+        with pytest.raises(ValueError):
+            Embeddings(
+                model=self.model,
+                documents=self.articles,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                embedding_cache=onnx_int8_embedding_cache,
+            )
+
+    def test_streaming_embeddings(self):
+        numbers_of_processed_articles = list()
+
+        embedding = build_embeddings_from_document_stream(
+                model=self.model,
+                documents=iter(self.articles),
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                batch_size=2,
+                progress_callback=numbers_of_processed_articles.append)
+
+        assert numbers_of_processed_articles[-1] == len(self.articles)
+
+        assert embedding.index.ntotal == len(self.articles)
+
+        assert embedding.documents == self.articles
+
+    def test_streaming_embeddings_with_onnx_encoder(
+            self,
+            outputs_folder_absolute_path):
+        embedding = build_embeddings_from_document_stream(
+                model=self.model,
+                documents=iter(self.articles),
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                batch_size=2,
+                memory_maps=False,
+                encoder_type=EmbeddingEncoderTypes.ONNX_INT8,
+                encoder_artefact_folder_path=os.path.join(
+                    outputs_folder_absolute_path,
+                    "onnx_encoders"))
+
+        assert embedding.encoder_type == EmbeddingEncoderTypes.ONNX_INT8
+
+        # The index holds the quantised encoder's vectors, not the model's
+        distances, document_ids = embedding.index.search(
+                embedding.encoder.encode(
+                    self.articles[:1]),
+                1)
+
+        assert document_ids[0, 0] == 0
+
+        assert distances[0, 0] < 1e-4
+
+    def test_streaming_embeddings_over_saved_embeddings(self):
+        saved_embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            builds_lexical_index=True,
+            document_metadata=[
+                {'title': str(position)}
+                for position in range(len(self.articles))],
+        )
+
+        saved_embedding.create()
+
+        saved_embedding.save()
+
+        streamed_articles = \
+            self.articles[:2]
+
+        for memory_maps in (False, True):
+            embedding = build_embeddings_from_document_stream(
+                    model=self.model,
+                    documents=iter(streamed_articles),
+                    index_file_full_path=self.index_file_full_path,
+                    file_metadata=self.file_metadata,
+                    document_ids=[10, 11],
+                    memory_maps=memory_maps)
+
+            # None of the earlier save's store files are loaded
+            assert embedding.documents_by_id == {10: streamed_articles[0], 11: streamed_articles[1]}
+
+            assert embedding.lexical_index is None
+
+            assert embedding.metadata_store is None
 
-        articles = np.load(
-                self.file_metadata,
-                allow_pickle=True)
+    def test_sharded_embeddings(self):
+        embedding = build_embeddings_in_shards(
+                model_name="all-MiniLM-L6-v2",
+                documents=self.articles,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                number_of_workers=2,
+                model=self.model)
+
+        assert embedding.index.ntotal == len(self.articles)
+
+        assert sorted(embedding.document_ids.tolist()) == \
+               list(range(len(self.articles)))
+
+    def test_sharded_embeddings_with_onnx_encoder(
+            self,
+            outputs_folder_absolute_path):
+        embedding = build_embeddings_in_shards(
+                model_name="all-MiniLM-L6-v2",
+                documents=self.articles,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata,
+                number_of_workers=2,
+                index_type=EmbeddingIndexTypes.FLAT,
+                model=self.model,
+                encoder_type=EmbeddingEncoderTypes.ONNX_INT8,
+                encoder_artefact_folder_path=os.path.join(
+                    outputs_folder_absolute_path,
+                    "onnx_encoders"))
+
+        assert embedding.encoder_type == EmbeddingEncoderTypes.ONNX_INT8
+
+        # The workers encoded with the quantised encoder, not the model
+        distances, document_ids = embedding.index.search(
+                embedding.encoder.encode(
+                    self.articles[-1:]),
+                1)
+
+        assert document_ids[0, 0] == len(self.articles) - 1
+
+        assert distances[0, 0] < 1e-4
+
+    def test_encoding_with_embedding_broker(self):
+        queries = [
+            f"{self.query} {query_number}"
+            for query_number in range(32)
+            ]
+
+        with EmbeddingBroker(
+                model=self.model,
+                maximum_batch_size=16) as embedding_broker:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                query_embeddings = list(
+                        executor.map(
+                            lambda query: embedding_broker.encode([query])[0],
+                            queries))
+
+            statistics = embedding_broker.get_statistics()
+
+        expected_query_embeddings = self.model.encode(
+                queries,
+                convert_to_tensor=False)
+
+        assert np.allclose(
+                np.stack(query_embeddings),
+                expected_query_embeddings,
+                atol=1e-5)
+
+        assert statistics['number_of_batches'] < len(queries)
+
+    def test_querying_embeddings(self):
+        embeddings = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
 
         retrieved_articles = retrieve_similar_documents(
             self.query,
             self.model,
-                index,
-                articles,
+                embeddings.index,
+                embeddings.documents_by_id,
                 output_file=self.retrieved_articles_text_file_path
         )
 
@@ -80,6 +518,283 @@ class TestEmbeddings:
                 f"Article {index + 1}:\n{article[:500]}...\n"
             )
 
+    def test_querying_embeddings_batch(self):
+        embedding = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        queries = [
+            self.query,
+            "what is a conceptual graph",
+            "how is money represented in an ontology"]
+
+        retrieved_articles_batch_text_file_path = \
+            os.path.splitext(self.retrieved_articles_text_file_path)[0] + "_batch.txt"
+
+        retrieved_articles_batch = retrieve_similar_documents_batch(
+                queries,
+                self.model,
+                embedding.index,
+                embedding.documents_by_id,
+                top_k=2,
+                output_file=retrieved_articles_batch_text_file_path)
+
+        assert len(retrieved_articles_batch) == len(queries)
+
+        for retrieved_articles in retrieved_articles_batch:
+            assert retrieved_articles.query in queries
+
+            assert len(retrieved_articles) == \
+                   len(retrieved_articles.document_ids) == \
+                   len(retrieved_articles.scores)
+
+        # The file holds the documents only, the queries are written next to it
+        with open(retrieved_articles_batch_text_file_path, encoding=UTF_8_ENCODING) as retrieved_articles_file:
+            assert [
+                article
+                for article in retrieved_articles_file.read().split(DOCUMENT_DELIMITER)
+                if article.strip()
+                ] == [
+                article
+                for retrieved_articles in retrieved_articles_batch
+                for article in retrieved_articles.texts
+                ]
+
+        with open(get_retrieved_queries_file_path(retrieved_articles_batch_text_file_path), encoding=UTF_8_ENCODING) as retrieved_queries_file:
+            assert [
+                json.loads(line)
+                for line in retrieved_queries_file
+                ] == [
+                {
+                    'query'              : retrieved_articles.query,
+                    'number_of_documents': len(retrieved_articles)
+                    }
+                for retrieved_articles in retrieved_articles_batch
+                ]
+
+    def test_querying_embeddings_hybrid(self):
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            builds_lexical_index=True,
+        )
+
+        embedding.create()
+
+        retrieved_articles = retrieve_similar_documents_hybrid(
+                self.query,
+                self.model,
+                embedding.index,
+                embedding.lexical_index,
+                embedding.documents_by_id,
+                top_k=2)
+
+        assert 0 < len(retrieved_articles) <= 2
+
+        assert list(retrieved_articles.scores) == \
+               sorted(retrieved_articles.scores, reverse=True)
+
+        # The lexical index is updated in place, scoring as if rebuilt
+        new_article = \
+            "a xylographic specification of an ontology"
+
+        embedding.upsert_documents(
+                [new_article],
+                [len(self.articles)])
+
+        embedding.delete_documents(
+                [0])
+
+        rebuilt_lexical_index = Bm25InvertedIndex(
+                embedding.documents_by_id)
+
+        lexical_document_ids, lexical_scores = embedding.lexical_index.search(
+                "xylographic specification",
+                top_k=len(embedding.documents_by_id))
+
+        rebuilt_lexical_document_ids, rebuilt_lexical_scores = rebuilt_lexical_index.search(
+                "xylographic specification",
+                top_k=len(embedding.documents_by_id))
+
+        assert lexical_document_ids[0] == len(self.articles)
+
+        assert set(lexical_document_ids.tolist()) == set(rebuilt_lexical_document_ids.tolist())
+
+        assert np.allclose(
+                np.sort(lexical_scores),
+                np.sort(rebuilt_lexical_scores))
+
+    def test_querying_embeddings_with_metadata_filter(self):
+        article_metadata = [
+            {
+                'source_path': f"pdf/accounting/article_{index}.pdf",
+                'title'      : f"Article {index}",
+                'page'       : index
+                }
+            for index in range(len(self.articles))
+            ]
+
+        embedding = Embeddings(
+            model=self.model,
+            documents=self.articles,
+            index_file_full_path=self.index_file_full_path,
+            file_metadata=self.file_metadata,
+            document_metadata=article_metadata,
+        )
+
+        embedding.create()
+        embedding.save()
+
+        embedding = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        filtered_document_ids = embedding.get_filtered_document_ids(
+                DocumentMetadataFilter(
+                    titles=["Article 1"]))
+
+        retrieved_articles = retrieve_similar_documents_batch(
+                [self.query],
+                self.model,
+                embedding.index,
+                embedding.documents_by_id,
+                top_k=2,
+                filter_document_ids=filtered_document_ids)[0]
+
+        assert retrieved_articles.document_ids.tolist() == [1]
+
+        assert embedding.metadata_store.get_document_metadata(1)['title'] == "Article 1"
+
+    def test_searching_filtered_index_without_id_map(self):
+        article_embeddings = self.model.encode(
+                self.articles)
+
+        # Keyed by position, as faiss indexes without an IndexIDMap are
+        index = faiss.IndexHNSWFlat(
+                article_embeddings.shape[1],
+                16)
+
+        index.add(
+                article_embeddings)
+
+        _, document_ids = search_index(
+                index=index,
+                query_embeddings=self.model.encode(
+                    [self.query]),
+                top_k=2,
+                document_ids=[1])
+
+        assert document_ids.tolist() == [[1, -1]]
+
+    def test_querying_embeddings_reranked(self):
+        embedding = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        reranker = CrossEncoderReranker(
+                CrossEncoder(
+                    ModelTypes.CROSS_ENCODER_MODEL_NAME_MS_MARCO_MINILM_L6))
+
+        retrieved_articles = retrieve_similar_documents_batch(
+                [self.query],
+                self.model,
+                embedding.index,
+                embedding.documents_by_id,
+                top_k=2,
+                reranker=reranker,
+                number_of_candidates=len(self.articles))[0]
+
+        assert len(retrieved_articles) == min(2, len(self.articles))
+
+        assert list(retrieved_articles.scores) == \
+               sorted(retrieved_articles.scores, reverse=True)
+
+        # Re-ranking the same candidates again is answered from the cache
+        number_of_cache_misses = reranker.number_of_cache_misses
+
+        retrieve_similar_documents_batch(
+                [self.query],
+                self.model,
+                embedding.index,
+                embedding.documents_by_id,
+                top_k=2,
+                reranker=reranker,
+                number_of_candidates=len(self.articles))
+
+        assert reranker.number_of_cache_misses == number_of_cache_misses
+
+    def test_packing_context_into_token_budget(self):
+        embeddings = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        retrieved_documents = retrieve_similar_documents_batch(
+            [self.query],
+            self.model,
+            embeddings.index,
+            embeddings.documents_by_id
+        )[0]
+
+        packed_context = pack_context(
+                texts=retrieved_documents.texts,
+                maximum_number_of_tokens=2000,
+                model_name=ModelTypes.OPEN_AI_MODEL_NAME_GPT_3_5_TURBO)
+
+        assert packed_context.number_of_tokens <= 2000
+
+        assert len(packed_context.included_positions) + len(packed_context.dropped_positions) == \
+            len(retrieved_documents)
+
+        for position in packed_context.included_positions:
+            assert retrieved_documents.texts[position] in packed_context.text
+
+    def test_querying_retrieval_server(self):
+        embeddings = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        retrieval_server = RetrievalServer(
+                embeddings=embeddings,
+                port=0)
+
+        retrieval_server.start()
+
+        try:
+            retrieval_client = RetrievalClient(
+                    retrieval_server.url)
+
+            assert retrieval_client.get_health()['status'] == 'ok'
+
+            retrieved_documents = retrieval_client.retrieve_similar_documents(
+                    self.query,
+                    top_k=5)
+
+            expected_retrieved_documents = retrieve_similar_documents_batch(
+                [self.query],
+                self.model,
+                embeddings.index,
+                embeddings.documents_by_id
+            )[0]
+
+            assert retrieved_documents.document_ids.tolist() == \
+                expected_retrieved_documents.document_ids.tolist()
+
+            statistics = retrieval_client.get_statistics()
+
+            assert statistics['number_of_queries'] == 1
+
+            print(statistics)
+
+        finally:
+            retrieval_server.shutdown()
+
     def test_rag_response(self):
 
         response = get_response_using_retrieved_documents(
@@ -88,3 +803,108 @@ class TestEmbeddings:
         )
 
         print(response)
+
+    def test_rag_responses_concurrently(self):
+        embeddings = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        queries = [
+            self.query,
+            "what is an accounting ledger",
+            "how are financial transactions recorded"
+            ]
+
+        retrieved_documents_batch = retrieve_similar_documents_batch(
+            queries,
+            self.model,
+            embeddings.index,
+            embeddings.documents_by_id
+        )
+
+        rag_answers = get_responses_using_retrieved_documents_concurrently(
+            [
+                (retrieved_documents.query, retrieved_documents.texts)
+                for retrieved_documents in retrieved_documents_batch
+                ],
+            maximum_number_of_concurrent_requests=2
+        )
+
+        assert [rag_answer.query for rag_answer in rag_answers] == queries
+
+        for rag_answer in rag_answers:
+            assert rag_answer.is_successful, rag_answer.error
+
+            print(rag_answer.answer)
+
+    def test_getting_responses_concurrently_in_running_event_loop(self):
+        async def get_responses_in_event_loop():
+            return get_responses_using_retrieved_documents_concurrently(
+                    [(self.query, self.articles[:1])])
+
+        # The synchronous wrapper cannot start its own event loop there
+        with pytest.raises(RuntimeError, match="running event loop"):
+            asyncio.run(
+                get_responses_in_event_loop())
+
+    def test_rag_pipeline(self):
+        embeddings = Embeddings.load(
+                model=self.model,
+                index_file_full_path=self.index_file_full_path,
+                file_metadata=self.file_metadata)
+
+        rag_pipeline = RagPipeline.from_embeddings(
+                embeddings,
+                top_k=3)
+
+        response = rag_pipeline.answer(
+                self.query)
+
+        print(response)
+
+        rag_answers = rag_pipeline.answer_many(
+                [self.query, "what is an accounting ledger"])
+
+        for rag_answer in rag_answers:
+            assert rag_answer.is_successful, rag_answer.error
+
+    def test_rag_response_with_semantic_answer_cache(
+            self,
+            outputs_folder_absolute_path):
+        answer_cache_file_path = os.path.join(
+                outputs_folder_absolute_path,
+                "embeddings/semantic_answer_cache.npz")
+
+        if os.path.exists(answer_cache_file_path):
+            os.remove(answer_cache_file_path)
+
+        answer_cache = SemanticAnswerCache(
+                model=self.model,
+                cache_file_path=answer_cache_file_path,
+                similarity_threshold=0.9)
+
+        response = get_response_using_retrieved_documents(
+            self.query,
+            input_file=self.retrieved_articles_text_file_path,
+            answer_cache=answer_cache
+        )
+
+        reworded_response = get_response_using_retrieved_documents(
+            "Describe the different types of ontologies in computing.",
+            input_file=self.retrieved_articles_text_file_path,
+            answer_cache=answer_cache
+        )
+
+        assert answer_cache.number_of_cache_hits == 1
+
+        assert reworded_response == response
+
+        # Saved on close rather than on every answer
+        answer_cache.close()
+
+        reloaded_answer_cache = SemanticAnswerCache(
+                model=self.model,
+                cache_file_path=answer_cache_file_path)
+
+        assert len(reloaded_answer_cache) == len(answer_cache)
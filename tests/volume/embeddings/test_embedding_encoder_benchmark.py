@@ -0,0 +1,65 @@
+import os
+import pytest
+from sentence_transformers import SentenceTransformer
+
+from embeddings.embedding_encoder_benchmark_runner import run_embedding_encoder_benchmark
+from embeddings.retrieval_benchmark_runner import generate_synthetic_corpus
+from text_extraction.pdf_folder_extractor import extract_text_from_pdfs_in_folder
+
+
+class TestEmbeddingEncoderBenchmark:
+    @pytest.fixture(autouse=True)
+    def setup_method(self,
+                     outputs_folder_absolute_path,
+                     inputs_folder_absolute_path):
+
+        self.model = SentenceTransformer(
+                "all-MiniLM-L6-v2")
+
+        self.input_pdf_directory = os.path.join(
+                inputs_folder_absolute_path,
+                "pdf/accounting")
+
+        self.artefact_folder_path = os.path.join(
+                outputs_folder_absolute_path,
+                "onnx_encoders")
+
+        self.benchmarks_folder_path = os.path.join(
+                outputs_folder_absolute_path,
+                "benchmarks")
+
+    def test_embedding_encoder_benchmark_on_synthetic_corpus(self):
+        embedding_encoder_benchmark_report = run_embedding_encoder_benchmark(
+                model=self.model,
+                documents=generate_synthetic_corpus(
+                    number_of_documents=5_000),
+                artefact_folder_path=self.artefact_folder_path,
+                report_file_path=os.path.join(
+                    self.benchmarks_folder_path,
+                    "embedding_encoder_benchmark_synthetic_5000.json"))
+
+        encoder_type_reports = {
+            encoder_type_report['encoder_type']: encoder_type_report
+            for encoder_type_report in embedding_encoder_benchmark_report['encoder_types']
+            }
+
+        assert encoder_type_reports['onnx']['minimum_cosine_agreement'] > 0.999
+
+        assert encoder_type_reports['onnx_int8']['mean_cosine_agreement'] > 0.98
+
+        for encoder_type_report in encoder_type_reports.values():
+            assert encoder_type_report['documents_per_second'] > 0
+
+    def test_embedding_encoder_benchmark_on_pdf_corpus(self):
+        articles = extract_text_from_pdfs_in_folder(
+                self.input_pdf_directory)
+
+        embedding_encoder_benchmark_report = run_embedding_encoder_benchmark(
+                model=self.model,
+                documents=articles,
+                artefact_folder_path=self.artefact_folder_path,
+                report_file_path=os.path.join(
+                    self.benchmarks_folder_path,
+                    "embedding_encoder_benchmark_pdf_accounting.json"))
+
+        assert embedding_encoder_benchmark_report['number_of_documents'] == len(articles)
@@ -0,0 +1,78 @@
+import os
+import pytest
+from sentence_transformers import SentenceTransformer
+
+from embeddings.retrieval_benchmark_runner import (
+    generate_synthetic_corpus,
+    run_retrieval_benchmark,
+)
+from text_extraction.pdf_folder_extractor import extract_text_from_pdfs_in_folder
+
+
+class TestRetrievalBenchmark:
+    @pytest.fixture(autouse=True)
+    def setup_method(self,
+                     outputs_folder_absolute_path,
+                     inputs_folder_absolute_path):
+
+        self.model = SentenceTransformer(
+                "all-MiniLM-L6-v2")
+
+        self.input_pdf_directory = os.path.join(
+                inputs_folder_absolute_path,
+                "pdf/accounting")
+
+        self.benchmarks_folder_path = os.path.join(
+                outputs_folder_absolute_path,
+                "benchmarks")
+
+    @pytest.mark.parametrize(
+            "number_of_documents",
+            [1_000, 10_000])
+    def test_retrieval_benchmark_on_synthetic_corpus(
+            self,
+            number_of_documents):
+        documents = generate_synthetic_corpus(
+                number_of_documents=number_of_documents)
+
+        queries = generate_synthetic_corpus(
+                number_of_documents=100,
+                words_per_document=10,
+                random_seed=1)
+
+        retrieval_benchmark_report = run_retrieval_benchmark(
+                model=self.model,
+                documents=documents,
+                queries=queries,
+                report_file_path=os.path.join(
+                    self.benchmarks_folder_path,
+                    f"retrieval_benchmark_synthetic_{number_of_documents}.json"))
+
+        index_type_reports = {
+            index_type_report['index_type']: index_type_report
+            for index_type_report in retrieval_benchmark_report['index_types']
+            }
+
+        assert index_type_reports['flat']['recall_at_k'] == 1.0
+
+        for index_type_report in index_type_reports.values():
+            assert index_type_report['p50_query_latency_milliseconds'] <= \
+                   index_type_report['p95_query_latency_milliseconds']
+
+            assert index_type_report['queries_per_second'] > 0
+
+    def test_retrieval_benchmark_on_pdf_corpus(self):
+        articles = extract_text_from_pdfs_in_folder(
+                self.input_pdf_directory)
+
+        retrieval_benchmark_report = run_retrieval_benchmark(
+                model=self.model,
+                documents=articles,
+                queries=[
+                    "describe different types of ontologies in computing",
+                    "how are accounting transactions recorded"],
+                report_file_path=os.path.join(
+                    self.benchmarks_folder_path,
+                    "retrieval_benchmark_pdf_accounting.json"))
+
+        assert retrieval_benchmark_report['number_of_documents'] == len(articles)